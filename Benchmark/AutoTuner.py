@@ -0,0 +1,288 @@
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+
+import config
+from Benchmark.TrackingEvaluator import TrackingEvaluator
+
+
+class AutoTuner:
+    """
+    Chooses skip_frame, the YOLO input size, the OCR interval and the detection confidence of a run for the
+    current machine: a short sample of the video is processed with several settings, and the most accurate setting
+    that reaches a throughput or latency target is returned as run settings.
+
+    Without a ground truth, the accuracy of a setting is measured against a reference run of the sample with the
+    most accurate setting (every frame, the largest input size, the shortest OCR interval): the score is the mean
+    of MOTA, MOTP, IDF1 and the location accuracy of its track file against the track file of the reference run
+    (see TrackingEvaluator), with the results of a processed frame held over the frames it skips.
+
+    The search probes every combination of input size, OCR interval and confidence once at the smallest skip_frame
+    and predicts from the measured time per frame the smallest skip_frame that reaches the target. That skip_frame
+    is then measured and scored; if it misses the target, the next larger one is tried. The time of one processed
+    frame is measured between the progress callbacks of the run, so loading the models and writing the report do
+    not count.
+    """
+
+    # Larger skip_frame values tried after a measured setting missed the target.
+    MAX_RETRIES = 2
+
+    def __init__(self, target_fps=None, target_latency_ms=None, sample_seconds=5, skip_frames=(1, 2, 5, 10, 30),
+                 imgsz=(None,), ocr_intervals=(5,), confidences=None, iou_threshold=0.5):
+        """
+        Args:
+            target_fps (float or None): The minimum frames of the video per second.
+            target_latency_ms (float or None): The maximum mean time of one processed frame in milliseconds.
+            sample_seconds (float): The length of the sample, taken from the middle of the video.
+            skip_frames (list): The skip_frame values to choose from.
+            imgsz (list): The YOLO input sizes (height, width) to choose from. None is the full frame.
+            ocr_intervals (list): The OCR intervals to choose from.
+            confidences (list or None): The detection confidence thresholds to choose from. None keeps the
+                                        add_object_th of the run.
+            iou_threshold (float): The minimum IoU of a match with the reference run.
+        """
+        if target_fps is None and target_latency_ms is None:
+            raise ValueError("The auto-tuner needs a target frame rate or a target latency.")
+        self.target_fps = target_fps
+        self.target_latency_ms = target_latency_ms
+        self.sample_seconds = sample_seconds
+        self.skip_frames = sorted(set(skip_frames))
+        # The most accurate values first: the full frame, then the larger input sizes
+        self.imgsz = sorted(set(tuple(size) if size else None for size in imgsz),
+                            key=lambda size: -size[0] * size[1] if size else float('-inf'))
+        self.ocr_intervals = sorted(set(ocr_intervals))
+        self.confidences = confidences
+        self.evaluator = TrackingEvaluator(iou_threshold)
+        # The measured settings of the last tune() and the chosen one
+        self.trials = []
+        self.choice = None
+
+    @classmethod
+    def from_config(cls, target_fps=None, target_latency_ms=None):
+        """
+        Creates an auto-tuner with the settings in config. The targets default to the ones in config.
+        """
+        return cls(target_fps if target_fps is not None else config.autotune_target_fps,
+                   target_latency_ms if target_latency_ms is not None else config.autotune_target_latency_ms,
+                   config.autotune_sample_seconds, config.autotune_skip_frames, config.autotune_imgsz,
+                   config.autotune_ocr_intervals, config.autotune_confidences)
+
+    def tune(self, settings):
+        """
+        Searches the settings of a run.
+
+        Args:
+            settings (dict): The settings of the run (at least the ones that differ from config, e.g. video_path).
+
+        Returns:
+            dict: The chosen 'skip_frame', 'model_imgsz', 'ocr_interval' and 'add_object_th', to be applied over
+                  the settings of the run.
+        """
+        # Imported here: the JobWorker imports the whole pipeline through main.
+        from Jobs.JobWorker import JobWorker
+
+        video_path = settings.get('video_path', config.video_path)
+        confidence = settings.get('add_object_th', config.add_object_th)
+        confidences = sorted(set(self.confidences)) if self.confidences else [confidence]
+        work_dir = tempfile.mkdtemp(prefix='autotune_')
+        self.trials, self.choice = [], None
+        start_time = time.perf_counter()
+        try:
+            # 1. Cut the sample and measure the cost of reading a skipped frame
+            sample_path, grab_ms = self._cut_sample(video_path, os.path.join(work_dir, 'sample.mp4'))
+            worker = JobWorker()
+            base = dict(settings, video_path=sample_path)
+
+            # 2. The reference run: the most accurate setting on every frame of the sample
+            reference = self._trial(worker, base, work_dir, (self.imgsz[0], self.ocr_intervals[0], confidence),
+                                    self.skip_frames[0], None)
+            if self._meets_target(reference):
+                print("Auto-tune: The most accurate setting reaches the target.")
+                return self._finish(reference, start_time)
+
+            # 3. Every combination: a probe at the smallest skip_frame, then the predicted skip_frame
+            for combination in itertools.product(self.imgsz, self.ocr_intervals, confidences):
+                if combination == reference['combination']:
+                    probe = reference
+                else:
+                    probe = self._trial(worker, base, work_dir, combination, self.skip_frames[0],
+                                        reference['tracks'])
+                trial = probe
+                skips = [skip for skip in self.skip_frames if skip > probe['skip_frame']]
+                predicted = self._predict_skip(probe, grab_ms, skips)
+                retries = 0
+                while not self._meets_target(trial) and predicted is not None and retries <= self.MAX_RETRIES:
+                    trial = self._trial(worker, base, work_dir, combination, predicted, reference['tracks'])
+                    skips = [skip for skip in skips if skip > predicted]
+                    predicted = skips[0] if skips else None
+                    retries += 1
+
+            # 4. The most accurate setting that reaches the target, else the fastest one
+            feasible = [trial for trial in self.trials if self._meets_target(trial)]
+            if feasible:
+                choice = max(feasible, key=lambda trial: (trial['score'], trial['fps']))
+            else:
+                choice = (max(self.trials, key=lambda trial: trial['fps']) if self.target_fps is not None
+                          else min(self.trials, key=lambda trial: trial['latency_ms']))
+                print("Warning: No setting reaches the auto-tune target on this machine. The fastest one is used.")
+            return self._finish(choice, start_time)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _finish(self, choice, start_time):
+        self.choice = choice
+        print(f"Auto-tune: {len(self.trials)} sample runs in {time.perf_counter() - start_time:.0f} s. "
+              f"Chosen: {self._describe(choice)}")
+        return dict(choice['settings'])
+
+    def _cut_sample(self, video_path, sample_path):
+        """
+        Writes sample_seconds from the middle of the video to sample_path and times cv2.VideoCapture.grab().
+
+        Returns:
+            tuple: (the path of the sample, milliseconds to read a frame that is skipped). The video itself is
+                   the sample if it is not longer than sample_seconds.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise OSError(f"The video '{video_path}' could not be opened.")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            n_frames = max(int(round(self.sample_seconds * fps)), 1)
+            if 0 < total <= n_frames:
+                sample_path = video_path
+            else:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, max((total - n_frames) // 2, 0))
+                width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                writer = cv2.VideoWriter(sample_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                try:
+                    for _ in range(n_frames):
+                        ok, frame = cap.read()
+                        if not ok:
+                            break
+                        writer.write(frame)
+                finally:
+                    writer.release()
+        finally:
+            cap.release()
+
+        cap = cv2.VideoCapture(sample_path)
+        try:
+            grabbed = 0
+            grab_start = time.perf_counter()
+            while grabbed < n_frames and cap.grab():
+                grabbed += 1
+            grab_ms = (time.perf_counter() - grab_start) * 1000 / max(grabbed, 1)
+        finally:
+            cap.release()
+        return sample_path, grab_ms
+
+    def _trial(self, worker, base, work_dir, combination, skip_frame, reference_tracks):
+        """
+        Runs the sample with one setting and scores its track file against the reference track file.
+        """
+        imgsz, ocr_interval, confidence = combination
+        tuned = {'skip_frame': skip_frame, 'model_imgsz': imgsz, 'ocr_interval': ocr_interval,
+                 'add_object_th': confidence}
+        run_dir = os.path.join(work_dir, f"trial{len(self.trials)}")
+        os.makedirs(run_dir)
+        settings = dict(base, **tuned)
+        settings.update({
+            'output_mode': 'headless',
+            'output_video_path': os.path.join(run_dir, 'output.mp4'),
+            'pdf_report_path': os.path.join(run_dir, 'report.pdf'),
+            'profile_path': None,
+            'timeline_csv_path': None,
+            'timeline_parquet_path': None,
+            # Every trial has to process the sample, and must not tune itself.
+            'result_cache_dir': None,
+            'inference_cache_dir': None,
+            'run_store_path': None,
+            'replay_inference': False,
+            # A live source is sampled once; the trials read the sample as a file.
+            'live_source': False,
+            'autotune_target_fps': None,
+            'autotune_target_latency_ms': None,
+        })
+
+        # The loop time is taken between the first and the last processed frame.
+        times = []
+        result = worker.process_video(settings,
+                                      progress_callback=lambda done, total: times.append(time.perf_counter()))
+        frames = len(times)
+        latency_ms = (times[-1] - times[0]) * 1000 / (frames - 1) if frames > 1 else float('inf')
+
+        if reference_tracks is None:
+            metrics, score = None, 1.0
+        else:
+            held_tracks = os.path.join(run_dir, 'held.tracks.jsonl')
+            self._hold_results(result['tracks'], reference_tracks, held_tracks)
+            metrics = self.evaluator.evaluate(reference_tracks, held_tracks)
+            values = [metrics[key] for key in ('mota', 'motp', 'idf1', 'location_accuracy') if metrics[key] is not None]
+            score = round(sum(values) / len(values), 4) if values else 1.0
+        trial = {
+            'combination': combination,
+            'settings': tuned,
+            'skip_frame': skip_frame,
+            'frames': frames,
+            'latency_ms': round(latency_ms, 2),
+            'fps': round(1000 * skip_frame / latency_ms, 2) if latency_ms > 0 else float('inf'),
+            'score': score,
+            'metrics': metrics,
+            'tracks': result['tracks'],
+        }
+        self.trials.append(trial)
+        print(f"Auto-tune [{len(self.trials)}]: {self._describe(trial)}"
+              f"{'' if self._meets_target(trial) else ' (misses the target)'}")
+        return trial
+
+    def _hold_results(self, tracks_path, reference_path, output_path):
+        """
+        Writes the track file of a trial with the results of every processed frame repeated on the following skipped
+        frames of the reference, as they are shown until the next processed frame. Without this, a larger skip_frame
+        would only be scored on the frames it processes.
+        """
+        header, records = self.evaluator.read_track_file(tracks_path)
+        _, reference_records = self.evaluator.read_track_file(reference_path)
+        processed = sorted(records)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, separators=(',', ':')) + "\n")
+            i = -1
+            for frame_number in sorted(reference_records):
+                while i + 1 < len(processed) and processed[i + 1] <= frame_number:
+                    i += 1
+                if i >= 0:
+                    record = dict(records[processed[i]], f=frame_number)
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    def _predict_skip(self, probe, grab_ms, skips):
+        """
+        Returns the smallest of the skip_frame values that is predicted to reach the target, from the time per
+        frame of a probe: every skipped frame adds the time to read it. If none is, the largest one (the fastest)
+        is measured anyway, unless it misses the latency target. None if there is nothing to measure.
+        """
+        for skip in skips:
+            latency_ms = probe['latency_ms'] + grab_ms * (skip - probe['skip_frame'])
+            if self.target_latency_ms is not None and latency_ms > self.target_latency_ms:
+                return None  # A larger skip_frame only adds time per processed frame.
+            if self.target_fps is None or 1000 * skip / latency_ms >= self.target_fps:
+                return skip
+        return skips[-1] if skips else None
+
+    def _meets_target(self, trial):
+        return ((self.target_fps is None or trial['fps'] >= self.target_fps) and
+                (self.target_latency_ms is None or trial['latency_ms'] <= self.target_latency_ms))
+
+    @staticmethod
+    def _describe(trial):
+        imgsz = 'full' if trial['settings']['model_imgsz'] is None else 'x'.join(
+            str(value) for value in reversed(trial['settings']['model_imgsz']))
+        return (f"skip_frame {trial['skip_frame']}, imgsz {imgsz}, ocr_interval {trial['settings']['ocr_interval']}, "
+                f"confidence {trial['settings']['add_object_th']}: {trial['fps']:.1f} video frames/s, "
+                f"{trial['latency_ms']:.0f} ms per frame, score {trial['score']:.3f}")
@@ -0,0 +1,367 @@
+import itertools
+import json
+import os
+import platform
+import statistics
+import time
+from importlib import metadata
+
+import cv2
+
+import config
+from Benchmark.SyntheticVideo import SyntheticVideo
+from Benchmark.TrackingEvaluator import TrackingEvaluator
+from Telemetry import StageProfiler
+
+
+class BenchmarkSuite:
+    """
+    Measures the throughput of the pipeline on synthetic videos (see SyntheticVideo), for every combination of
+    a scenario (icon count, speed, resolution, panel) and a configuration (skip_frame, model input size, device,
+    output mode), and writes a comparable report to `<output_dir>/benchmark.json` and `benchmark.md`.
+
+    The runs go through JobWorker.process_video one after another in this process, so they do not compete for
+    the CPU and the models are only loaded once per device. The result cache, the inference recording and
+    resuming are switched off, so every run really processes its video. The rendered videos are kept in
+    `<output_dir>/videos/` and reused by later benchmarks with the same scenario and seed.
+
+    The track file of every run is evaluated against the ground truth of its video (see TrackingEvaluator), so
+    the speed of a configuration can be weighed against its tracking quality: the runs that no other run of the
+    same scenario beats in time per video frame, MOTA and IDF1 at once are marked as Pareto optimal. Runs in
+    the 'video' output mode write no track file and are not evaluated.
+
+    With a baseline (the benchmark.json of an earlier benchmark), every run is compared with the same scenario
+    and configuration of the baseline, and a frame rate drop of more than regression_threshold is reported
+    as a regression.
+    """
+
+    # The stages shown in the latency table of the Markdown report, if they ran.
+    REPORT_STAGES = StageProfiler.STAGES
+
+    def __init__(self, output_dir, model_path=None, icons_path=None, repeat=1, seed=0, backgrounds_dir=None,
+                 regression_threshold=0.1, iou_threshold=0.5):
+        """
+        Args:
+            output_dir (str): The directory of the videos, the run outputs and the report.
+            model_path (str or None): The YOLO model weights. config.yolov12_path is used if None.
+            icons_path (str or None): The icon sheet (.webp) of the videos. config.webp_file_path is used if None.
+            repeat (int): The runs per scenario and configuration. The median frame rate is reported.
+            seed (int): The seed of the synthetic videos.
+            backgrounds_dir (str or None): A directory of map images for the video backgrounds (e.g. the MapImages
+                                           of the Trainer). None draws the maps.
+            regression_threshold (float): The relative frame rate drop against the baseline that is a regression.
+            iou_threshold (float): The minimum IoU of a track box and a ground truth box to match.
+        """
+        self.output_dir = os.path.abspath(output_dir)
+        self.model_path = self._local_path(model_path or config.yolov12_path)
+        self.icons_path = self._local_path(icons_path or config.webp_file_path)
+        self.repeat = max(1, repeat)
+        self.seed = seed
+        self.backgrounds_dir = backgrounds_dir
+        self.regression_threshold = regression_threshold
+        self.evaluator = TrackingEvaluator(iou_threshold)
+
+    @staticmethod
+    def matrix(**options):
+        """
+        Returns every combination of the given option values as a list of dicts, e.g.
+        matrix(skip_frame=[1, 5], device=['cpu']) -> [{'skip_frame': 1, 'device': 'cpu'}, {'skip_frame': 5, ...}].
+        """
+        names = list(options)
+        return [dict(zip(names, values)) for values in itertools.product(*options.values())]
+
+    @staticmethod
+    def scenario_name(scenario):
+        return (f"icons{scenario['icons']}_speed{scenario['speed']:g}_{scenario['width']}x{scenario['height']}"
+                f"_{'panel' if scenario['panel'] else 'nopanel'}_{scenario['video_frames']}f")
+
+    @staticmethod
+    def configuration_name(configuration):
+        imgsz = configuration['imgsz']
+        return (f"skip{configuration['skip_frame']}_imgsz{f'{imgsz[1]}x{imgsz[0]}' if imgsz else 'default'}"
+                f"_{configuration['device'] or 'auto'}_{configuration['output_mode']}")
+
+    def run(self, scenarios, configurations, baseline_path=None):
+        """
+        Renders the videos of the scenarios, runs every configuration on every video and writes the report.
+
+        Args:
+            scenarios (list): Dicts with 'icons', 'speed', 'width', 'height', 'panel' and 'video_frames' (see matrix).
+            configurations (list): Dicts with 'skip_frame', 'imgsz' ((height, width) or None), 'device' and
+                                   'output_mode'.
+            baseline_path (str or None): The benchmark.json of an earlier benchmark to compare with.
+
+        Returns:
+            dict: The report (as written to benchmark.json).
+        """
+        os.makedirs(os.path.join(self.output_dir, 'videos'), exist_ok=True)
+        start_time = time.perf_counter()
+
+        # 1. Render the videos
+        videos = {}
+        icons, backgrounds = None, None
+        for scenario in scenarios:
+            name = self.scenario_name(scenario)
+            video_path = os.path.join(self.output_dir, 'videos', f"{name}_seed{self.seed}.mp4")
+            if not (os.path.exists(video_path) and os.path.exists(SyntheticVideo.ground_truth_path(video_path))):
+                if icons is None:
+                    icons, backgrounds = self._load_icons(), self._load_backgrounds()
+                print(f"Rendering the synthetic video '{name}'...")
+                SyntheticVideo(icons, scenario['width'], scenario['height'], scenario['icons'], scenario['speed'],
+                               scenario['panel'], scenario['video_frames'], seed=self.seed,
+                               backgrounds=backgrounds).render(video_path)
+            videos[name] = video_path
+
+        # 2. Run every configuration on every video
+        from Jobs.JobWorker import JobWorker
+        worker = JobWorker()
+        runs = []
+        total = len(scenarios) * len(configurations)
+        for scenario, configuration in itertools.product(scenarios, configurations):
+            row = self._run(worker, scenario, configuration, videos[self.scenario_name(scenario)])
+            runs.append(row)
+            fps = f"{row['fps']:.2f} frames/s" if row['fps'] else row['error']
+            quality = row['quality']
+            if quality is not None and quality['mota'] is not None:
+                fps += f", MOTA {quality['mota']:.3f}, IDF1 {quality['idf1']:.3f}"
+            print(f"[{len(runs)}/{total}] {row['scenario']} / {row['configuration']}: {fps}")
+        self._mark_pareto(runs)
+
+        report = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': round(time.perf_counter() - start_time, 1),
+            'environment': self._environment(),
+            'runs': runs,
+            'regressions': [],
+        }
+
+        # 3. Compare with the baseline and write the report
+        if baseline_path:
+            self._compare(report, baseline_path)
+        with open(os.path.join(self.output_dir, 'benchmark.json'), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(self.output_dir, 'benchmark.md'), 'w', encoding='utf-8') as f:
+            f.write(self.to_markdown(report))
+        print(f"Benchmark finished in {report['seconds']:.0f} s. "
+              f"Report: {os.path.join(self.output_dir, 'benchmark.md')}")
+        return report
+
+    def _run(self, worker, scenario, configuration, video_path):
+        """
+        Runs one configuration on one video `repeat` times and returns its report row.
+        """
+        scenario_name, configuration_name = self.scenario_name(scenario), self.configuration_name(configuration)
+        run_dir = os.path.join(self.output_dir, 'runs', scenario_name, configuration_name)
+        os.makedirs(run_dir, exist_ok=True)
+        settings = {
+            'video_path': video_path,
+            'yolov12_path': self.model_path,
+            'skip_frame': configuration['skip_frame'],
+            'model_imgsz': configuration['imgsz'],
+            'model_device': configuration['device'],
+            'output_mode': configuration['output_mode'],
+            'output_video_path': os.path.join(run_dir, 'output.mp4'),
+            'pdf_report_path': os.path.join(run_dir, 'report.pdf'),
+            'profile_path': os.path.join(run_dir, 'profile.json'),
+            'profile_stages': True,
+            'timeline_csv_path': None,
+            'timeline_parquet_path': None,
+            # Every run has to process its video.
+            'result_cache_dir': None,
+            'inference_cache_dir': None,
+            'run_store_path': None,
+            'replay_inference': False,
+        }
+        row = {'scenario': scenario_name, 'configuration': configuration_name}
+        row.update(scenario)
+        row.update(configuration)
+        row.update({'status': 'done', 'frames': None, 'seconds': None, 'fps': None, 'fps_runs': [],
+                    'loop_fps': None, 'ms_per_video_frame': None, 'aircraft': None, 'stages': {}, 'quality': None,
+                    'pareto': None, 'error': None})
+
+        profiles = []
+        try:
+            for _ in range(self.repeat):
+                result = worker.process_video(settings)
+                row['frames'], row['aircraft'] = result['frames'], result['aircraft']
+                row['fps_runs'].append(round(result['frames'] / result['seconds'], 3) if result['seconds'] else 0.0)
+                with open(result['profile'], encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            # The tracking is the same in every repetition, so the last track file is evaluated.
+            gt_path = SyntheticVideo.ground_truth_path(video_path)
+            if result['tracks'] and os.path.exists(gt_path):
+                row['quality'] = self.evaluator.evaluate(gt_path, result['tracks'])
+        except Exception as e:
+            print(f"Error: The run {scenario_name} / {configuration_name} failed: {e}")
+            row.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+            return row
+
+        # The run with the median frame rate represents the configuration.
+        median_index = sorted(range(self.repeat), key=lambda i: row['fps_runs'][i])[self.repeat // 2]
+        profile = profiles[median_index]
+        row['fps'] = statistics.median(row['fps_runs'])
+        row['seconds'] = round(row['frames'] / row['fps'], 2) if row['fps'] else None
+        # Per frame of the video, not per processed frame, so runs with different skip_frame can be compared.
+        row['ms_per_video_frame'] = (round(row['seconds'] * 1000 / scenario['video_frames'], 3)
+                                     if row['seconds'] else None)
+        row['loop_fps'] = profile['fps']
+        row['stages'] = {name: {key: stats[key] for key in ('count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'share')}
+                         for name, stats in profile['stages'].items()}
+        return row
+
+    @staticmethod
+    def _mark_pareto(runs):
+        """
+        Marks the evaluated runs that no other run of the same scenario beats in time per video frame, MOTA and
+        IDF1 at once (lower time, higher quality).
+        """
+        def costs(run):
+            return run['ms_per_video_frame'], -run['quality']['mota'], -run['quality']['idf1']
+
+        evaluated = [run for run in runs if run['status'] == 'done' and run['ms_per_video_frame'] is not None
+                     and run['quality'] is not None and run['quality']['mota'] is not None]
+        for run in evaluated:
+            run['pareto'] = not any(
+                other is not run and other['scenario'] == run['scenario']
+                and all(a <= b for a, b in zip(costs(other), costs(run))) and costs(other) != costs(run)
+                for other in evaluated)
+
+    def _compare(self, report, baseline_path):
+        """
+        Adds the baseline frame rate and the relative change to every run that also ran in the baseline.
+        """
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        baseline_fps = {(run['scenario'], run['configuration']): run['fps'] for run in baseline['runs'] if run['fps']}
+        report['baseline'] = {'path': os.path.abspath(baseline_path), 'created': baseline.get('created'),
+                              'environment': baseline.get('environment')}
+        for run in report['runs']:
+            base = baseline_fps.get((run['scenario'], run['configuration']))
+            run['baseline_fps'] = base
+            run['fps_change'] = round(run['fps'] / base - 1, 4) if base and run['fps'] else None
+            if run['fps_change'] is not None and run['fps_change'] < -self.regression_threshold:
+                report['regressions'].append({'scenario': run['scenario'], 'configuration': run['configuration'],
+                                              'fps': run['fps'], 'baseline_fps': base, 'change': run['fps_change']})
+
+    @classmethod
+    def to_markdown(cls, report):
+        """
+        Returns the report as a Markdown document: the environment, the throughput table, the stage latency table
+        and the regressions against the baseline.
+        """
+        env = report['environment']
+        lines = [
+            "# Pipeline Benchmark", "",
+            f"Created {report['created']} in {report['seconds']:.0f} s on {env['platform']} "
+            f"({env['processor'] or 'unknown CPU'}, {env['cpu_count']} cores), Python {env['python']}.", "",
+            "Packages: " + ", ".join(f"{name} {version}" for name, version in env['packages'].items()), "",
+            "## Throughput", "",
+        ]
+        has_baseline = 'baseline' in report
+        header = ['Scenario', 'Configuration', 'Frames', 'Seconds', 'FPS', 'Loop FPS', 'Aircraft']
+        if has_baseline:
+            header += ['Baseline FPS', 'Change']
+        lines += [cls._table_row(header), cls._table_row(['---'] * len(header))]
+        for run in report['runs']:
+            if run['status'] != 'done':
+                lines.append(cls._table_row([run['scenario'], run['configuration'], f"failed: {run['error']}"]
+                                            + [''] * (len(header) - 3)))
+                continue
+            values = [run['scenario'], run['configuration'], run['frames'], run['seconds'], f"{run['fps']:.2f}",
+                      f"{run['loop_fps']:.2f}" if run['loop_fps'] else '', run['aircraft']]
+            if has_baseline:
+                change = run.get('fps_change')
+                values += [f"{run['baseline_fps']:.2f}" if run.get('baseline_fps') else '',
+                           f"{change * 100:+.1f}%" if change is not None else '']
+            lines.append(cls._table_row(values))
+
+        # The mean latency of every stage that ran in any of the runs, in pipeline order
+        stages = [name for name in cls.REPORT_STAGES if any(name in run['stages'] for run in report['runs'])]
+        if stages:
+            lines += ["", "## Mean Stage Latency (ms)", "",
+                      cls._table_row(['Scenario', 'Configuration'] + stages),
+                      cls._table_row(['---'] * (len(stages) + 2))]
+            for run in report['runs']:
+                if run['status'] == 'done':
+                    lines.append(cls._table_row([run['scenario'], run['configuration']] +
+                                                [f"{run['stages'][name]['mean_ms']:.2f}" if name in run['stages']
+                                                 else '' for name in stages]))
+
+        # Speed against tracking quality
+        evaluated = [run for run in report['runs'] if run['status'] == 'done' and run['quality'] is not None]
+        if evaluated:
+            header = ['Scenario', 'Configuration', 'ms/video frame', 'MOTA', 'IDF1', 'ID switches', 'Precision',
+                      'Recall', 'Location', 'Selected', 'Pareto']
+            lines += ["", "## Speed and Tracking Quality", "", cls._table_row(header),
+                      cls._table_row(['---'] * len(header))]
+            for run in evaluated:
+                quality = run['quality']
+                lines.append(cls._table_row(
+                    [run['scenario'], run['configuration'], f"{run['ms_per_video_frame']:.1f}"]
+                    + [cls._format_metric(quality[name]) for name in ('mota', 'idf1')]
+                    + [quality['id_switches']]
+                    + [cls._format_metric(quality[name]) for name in ('precision', 'recall', 'location_accuracy',
+                                                                      'selected_accuracy')]
+                    + ['yes' if run['pareto'] else '']))
+
+        if has_baseline:
+            lines += ["", "## Regressions", ""]
+            if report['regressions']:
+                lines += [f"- {r['scenario']} / {r['configuration']}: {r['fps']:.2f} frames/s "
+                          f"(baseline {r['baseline_fps']:.2f}, {r['change'] * 100:+.1f}%)"
+                          for r in report['regressions']]
+            else:
+                lines.append(f"None (baseline {report['baseline']['created']}).")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_metric(value):
+        return f"{value:.3f}" if value is not None else 'N/A'
+
+    @staticmethod
+    def _table_row(values):
+        return "| " + " | ".join('' if value is None else str(value) for value in values) + " |"
+
+    def _environment(self):
+        packages = {}
+        for name in ('torch', 'ultralytics', 'easyocr', 'opencv-python', 'numpy'):
+            try:
+                packages[name] = metadata.version(name)
+            except metadata.PackageNotFoundError:
+                pass
+        if 'opencv-python' not in packages:
+            packages['opencv'] = cv2.__version__
+        return {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'packages': packages,
+            'model': self.model_path,
+            'seed': self.seed,
+            'repeat': self.repeat,
+        }
+
+    def _load_icons(self):
+        from Trainer.ExtractIcons import ExtractIcons
+        icons = ExtractIcons(self.icons_path).extract_icons()
+        if not icons:
+            raise ValueError(f"No icons could be read from '{self.icons_path}'.")
+        return icons
+
+    def _load_backgrounds(self):
+        if not self.backgrounds_dir:
+            return None
+        backgrounds = []
+        for name in sorted(os.listdir(self.backgrounds_dir)):
+            image = cv2.imread(os.path.join(self.backgrounds_dir, name))
+            if image is not None:
+                backgrounds.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not backgrounds:
+            print(f"Warning: No images in '{self.backgrounds_dir}'. The maps are drawn.")
+        return backgrounds or None
+
+    @staticmethod
+    def _local_path(path):
+        # The paths in config.py are written with Windows separators.
+        return os.path.normpath(path.replace('\\', '/'))
@@ -0,0 +1,254 @@
+import json
+import math
+import os
+import random
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import config
+from ImageProcessor.FindCurrentAircraft import FindCurrentAircraft
+from Trainer.PrepareData import PrepareData
+
+
+class SyntheticVideo:
+    """
+    Renders a reproducible synthetic radar video: aircraft icons from the training icon sheet (Trainer.ExtractIcons)
+    move over a map background, next to an optional flight information panel on the left.
+
+    The icons are augmented and pasted like the training images (see Trainer.PrepareData), so the detector sees
+    the kind of input it was trained on. Without background images, a map-like background (land, water, roads and
+    airport codes) is drawn, so no map tiles have to be downloaded. The same parameters and seed always give the
+    same video.
+
+    The ground truth is written next to the video (see ground_truth_path) in the layout of the track file of a run
+    (see Video.AnnotationWriter): per frame the box, class and location of every icon and the selected icon, so
+    the tracking of a run can be evaluated against it (see TrackingEvaluator). The selected icon is painted in the
+    color that FindCurrentAircraft looks for, and the other icons get hues away from it. The location of an icon is the
+    last drawn place name it came close to, like the locations of the AircraftManager.
+    """
+
+    # The texts of the flight information panel, as (text, x, y) in a 1920x1080 frame. The positions match the
+    # built-in panel layout (see ImageProcessor.PanelLayout), so the panel OCR finds its fields.
+    PANEL_TEXTS = [
+        ('VY1234', 40, 120), ('Vueling', 40, 170),
+        ('BCN', 60, 290), ('CPH', 300, 290),
+        ('BARCELONA', 40, 340), ('COPENHAGEN', 260, 340),
+        ('AIRCRAFT TYPE', 40, 430), ('A320', 40, 465),
+        ('REGISTRATION', 40, 530), ('EC-MLE', 40, 565),
+        ('COUNTRY OF REG', 40, 630), ('Spain', 40, 665),
+        ('AIRCRAFT CATEGORY', 40, 730), ('Medium', 40, 765),
+    ]
+    # Place names on the drawn map, read by the map OCR.
+    PLACE_NAMES = ['IST', 'SAW', 'ESB', 'ADB', 'AYT', 'TZX', 'ANKARA', 'IZMIR', 'BURSA', 'KONYA']
+    # The share of the frame width taken by the panel.
+    PANEL_WIDTH_RATIO = 0.25
+    # The hues (0-179) of the icons that are not selected stay this far away from the hue of the selected one.
+    SELECTED_HUE_MARGIN = 25
+    # The brightness of the highlight around the selected icon, relative to the target color.
+    HIGHLIGHT_SHADE = 0.75
+
+    def __init__(self, icons, width=1920, height=1080, n_icons=20, speed=4.0, panel=True, frames=300, fps=30,
+                 seed=0, backgrounds=None, selected=True):
+        """
+        Args:
+            icons (list): The icons (PIL images in RGBA) to choose from, e.g. from ExtractIcons.extract_icons().
+            width, height (int): The frame size.
+            n_icons (int): The number of moving icons.
+            speed (float): The speed of the icons in pixels per frame.
+            panel (bool): Draws the flight information panel on the left side.
+            frames (int): The number of frames.
+            fps (float): The frame rate of the video.
+            seed (int): The seed of all random choices (icons, positions, directions, background).
+            backgrounds (list or None): Map images (RGB arrays) to choose the background from. None draws one.
+                                        Their place names are not known, so the ground truth has no locations.
+            selected (bool): Shows the first icon as the selected aircraft.
+        """
+        self.icons = icons
+        self.width = width
+        self.height = height
+        self.n_icons = n_icons
+        self.speed = speed
+        self.panel = panel
+        self.frames = frames
+        self.fps = fps
+        self.seed = seed
+        self.backgrounds = backgrounds
+        self.selected = selected
+        self.panel_x = int(width * self.PANEL_WIDTH_RATIO) if panel else 0
+        # The drawn place names as (text, center x, center y), for the locations of the ground truth
+        self.labels = []
+        # An icon is at a place when its center is this close to the name (the distance of the AircraftManager)
+        self.location_distance = config.relation_airport_th / 2
+
+    @staticmethod
+    def ground_truth_path(video_path):
+        """Returns the path of the ground truth file of a video."""
+        return os.path.splitext(video_path)[0] + '.gt.jsonl'
+
+    def render(self, path):
+        """
+        Writes the video and its ground truth file.
+
+        Args:
+            path (str): The output video file (.mp4).
+
+        Returns:
+            str: The path of the ground truth file.
+        """
+        rng = random.Random(self.seed)
+        background = Image.fromarray(self._background(np.random.default_rng(self.seed)))
+        tracks = self._create_tracks(rng)
+
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (self.width, self.height))
+        if not writer.isOpened():
+            raise OSError(f"The video '{path}' could not be created.")
+        gt_path = self.ground_truth_path(path)
+        selected_id = tracks[0]['id'] if self.selected and tracks else None
+        try:
+            with open(gt_path, 'w', encoding='utf-8') as gt_file:
+                header = {
+                    "type": "header",
+                    "fps": self.fps,
+                    "width": self.width,
+                    "height": self.height,
+                    "labels": [[text, round(x, 1), round(y, 1)] for text, x, y in self.labels],
+                    "obj_fields": ["id", "cls", "x1", "y1", "x2", "y2", "loc"],
+                }
+                gt_file.write(json.dumps(header, separators=(',', ':')) + "\n")
+                for frame_number in range(self.frames):
+                    frame = background.copy()
+                    objs = []
+                    for track in tracks:
+                        box = PrepareData.paste_icon(frame, track['icon'], int(track['x']), int(track['y']))
+                        track['location'] = self._location(box) or track['location']
+                        objs.append([track['id'], track['class_id'], *box, track['location']])
+                        self._move(track)
+                    writer.write(cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR))
+                    record = {"f": frame_number, "sel": selected_id, "objs": objs}
+                    gt_file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        finally:
+            writer.release()
+        return gt_path
+
+    def _create_tracks(self, rng):
+        """
+        Picks, augments and places the icons. Every icon keeps its look and moves in a straight line,
+        bouncing off the edges of the map area.
+        """
+        selected_hue = int(cv2.cvtColor(np.uint8([[FindCurrentAircraft.TARGET_BGR]]), cv2.COLOR_BGR2HSV)[0, 0, 0])
+        tracks = []
+        while len(tracks) < self.n_icons:
+            class_id = rng.randrange(len(self.icons))
+            if self.selected and not tracks:
+                hue = selected_hue
+            else:
+                # A hue outside the margin around the selected hue (hues wrap around at 180)
+                margin = self.SELECTED_HUE_MARGIN
+                hue = (selected_hue + margin + rng.randint(0, 179 - 2 * margin)) % 180
+            icon = PrepareData.augment_icon(self.icons[class_id], [0], config.MIN_ICON_SCALE, config.MAX_ICON_SCALE,
+                                            rng, hue)
+            if icon is None or icon.width >= self.width - self.panel_x or icon.height >= self.height:
+                continue
+            if self.selected and not tracks:
+                icon = self._paint_selected(icon)
+            angle = rng.uniform(0, 2 * math.pi)
+            tracks.append({
+                'id': len(tracks) + 1,
+                'class_id': class_id,
+                'icon': icon,
+                'x': rng.uniform(self.panel_x, self.width - icon.width),
+                'y': rng.uniform(0, self.height - icon.height),
+                'dx': self.speed * math.cos(angle),
+                'dy': self.speed * math.sin(angle),
+                'location': 'Unknown',
+            })
+        return tracks
+
+    @classmethod
+    def _paint_selected(cls, icon):
+        """
+        Paints the visible pixels of the selected icon in the target color of FindCurrentAircraft, over a highlight
+        in a darker shade of it. FindCurrentAircraft compares the average color of the whole box, and the icon alone
+        covers only about a third of its box, so without the highlight the map around it outweighs it.
+        """
+        rgba = np.array(icon)
+        target_rgb = np.array(FindCurrentAircraft.TARGET_BGR[::-1])
+        opaque = rgba[:, :, 3] > 0
+        h, w = opaque.shape
+        highlight = np.zeros((h, w), dtype=np.uint8)
+        cv2.ellipse(highlight, (w // 2, h // 2), (w // 2, h // 2), 0, 0, 360, 255, -1)
+        rgba[highlight > 0] = (*(target_rgb * cls.HIGHLIGHT_SHADE).astype(np.uint8), 255)
+        rgba[opaque, :3] = target_rgb
+        return Image.fromarray(rgba, 'RGBA')
+
+    def _location(self, box):
+        """
+        Returns the place name closest to the center of a box, if it is within location_distance.
+        """
+        x, y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        best_text, best_distance = None, self.location_distance
+        for text, label_x, label_y in self.labels:
+            distance = math.hypot(label_x - x, label_y - y)
+            if distance < best_distance:
+                best_text, best_distance = text, distance
+        return best_text
+
+    def _move(self, track):
+        max_x = self.width - track['icon'].width
+        max_y = self.height - track['icon'].height
+        track['x'] += track['dx']
+        track['y'] += track['dy']
+        if not self.panel_x <= track['x'] <= max_x:
+            track['dx'] = -track['dx']
+            track['x'] = min(max(track['x'], self.panel_x), max_x)
+        if not 0 <= track['y'] <= max_y:
+            track['dy'] = -track['dy']
+            track['y'] = min(max(track['y'], 0), max_y)
+
+    def _background(self, np_rng):
+        """
+        Returns the background (RGB): a map with the panel drawn over its left side.
+        """
+        if self.backgrounds:
+            image = self.backgrounds[np_rng.integers(len(self.backgrounds))]
+            image = cv2.resize(image, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        else:
+            image = self._draw_map(np_rng)
+        if self.panel:
+            self._draw_panel(image)
+        return image
+
+    def _draw_map(self, np_rng):
+        h, w = self.height, self.width
+        # 1. Land and water from smooth noise
+        noise = np_rng.random((h // 90 + 2, w // 90 + 2)).astype(np.float32)
+        noise = cv2.GaussianBlur(cv2.resize(noise, (w, h), interpolation=cv2.INTER_CUBIC), (0, 0), 15)
+        image = np.empty((h, w, 3), dtype=np.uint8)
+        image[:] = (170, 211, 223)
+        image[noise > np.median(noise)] = (242, 239, 233)
+
+        # 2. Roads
+        for _ in range(10):
+            start = np_rng.integers(0, (w, h), 2)
+            points = (start + np.cumsum(np_rng.integers(-250, 251, (5, 2)), axis=0)).astype(np.int32)
+            cv2.polylines(image, [points], False, (246, 200, 120), 2, cv2.LINE_AA)
+
+        # 3. Place names
+        self.labels = []
+        for name in self.PLACE_NAMES:
+            x, y = int(np_rng.integers(self.panel_x, w - 120)), int(np_rng.integers(30, h - 10))
+            cv2.putText(image, name, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (60, 60, 60), 2, cv2.LINE_AA)
+            (text_w, text_h), _ = cv2.getTextSize(name, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            self.labels.append((name, x + text_w / 2, y - text_h / 2))
+        return image
+
+    def _draw_panel(self, image):
+        scale_x, scale_y = self.width / 1920, self.height / 1080
+        image[:, :self.panel_x] = (32, 36, 44)
+        # A bright border, so the panel boundary is a strong vertical edge (see ImageProcessor.PanelBoundaryTracker)
+        image[:, self.panel_x - 2:self.panel_x] = (230, 230, 230)
+        for text, x, y in self.PANEL_TEXTS:
+            cv2.putText(image, text, (int(x * scale_x), int(y * scale_y)), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.9 * min(scale_x, scale_y), (235, 235, 235), 2, cv2.LINE_AA)
@@ -0,0 +1,186 @@
+import json
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class TrackingEvaluator:
+    """
+    Compares the track file of a run (see Video.AnnotationWriter) with the ground truth of a synthetic video
+    (see SyntheticVideo) and computes the CLEAR MOT and identity metrics of the tracking (MOTA, MOTP, IDF1, ID
+    switches, precision and recall), the share of the matched aircraft with the right location and the share of
+    the frames with the right selected aircraft.
+
+    Only the processed frames (the frames of the track file) are evaluated. A track box and a ground truth box
+    can be matched if their IoU is at least iou_threshold. On every frame, the matches of the previous frames are
+    kept while they still overlap enough, and the other boxes are matched by the largest total IoU (CLEAR MOT).
+    IDF1 matches the track IDs to the ground truth IDs once for the whole video.
+    """
+
+    def __init__(self, iou_threshold=0.5):
+        """
+        Args:
+            iou_threshold (float): The minimum IoU of a match.
+        """
+        self.iou_threshold = iou_threshold
+
+    @staticmethod
+    def read_track_file(path):
+        """
+        Reads a track file or a ground truth file.
+
+        Returns:
+            tuple: (header dict, {frame number: record dict}).
+        """
+        header, records = None, {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('type') == 'header':
+                    header = record
+                else:
+                    records[record['f']] = record
+        return header, records
+
+    @staticmethod
+    def iou_matrix(boxes_a, boxes_b):
+        """
+        Returns the IoU of every pair of boxes ([x1, y1, x2, y2]) as an array of shape (len(a), len(b)).
+        """
+        a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+        b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+        x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+        y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+        x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+        y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+        intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+        area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        union = area_a[:, None] + area_b[None, :] - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    def evaluate(self, ground_truth_path, tracks_path):
+        """
+        Evaluates the track file of a run against the ground truth of its video, or against the track file of a
+        reference run of the same video.
+
+        Returns:
+            dict: 'frames', 'gt_objects', 'matches', 'false_positives', 'misses', 'id_switches', 'mota', 'motp'
+                  (mean IoU of the matches), 'idf1', 'idp', 'idr', 'precision', 'recall', 'location_accuracy'
+                  (None if the ground truth has no locations) and 'selected_accuracy'.
+        """
+        gt_header, gt_records = self.read_track_file(ground_truth_path)
+        track_header, track_records = self.read_track_file(tracks_path)
+        gt_fields = {name: i for i, name in enumerate(gt_header['obj_fields'])}
+        track_fields = {name: i for i, name in enumerate(track_header['obj_fields'])}
+        # A ground truth without place names (e.g. drawn over map images) has no locations. The track file of
+        # another run can also be the ground truth (see AutoTuner).
+        has_locations = 'loc' in gt_fields and 'loc' in track_fields and gt_header.get('labels') != []
+
+        n_gt = n_tracks = n_matches = misses = false_positives = id_switches = 0
+        iou_sum = 0.0
+        location_correct = location_total = selected_correct = frames = 0
+        last_match = {}  # Ground truth ID -> the track ID it was last matched with
+        overlaps = {}  # (ground truth ID, track ID) -> frames in which they overlap (for IDF1)
+
+        for frame_number in sorted(track_records):
+            gt_record = gt_records.get(frame_number)
+            if gt_record is None:
+                continue  # The track file is longer than the ground truth (e.g. another video).
+            frames += 1
+            track_record = track_records[frame_number]
+            gt_objs, track_objs = gt_record['objs'], track_record['objs']
+            gt_ids = [obj[gt_fields['id']] for obj in gt_objs]
+            track_ids = [obj[track_fields['id']] for obj in track_objs]
+            ious = self.iou_matrix([self._box(obj, gt_fields) for obj in gt_objs],
+                                   [self._box(obj, track_fields) for obj in track_objs])
+            n_gt += len(gt_objs)
+            n_tracks += len(track_objs)
+
+            # 1. Keep the matches of the previous frames that still overlap enough
+            matches = {}  # Ground truth index -> track index
+            track_index = {track_id: j for j, track_id in enumerate(track_ids)}
+            for i, gt_id in enumerate(gt_ids):
+                j = track_index.get(last_match.get(gt_id))
+                if j is not None and ious[i, j] >= self.iou_threshold and j not in matches.values():
+                    matches[i] = j
+
+            # 2. Match the other boxes by the largest total IoU
+            free_gt = [i for i in range(len(gt_ids)) if i not in matches]
+            free_tracks = [j for j in range(len(track_ids)) if j not in matches.values()]
+            if free_gt and free_tracks:
+                sub = ious[np.ix_(free_gt, free_tracks)]
+                rows, cols = linear_sum_assignment(-sub)
+                for row, col in zip(rows, cols):
+                    if sub[row, col] >= self.iou_threshold:
+                        matches[free_gt[row]] = free_tracks[col]
+
+            # 3. Count the errors of the frame
+            for i, j in matches.items():
+                gt_id, track_id = gt_ids[i], track_ids[j]
+                if gt_id in last_match and last_match[gt_id] != track_id:
+                    id_switches += 1
+                last_match[gt_id] = track_id
+                iou_sum += float(ious[i, j])
+                if has_locations:
+                    location_total += 1
+                    location_correct += gt_objs[i][gt_fields['loc']] == track_objs[j][track_fields['loc']]
+            n_matches += len(matches)
+            misses += len(gt_ids) - len(matches)
+            false_positives += len(track_ids) - len(matches)
+
+            # 4. The selected aircraft: right if the selected track is the match of the selected icon
+            gt_selected, track_selected = gt_record.get('sel'), track_record.get('sel')
+            if gt_selected is None:
+                selected_correct += track_selected is None
+            else:
+                matched = {gt_ids[i]: track_ids[j] for i, j in matches.items()}
+                selected_correct += track_selected is not None and matched.get(gt_selected) == track_selected
+
+            # 5. The overlaps of the identities
+            for i, j in zip(*np.nonzero(ious >= self.iou_threshold)):
+                key = (gt_ids[i], track_ids[j])
+                overlaps[key] = overlaps.get(key, 0) + 1
+
+        id_true_positives = self._identity_matches(overlaps)
+        return {
+            'frames': frames,
+            'gt_objects': n_gt,
+            'matches': n_matches,
+            'false_positives': false_positives,
+            'misses': misses,
+            'id_switches': id_switches,
+            'mota': round(1 - (misses + false_positives + id_switches) / n_gt, 4) if n_gt else None,
+            'motp': round(iou_sum / n_matches, 4) if n_matches else None,
+            'idf1': round(2 * id_true_positives / (n_gt + n_tracks), 4) if n_gt + n_tracks else None,
+            'idp': round(id_true_positives / n_tracks, 4) if n_tracks else None,
+            'idr': round(id_true_positives / n_gt, 4) if n_gt else None,
+            'precision': round(n_matches / n_tracks, 4) if n_tracks else None,
+            'recall': round(n_matches / n_gt, 4) if n_gt else None,
+            'location_accuracy': round(location_correct / location_total, 4) if location_total else None,
+            'selected_accuracy': round(selected_correct / frames, 4) if frames else None,
+        }
+
+    @staticmethod
+    def _box(obj, fields):
+        return [obj[fields['x1']], obj[fields['y1']], obj[fields['x2']], obj[fields['y2']]]
+
+    @staticmethod
+    def _identity_matches(overlaps):
+        """
+        Returns the number of frames in which the ground truth IDs overlap with the track IDs they are matched to,
+        for the one-to-one matching of the IDs with the most such frames (the IDTP of IDF1).
+        """
+        if not overlaps:
+            return 0
+        gt_ids = sorted({gt_id for gt_id, _ in overlaps})
+        track_ids = sorted({track_id for _, track_id in overlaps})
+        gt_index = {gt_id: i for i, gt_id in enumerate(gt_ids)}
+        track_index = {track_id: j for j, track_id in enumerate(track_ids)}
+        counts = np.zeros((len(gt_ids), len(track_ids)))
+        for (gt_id, track_id), count in overlaps.items():
+            counts[gt_index[gt_id], track_index[track_id]] = count
+        rows, cols = linear_sum_assignment(-counts)
+        return int(counts[rows, cols].sum())
@@ -0,0 +1,5 @@
+from .SyntheticVideo import SyntheticVideo
+from .TrackingEvaluator import TrackingEvaluator
+from .BenchmarkSuite import BenchmarkSuite
+from .AutoTuner import AutoTuner
+__all__ = ['SyntheticVideo', 'TrackingEvaluator', 'BenchmarkSuite', 'AutoTuner']
\ No newline at end of file
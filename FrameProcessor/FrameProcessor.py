@@ -1,28 +1,279 @@
 import config
+from ImageProcessor import OCRService
+from Objects import Detections, PanelData
+from Storage import InferenceCache
 
 class FrameProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, context):
+        """
+        Args:
+            context (PipelineContext): The components (models, tracker, renderer) of this run.
+        """
+        self.context = context
+        # OCR is much slower than detection and the panel/map texts change slowly,
+        # so it only runs every `ocr_interval` processed frames (or when something relevant changes).
+        self.ocr_interval = max(1, config.ocr_interval)
+        self.ocr_staleness = 0  # Processed frames since the served OCR results were produced.
+        self._latest_ocr = None  # PanelData of the last OCR pass. Map texts live in the map label registry.
+        self._pending_ocr = None  # Result of a synchronous OCR pass that has not been collected yet.
+        self._last_panel_boundary = None
+        self._last_selected_id = None
+        self._last_frame_boundary = None  # Panel boundary of the most recently processed frame.
+        self.frame_index = 0
+        # Frames that were served the cached OCR results, and frames that needed an OCR pass (for the metrics).
+        self.ocr_cache_hits = 0
+        self.ocr_cache_misses = 0
+        # With an OCR service the OCR passes run on a background thread while YOLO runs here.
+        self.ocr_service = OCRService(context.ocr_processor, config.ocr_queue_size) if config.ocr_async else None
+        # An InferenceCache that records the inference outputs of every processed frame, or None.
+        self.recorder = None
+        self._ocr_record = None  # (panel data dict or None, map texts) of the last OCR pass, for the recorder.
 
-    def process_frame(self, frame):
-        # 1. Detect all objects (like aircraft) in the frame using the YOLO model.
-        yolo_results = config.yolov12.find_objects(frame)
+    def process_frame(self, frame, render=True, frame_number=None, skip_ocr=False):
+        """
+        Runs the whole pipeline on one frame.
 
-        # 2. Process the frame with OCR to find the side panel, extract flight data, and read any text on the map.
-        ocr_results, panel_boundaries, map_texts = config.ocr_processor.process_image(frame)
+        Args:
+            frame (np.ndarray): The frame in BGR format.
+            render (bool): If False, no annotated frame is drawn (e.g. when annotations are written to a sidecar file).
+            frame_number (int or None): The frame number in the source video, stored by the recorder.
+            skip_ocr (bool): Serves the latest OCR results even if an OCR pass is due (e.g. when a live run falls
+                             behind, see LiveScheduler). The skipped passes run on the next frame without it.
 
-        # 3. Update the central aircraft manager with the latest detections, panel info, and map text.
+        Returns:
+            np.ndarray or None: The annotated frame, or None if render is False.
+        """
+        self.frame_index += 1
+        context = self.context
+        profiler = context.profiler
+
+        # 1. Find the side panel boundary (cheap) and start the OCR passes when they are due.
+        #    Otherwise the latest flight data and map texts are served again.
+        #    The map label registry follows map pans on its own and asks for OCR after a zoom or scene change.
+        with profiler.stage('panel_split'):
+            panel_boundaries = context.ocr_processor.find_panel_boundary(frame)
+        with profiler.stage('map_motion'):
+            context.map_label_registry.track_motion(frame, panel_boundaries)
+        ran_ocr = not skip_ocr and self._ocr_is_due(panel_boundaries)
+        if ran_ocr:
+            self._start_ocr(frame, panel_boundaries)
+
+        # 2. Detect all objects (like aircraft) in the frame using the YOLO model.
+        #    This overlaps with the OCR passes when they run in the background.
+        with profiler.stage('yolo'):
+            detections = Detections.from_result(context.detector.find_objects(frame))
+
+        # 3. Wait for the OCR passes of this frame (if any) and take the latest results.
+        if ran_ocr:
+            with profiler.stage('ocr_wait'):
+                self._finish_ocr(panel_boundaries)
+        else:
+            self.ocr_staleness += 1
+        ocr_results = self._latest_ocr
+
+        # 4. Update the central aircraft manager with the latest detections, panel info, and map text.
         #    This step handles tracking, updating states (e.g., lost, found), and cleaning up old objects.
-        config.aircraft_manager.update(yolo_results, panel_boundaries, map_texts)
+        with profiler.stage('tracking'):
+            context.aircraft_manager.update(detections, panel_boundaries, context.map_label_registry)
+
+        # 5. Identify which of the tracked aircraft is the "currently selected" one (e.g., highlighted with a specific color).
+        #    When recording, the colors of all detections are kept too, so replays with other thresholds find them.
+        with profiler.stage('current_aircraft'):
+            all_boxes = context.aircraft_manager.get_all_boxes()
+            boxes = list(all_boxes.values())
+            if self.recorder is not None:
+                boxes += detections.xyxy.tolist()
+            box_colors = context.find_current_aircraft.box_colors(frame, boxes)
+            current_aircraft_id = context.find_current_aircraft.find_from_colors(box_colors, all_boxes)
+
+        # A newly selected aircraft means the panel shows different flight data, so the cached results are useless.
+        ocr_kind = InferenceCache.OCR_SCHEDULED if ran_ocr else InferenceCache.OCR_NONE
+        selection_changed = current_aircraft_id is not None and current_aircraft_id != self._last_selected_id
+        if not ran_ocr and selection_changed and not skip_ocr:
+            self._start_ocr(frame, panel_boundaries)
+            with profiler.stage('ocr_wait'):
+                self._finish_ocr(panel_boundaries)
+            # The locations were assigned from the map labels before this pass.
+            with profiler.stage('tracking'):
+                context.aircraft_manager.refresh_locations(context.map_label_registry)
+            ocr_results = self._latest_ocr
+            ocr_kind = InferenceCache.OCR_FORCED
+        if selection_changed and skip_ocr:
+            # The panel data belongs to the previous selection. The selection is taken over (and read) by the
+            # next frame that runs OCR.
+            current_aircraft_id = self._last_selected_id
+        self._last_selected_id = current_aircraft_id
+        self._last_frame_boundary = panel_boundaries
+        self._count_ocr(ocr_kind)
 
-        # 4. Identify which of the tracked aircraft is the "currently selected" one (e.g., highlighted with a specific color).
-        current_aircraft_id = config.find_current_aircraft.find(frame)
+        if self.recorder is not None:
+            with profiler.stage('recording'):
+                self.recorder.record_frame(frame_number if frame_number is not None else self.frame_index,
+                                           panel_boundaries, context.map_label_registry.last_motion, detections,
+                                           box_colors, ocr_kind, self._ocr_record if ocr_kind else None)
 
-        # 5. Associate the extracted OCR data (flight panel information) with the currently selected aircraft.
-        config.aircraft_manager.add_panel_to_aircraft(current_aircraft_id, ocr_results)
+        # 6. Associate the extracted OCR data (flight panel information) with the currently selected aircraft.
+        context.aircraft_manager.add_panel_to_aircraft(current_aircraft_id, ocr_results)
 
-        # 6. Create a new frame with all annotations drawn on it (bounding boxes, OCR text, panel lines, etc.).
-        new_frame = config.frame_creator.create_annotated_frame(frame, panel_boundaries, map_texts, current_aircraft_id)
+        # 7. Draw all annotations into the frame (bounding boxes, OCR text, panel lines, etc.). Nothing reads the
+        #    frame after this, so it is not copied.
+        if not render:
+            return None
+        with profiler.stage('rendering'):
+            map_texts = context.map_label_registry.get_labels()
+            new_frame = context.frame_creator.create_annotated_frame(frame, panel_boundaries, map_texts,
+                                                                     context.aircraft_manager, current_aircraft_id)
 
-        # 7. Return the final, annotated frame for display or saving.
+        # 8. Return the final, annotated frame for display or saving.
         return new_frame
+
+    def replay_frame(self, record):
+        """
+        Runs the post-processing of process_frame on a recorded frame (see Storage.InferenceCache.iter_frames):
+        map label motion, tracking, the current aircraft search and the recorded OCR results.
+        No image is needed, so tracking and report parameters can be re-tuned in seconds.
+
+        Args:
+            record (dict): The recorded frame.
+        """
+        self.frame_index += 1
+        context = self.context
+        profiler = context.profiler
+        panel_boundaries = record['panel_boundary_x']
+
+        # 1. Map motion and the OCR pass that ran before the detections
+        context.map_label_registry.apply_motion(record['motion'])
+        if record['ocr_kind'] == InferenceCache.OCR_SCHEDULED:
+            self._store_ocr(*self._decode_ocr(record['ocr']), panel_boundaries)
+        else:
+            self.ocr_staleness += 1
+
+        # 2. Tracking and the current aircraft, from the recorded detections and box colors
+        with profiler.stage('tracking'):
+            context.aircraft_manager.update(record['detections'], panel_boundaries, context.map_label_registry)
+        with profiler.stage('current_aircraft'):
+            current_aircraft_id = context.find_current_aircraft.find_from_colors(
+                record['box_colors'], context.aircraft_manager.get_all_boxes())
+
+        # 3. The OCR pass that ran because the selection changed
+        if record['ocr_kind'] == InferenceCache.OCR_FORCED:
+            self._store_ocr(*self._decode_ocr(record['ocr']), panel_boundaries)
+            with profiler.stage('tracking'):
+                context.aircraft_manager.refresh_locations(context.map_label_registry)
+        self._last_selected_id = current_aircraft_id
+        self._last_frame_boundary = panel_boundaries
+        self._count_ocr(record['ocr_kind'])
+
+        context.aircraft_manager.add_panel_to_aircraft(current_aircraft_id, self._latest_ocr)
+
+    def get_annotation(self):
+        """
+        Returns everything that would be drawn for the most recently processed frame,
+        for writers that store the annotations instead of burning them into the video.
+
+        Returns:
+            dict: 'panel_boundary_x', 'selected_id', 'map_texts' and 'aircrafts' (the tracked Aircraft objects).
+        """
+        return {
+            'panel_boundary_x': self._last_frame_boundary,
+            'selected_id': self._last_selected_id,
+            'map_texts': self.context.map_label_registry.get_labels(),
+            'aircrafts': self.context.aircraft_manager.get_all_aircrafts(),
+        }
+
+    def get_state(self):
+        """
+        Returns the state of the pipeline between two frames, for run checkpoints: the OCR bookkeeping
+        of this class and the stateful components in config (tracker, map labels, panel boundary).
+        The state of the YOLO tracker is included on a best effort basis.
+        """
+        return {
+            'frame_index': self.frame_index,
+            'ocr_staleness': self.ocr_staleness,
+            'latest_ocr': self._latest_ocr,
+            'last_panel_boundary': self._last_panel_boundary,
+            'last_selected_id': self._last_selected_id,
+            'last_frame_boundary': self._last_frame_boundary,
+            'aircraft_manager': self.context.aircraft_manager,
+            'map_label_registry': self.context.map_label_registry,
+            'boundary_tracker': self.context.ocr_processor.boundary_tracker,
+            'detector_tracker': self.context.detector.get_tracker_state(),
+        }
+
+    def restore_state(self, state):
+        """
+        Restores a state returned by get_state, so that processing continues with the next frame.
+        """
+        self.frame_index = state['frame_index']
+        self.ocr_staleness = state['ocr_staleness']
+        self._latest_ocr = state['latest_ocr']
+        self._last_panel_boundary = state['last_panel_boundary']
+        self._last_selected_id = state['last_selected_id']
+        self._last_frame_boundary = state['last_frame_boundary']
+        self.context.aircraft_manager = state['aircraft_manager']
+        self.context.map_label_registry = state['map_label_registry']
+        self.context.ocr_processor.boundary_tracker = state['boundary_tracker']
+        self.context.detector.set_tracker_state(state['detector_tracker'])
+
+    def close(self):
+        """
+        Stops the background OCR worker. Call once after the last frame.
+        """
+        if self.ocr_service is not None:
+            self.ocr_service.shutdown()
+            self.ocr_service = None
+
+    def _count_ocr(self, ocr_kind):
+        if ocr_kind == InferenceCache.OCR_NONE:
+            self.ocr_cache_hits += 1
+        else:
+            self.ocr_cache_misses += 1
+
+    def _ocr_is_due(self, panel_boundary_x):
+        """
+        Decides whether the OCR passes have to run for the current frame.
+        """
+        if self._latest_ocr is None:
+            return True  # Nothing to serve yet.
+        if panel_boundary_x != self._last_panel_boundary:
+            return True  # The panel appeared, disappeared or moved.
+        if self.context.map_label_registry.needs_refresh:
+            return True  # The map was zoomed or replaced, so its labels have to be read again.
+        return self.ocr_staleness + 1 >= self.ocr_interval
+
+    def _start_ocr(self, frame, panel_boundary_x):
+        """
+        Starts both OCR passes for the current frame, in the background if the OCR service is enabled.
+        """
+        if self.ocr_service is not None:
+            self.ocr_service.submit(self.frame_index, frame, panel_boundary_x)
+        else:
+            self._pending_ocr = self.context.ocr_processor.process_image_with_boundary(frame, panel_boundary_x)
+
+    def _finish_ocr(self, panel_boundary_x):
+        """
+        Collects the OCR results of the current frame, stores the panel data as the latest one
+        and merges the map texts into the map label registry.
+        """
+        if self.ocr_service is not None:
+            ocr_results, _, map_texts = self.ocr_service.result(self.frame_index)
+        else:
+            ocr_results, _, map_texts = self._pending_ocr
+            self._pending_ocr = None
+        if self.recorder is not None:
+            self._ocr_record = (ocr_results.raw_data if ocr_results is not None else None, map_texts)
+        self._store_ocr(ocr_results, map_texts, panel_boundary_x)
+
+    def _store_ocr(self, ocr_results, map_texts, panel_boundary_x):
+        self._latest_ocr = ocr_results
+        self.context.map_label_registry.update(map_texts)
+        self._last_panel_boundary = panel_boundary_x
+        self.ocr_staleness = 0
+
+    @staticmethod
+    def _decode_ocr(ocr):
+        """
+        Returns (PanelData or None, map texts) of a recorded OCR pass.
+        """
+        panel_data, map_texts = ocr
+        return (PanelData(panel_data) if panel_data is not None else None), map_texts
@@ -0,0 +1,97 @@
+import time
+
+from Telemetry import StageProfiler
+
+
+class LiveScheduler:
+    """
+    Keeps a live run within its per-frame deadline: it decides for every frame how much of the pipeline runs,
+    from the end-to-end latency (capture to written results) of the frames before it, and keeps the latency and
+    drop statistics of the run. The latencies are kept in a histogram with the logarithmic buckets of the stage
+    profiler, so the statistics take constant memory and time however long the source runs.
+
+    When a frame misses the deadline, the next frames are degraded one level at a time: first the OCR passes are
+    skipped (the latest OCR results are served), then the rendering of the annotated frame as well. When the
+    latency is back below `recover_ratio` of the deadline, the levels are restored one at a time. A frame that
+    is already late when its processing starts skips OCR right away. Frames that arrive while the pipeline is
+    busy are dropped by the source (see Video.LiveSource).
+    """
+
+    # The degradation levels: (name, skip OCR, skip rendering)
+    LEVELS = [('full', False, False), ('no_ocr', True, False), ('no_ocr_no_render', True, True)]
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, deadline_s, recover_ratio=0.7):
+        """
+        Args:
+            deadline_s (float): The time the results of a frame may take from its capture, in seconds.
+            recover_ratio (float): A level is restored when the latency is below this share of the deadline.
+        """
+        self.deadline_s = deadline_s
+        self.recover_ratio = recover_ratio
+        self.level = 0
+        self.latencies = StageProfiler.histogram()  # End-to-end latencies of the processed frames in seconds
+        self.deadline_misses = 0
+        self.level_frames = [0] * len(self.LEVELS)  # Processed frames per degradation level
+
+    def plan(self, capture_time):
+        """
+        Returns what to skip on the next frame.
+
+        Args:
+            capture_time (float): The time.perf_counter() value at which the frame was captured.
+
+        Returns:
+            tuple: (skip_ocr, skip_render).
+        """
+        level = self.level
+        if level == 0 and time.perf_counter() - capture_time > self.deadline_s:
+            level = 1  # Already late: at least do not wait for OCR.
+        self.level_frames[level] += 1
+        _, skip_ocr, skip_render = self.LEVELS[level]
+        return skip_ocr, skip_render
+
+    def frame_done(self, capture_time):
+        """
+        Records the latency of a frame whose results were written, and adapts the degradation level.
+
+        Returns:
+            float: The end-to-end latency of the frame in seconds.
+        """
+        latency = time.perf_counter() - capture_time
+        self.latencies.add(latency)
+        if latency > self.deadline_s:
+            self.deadline_misses += 1
+            self.level = min(self.level + 1, len(self.LEVELS) - 1)
+        elif latency < self.deadline_s * self.recover_ratio:
+            self.level = max(self.level - 1, 0)
+        return latency
+
+    def summary(self, source_stats=None):
+        """
+        Returns the statistics of the run as a JSON serializable dict: the deadline, the end-to-end latency (mean,
+        50/90/99th percentile with the resolution of a histogram bucket, and maximum in milliseconds), the deadline misses, the processed frames per
+        degradation level, the current level and, with the frame counts of the source (see LiveSource.stats),
+        the dropped frames.
+        """
+        latencies = self.latencies
+        frames = latencies.count
+        summary = {
+            'deadline_ms': round(self.deadline_s * 1000, 3),
+            'frames': frames,
+            'latency_mean_ms': round(latencies.total / frames * 1000, 3) if frames else None,
+        }
+        for q in self.QUANTILES:
+            summary[f'latency_p{int(q * 100)}_ms'] = round(latencies.quantile(q) * 1000, 3) if frames else None
+        summary.update({
+            'latency_max_ms': round(latencies.max * 1000, 3) if frames else None,
+            'deadline_misses': self.deadline_misses,
+            'deadline_miss_rate': round(self.deadline_misses / frames, 4) if frames else None,
+            'levels': {name: count for (name, _, _), count in zip(self.LEVELS, self.level_frames)},
+            'level': self.level,
+        })
+        if source_stats is not None:
+            offered = source_stats['frames_offered']
+            summary.update(source_stats)
+            summary['drop_rate'] = round(source_stats['frames_dropped'] / offered, 4) if offered else None
+        return summary
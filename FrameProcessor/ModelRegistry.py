@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+import config
+from ImageProcessor import yolov12, OCRProcessor
+
+
+class ModelRegistry:
+    """
+    The loaded models of a process, keyed by model kind, model file and backend (device).
+
+    Models are loaded on the first request and warmed up with one inference, so the first frame of a run is as
+    fast as the others. Later requests for the same model file and device get the loaded model; a model file
+    that changed on disk (e.g. after training) is loaded again. The models are only read during inference, so
+    the pipeline contexts share them (see PipelineContext.from_config).
+
+    The Streamlit app keeps its registry across reruns with st.cache_resource, and the job workers keep theirs
+    for their whole life, so the models are loaded once per process.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, warm_up=True):
+        """
+        Args:
+            warm_up (bool): Runs one inference on every model after loading it.
+        """
+        self.warm_up = warm_up
+        # (kind, source, device) -> (version of the source file, model). Guarded by _lock.
+        self._models = {}
+        self._lock = threading.Lock()
+        self._preload_thread = None
+
+    @classmethod
+    def default(cls):
+        """Returns the registry of this process."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(warm_up=config.model_warm_up)
+            return cls._default
+
+    @staticmethod
+    def resolve_device(device=None):
+        """
+        Returns the device to run the models on: the given one, or 'cuda' when it is available and 'cpu' otherwise.
+        """
+        if device:
+            return device
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    def detector(self, model_path, device=None):
+        """
+        Returns the loaded YOLO detector of the model file. Use share() to get a detector with its own tracker.
+        """
+        device = self.resolve_device(device)
+        return self._get('yolov12', model_path, device, lambda: yolov12(model_path, device))
+
+    def ocr_processor(self, panel_layout_path=None, device=None):
+        """
+        Returns the loaded OCR processor with the given panel layout. Use share() to get one with its own
+        panel boundary tracker.
+        """
+        device = self.resolve_device(device)
+        return self._get('ocr', panel_layout_path, device,
+                         lambda: OCRProcessor(panel_layout_path=panel_layout_path, gpu=device.startswith('cuda')))
+
+    def preload(self, model_path, panel_layout_path=None, device=None):
+        """
+        Loads the detector and the OCR processor in a background thread, so they are ready when a run starts.
+        Does nothing while an earlier preload is still running.
+        """
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return
+
+        def load():
+            try:
+                self.detector(model_path, device)
+                self.ocr_processor(panel_layout_path, device)
+            except Exception as e:
+                print(f"Warning: The models could not be preloaded: {e}")
+
+        self._preload_thread = threading.Thread(target=load, daemon=True)
+        self._preload_thread.start()
+
+    def _get(self, kind, source, device, loader):
+        key = (kind, os.path.abspath(source) if source else None, device)
+        version = self._file_version(key[1])
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            start_time = time.perf_counter()
+            model = loader()
+            if self.warm_up:
+                model.warm_up()
+            print(f"The {kind} model ({source or 'default'}) was loaded on '{device}' "
+                  f"in {time.perf_counter() - start_time:.1f} s.")
+            self._models[key] = (version, model)
+            return model
+
+    @staticmethod
+    def _file_version(path):
+        if path is None or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
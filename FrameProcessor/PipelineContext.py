@@ -0,0 +1,62 @@
+import config
+from FrameProcessor.ModelRegistry import ModelRegistry
+from ImageProcessor import FindCurrentAircraft, FrameCreator, MapLabelRegistry
+from Objects.AircraftManager import AircraftManager
+from Telemetry import StageProfiler
+
+
+class PipelineContext:
+    """
+    Holds the components of one video run: the detector, the OCR processor, the aircraft manager (tracker),
+    the map label registry, the current aircraft finder, the frame renderer and the stage profiler.
+
+    FrameProcessor, Report and the writers get everything from the context they are given instead of from
+    module globals, so every run starts from a clean state and nothing leaks into the next run.
+    The heavy models (the YOLO weights and the EasyOCR reader) come from a ModelRegistry, which loads them once
+    per process: each context gets its own tracker and panel boundary tracker on top of them, so several
+    videos can be processed concurrently in one process.
+    """
+
+    def __init__(self, detector, ocr_processor, aircraft_manager, find_current_aircraft, map_label_registry,
+                 frame_creator, profiler=None):
+        """
+        Args:
+            detector (yolov12): The object detector and tracker.
+            ocr_processor (OCRProcessor): Panel boundary search and the OCR passes.
+            aircraft_manager (AircraftManager): The tracked aircraft.
+            find_current_aircraft (FindCurrentAircraft): Finds the selected aircraft.
+            map_label_registry (MapLabelRegistry): The texts read on the map.
+            frame_creator (FrameCreator): Draws the annotated frames.
+            profiler (StageProfiler or None): Times the stages of the run. A disabled profiler if None.
+        """
+        self.detector = detector
+        self.ocr_processor = ocr_processor
+        self.aircraft_manager = aircraft_manager
+        self.find_current_aircraft = find_current_aircraft
+        self.map_label_registry = map_label_registry
+        self.frame_creator = frame_creator
+        self.profiler = profiler if profiler is not None else StageProfiler(enabled=False)
+        # The OCR passes are timed inside the OCR processor (on the OCR thread when it runs in the background).
+        self.ocr_processor.profiler = self.profiler
+
+    @classmethod
+    def from_config(cls, registry=None):
+        """
+        Creates a context with the current settings in config.
+
+        Args:
+            registry (ModelRegistry or None): Where the models are loaded from. The registry of the process if None.
+        """
+        registry = registry if registry is not None else ModelRegistry.default()
+        detector = registry.detector(config.yolov12_path, config.model_device).share()
+        ocr_processor = registry.ocr_processor(config.panel_layout_path, config.model_device).share()
+        return cls(
+            detector=detector,
+            ocr_processor=ocr_processor,
+            aircraft_manager=AircraftManager(config.add_object_th, config.memory_time, config.relation_airport_th,
+                                             view_bounds=(config.l, config.u, config.r, config.d)),
+            find_current_aircraft=FindCurrentAircraft(config.current_aircraft_threshold),
+            map_label_registry=MapLabelRegistry(config.map_label_expiry),
+            frame_creator=FrameCreator(config.cls_names),
+            profiler=StageProfiler(enabled=config.profile_stages, track_memory=config.profile_memory),
+        )
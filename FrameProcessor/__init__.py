@@ -1,2 +1,5 @@
 from .FrameProcessor import FrameProcessor
-__all__ = ['FrameProcessor']
\ No newline at end of file
+from .PipelineContext import PipelineContext
+from .ModelRegistry import ModelRegistry
+from .LiveScheduler import LiveScheduler
+__all__ = ['FrameProcessor', 'PipelineContext', 'ModelRegistry', 'LiveScheduler']
\ No newline at end of file
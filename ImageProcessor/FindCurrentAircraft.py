@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import config  # For access to the global aircraft_manager
 
 
 class FindCurrentAircraft:
@@ -9,44 +8,51 @@ class FindCurrentAircraft:
     whose average pixel color is closest to the target color.
     """
 
+    # The color of the selected aircraft: a bright pink in BGR format.
+    TARGET_BGR = (103, 94, 230)
+
     def __init__(self, current_aircraft_threshold):
         """
         Initializes the finder with the target color.
         The target color is a bright pink in BGR format.
         """
-        self.target_pink_bgr = np.array([103, 94, 230], dtype=np.uint8)
+        self.target_pink_bgr = np.array(self.TARGET_BGR, dtype=np.uint8)
         self.th = current_aircraft_threshold
 
-    def find(self, image):
+    def find(self, image, all_boxes):
         """
         Finds the current aircraft on the given image by analyzing the boxes
-        obtained from config.aircraft_manager.
+        of the tracked aircraft.
 
         Args:
             image (np.ndarray): The full image in BGR format to be analyzed.
+            all_boxes (dict): Aircraft ID -> bounding box (AircraftManager.get_all_boxes).
 
         Returns:
             int or None: The ID of the aircraft with the box that best matches the
                          target color, or None if no aircraft is found.
         """
-        # 1. Get all currently tracked boxes from the AircraftManager
-        all_boxes = config.aircraft_manager.get_all_boxes()
+        return self.find_from_colors(self.box_colors(image, all_boxes.values()), all_boxes)
 
-        if not all_boxes:
-            return None
+    def box_colors(self, image, boxes):
+        """
+        Calculates the average BGR color inside each box.
 
-        best_match_id = None
-        # We are looking for the minimum color difference, so we initialize it to infinity
-        min_avg_color_diff = float('inf')
+        Args:
+            image (np.ndarray): The full image in BGR format.
+            boxes (iterable): [x1, y1, x2, y2] boxes; None entries are ignored.
 
-        # 2. Loop over each aircraft box
-        for aircraft_id, bbox in all_boxes.items():
-            if bbox is None:
+        Returns:
+            dict: tuple(box) -> average color (np.ndarray of 3 floats). Boxes outside the image are left out.
+        """
+        colors = {}
+        h, w, _ = image.shape
+        for bbox in boxes:
+            if bbox is None or tuple(bbox) in colors:
                 continue
             x1, y1, x2, y2 = map(int, bbox)
 
             # Make sure it is within the image boundaries
-            h, w, _ = image.shape
             x1, y1 = max(0, x1), max(0, y1)
             x2, y2 = min(w, x2), min(h, y2)
 
@@ -54,18 +60,43 @@ class FindCurrentAircraft:
             if x1 >= x2 or y1 >= y2:
                 continue
 
-            # 3. Crop the image area within the box (Region of Interest - ROI)
+            # Crop the image area within the box (Region of Interest - ROI) and average the B, G, R values
             roi = image[y1:y2, x1:x2]
+            colors[tuple(bbox)] = np.mean(roi, axis=(0, 1))
+        return colors
 
-            # 4. Calculate the average color of the ROI
-            # This is the average of the B, G, R values of all pixels in the box.
-            average_color_bgr = np.mean(roi, axis=(0, 1))
+    def find_from_colors(self, box_colors, all_boxes):
+        """
+        Finds the current aircraft from precomputed box colors (see box_colors), e.g. the recorded colors
+        of a replayed run. Boxes without a color are skipped.
+
+        Args:
+            box_colors (dict): tuple(box) -> average color.
+            all_boxes (dict): Aircraft ID -> bounding box (AircraftManager.get_all_boxes).
+
+        Returns:
+            int or None: The ID of the best matching aircraft, or None if no aircraft matches.
+        """
+        if not all_boxes:
+            return None
+
+        best_match_id = None
+        # We are looking for the minimum color difference, so we initialize it to infinity
+        min_avg_color_diff = float('inf')
+
+        # 1. Loop over each aircraft box
+        for aircraft_id, bbox in all_boxes.items():
+            if bbox is None:
+                continue
+            average_color_bgr = box_colors.get(tuple(bbox))
+            if average_color_bgr is None:
+                continue
 
-            # 5. Calculate the difference between the average color and the target color
+            # 2. Calculate the difference between the average color and the target color
             # We use the sum of the absolute differences between the color channels (Manhattan distance)
             color_diff = np.sum(np.abs(average_color_bgr - self.target_pink_bgr))
 
-            # 6. If this box is the best match so far, save its ID
+            # 3. If this box is the best match so far, save its ID
             if color_diff < min_avg_color_diff:
                 min_avg_color_diff = color_diff
                 best_match_id = aircraft_id
@@ -73,4 +104,4 @@ class FindCurrentAircraft:
         if float(min_avg_color_diff) < self.th:
             return best_match_id
 
-        return None
\ No newline at end of file
+        return None
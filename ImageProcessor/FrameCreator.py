@@ -1,11 +1,14 @@
 import cv2
 import numpy as np
 import random
-import config  # For access to the global aircraft_manager
 
 
 class FrameCreator:
-    def __init__(self):
+    def __init__(self, class_names):
+        """
+        Args:
+            class_names (dict): Class ID -> name, used in the box labels (config.cls_names).
+        """
         # Colors for class IDs (in BGR format)
         self.class_colors = {
             0: (255, 0, 0),  # Blue
@@ -19,12 +22,18 @@ class FrameCreator:
             8: (255, 255, 255),  # White
         }
         # Names for class IDs (update according to your YOLO model)
-        self.class_names = config.cls_names
+        self.class_names = class_names
         self.font = cv2.FONT_HERSHEY_SIMPLEX
         self.font_scale = 0.6
         self.font_thickness = 1
         self.box_thickness = 2
 
+        # Cached static layers (see create_annotated_frame).
+        self._text_size_cache = {}
+        self._static_key = None
+        self._map_layer = None  # (color, [(x1, y1, x2, y2, coverage of the rectangle)]), see _make_layer
+        self._panel_layer = None
+
     def _get_color_for_class(self, cls_id):
         """
         Gets a specific color for a class ID. If the class is new,
@@ -37,26 +46,92 @@ class FrameCreator:
             self.class_colors[cls_id] = color
         return color
 
-    def create_annotated_frame(self, frame, panel_boundary_x, map_texts, selected_aircraft_id=None):
+    def create_annotated_frame(self, frame, panel_boundary_x, map_texts, aircraft_manager, selected_aircraft_id=None):
         """
-        Creates the final display frame by drawing all annotations.
+        Creates the final display frame by drawing all annotations into the given frame, which is returned.
+        The frame is not copied: the pipeline has read everything it needs from it (detection, OCR, box colors)
+        before it is rendered. The aircraft boxes are taken from the given AircraftManager.
+
+        From bottom to top: the aircraft boxes, the map labels, the highlight of the selected aircraft and the
+        panel box. The map labels and the panel box are rasterized once into cached layers, reused while their
+        inputs stay the same, and only the rectangles they drew into are composited onto the frame.
         """
-        annotated_frame = frame.copy()
-        self._draw_all_object_boxes(annotated_frame)
-        self._draw_map_texts(annotated_frame, map_texts)
+        h, w = frame.shape[:2]
+        self._ensure_static_layers(h, w, panel_boundary_x, map_texts)
 
+        self._draw_all_object_boxes(frame, aircraft_manager)
+        self._composite(frame, self._map_layer)
         if selected_aircraft_id is not None:
-            self._highlight_selected_aircraft(annotated_frame, selected_aircraft_id)
+            self._highlight_selected_aircraft(frame, aircraft_manager, selected_aircraft_id)
+        self._composite(frame, self._panel_layer)
+        return frame
 
-        self._draw_panel_box(annotated_frame, panel_boundary_x)
+    def _text_size(self, text, font_scale, thickness):
+        """
+        Returns cv2.getTextSize for a label. Sizes are memoized per string and font setting,
+        since the same labels are measured on every frame.
+        """
+        key = (text, font_scale, thickness)
+        size = self._text_size_cache.get(key)
+        if size is None:
+            size = cv2.getTextSize(text, self.font, font_scale, thickness)
+            self._text_size_cache[key] = size
+        return size
+
+    def _ensure_static_layers(self, h, w, panel_boundary_x, map_texts):
+        """
+        Rasterizes the map labels and the panel box into cached layers.
+        They are only redrawn when the frame size, the panel boundary or the map labels change.
+        """
+        map_key = tuple((t['text'], tuple(t['box'])) for t in map_texts) if map_texts else ()
+        static_key = (h, w, panel_boundary_x, map_key)
+        if static_key == self._static_key:
+            return
+
+        self._map_layer = self._draw_map_texts(np.zeros((h, w), dtype=np.uint8), map_texts)
+        self._panel_layer = self._draw_panel_box(np.zeros((h, w), dtype=np.uint8), panel_boundary_x)
+        self._static_key = static_key
 
-        return annotated_frame
+    @staticmethod
+    def _composite(image, layer):
+        """
+        Blends a layer onto the image, rectangle by rectangle, the way OpenCV blends the anti-aliased edges of
+        what it draws.
+        """
+        color, parts = layer
+        for x1, y1, x2, y2, coverage in parts:
+            target = image[y1:y2, x1:x2]
+            target[:] = (target * (255 - coverage) + color * coverage + 127) // 255
 
-    def _draw_all_object_boxes(self, image):
+    @staticmethod
+    def _make_layer(mask, color, rects):
+        """
+        Returns a static layer: the color and, per rectangle drawn into, the coverage of its pixels (0..255).
+        A pixel that lies in several rectangles is only kept in the first one, so it is not blended twice.
+        """
+        claimed = np.zeros(mask.shape, dtype=bool)
+        parts = []
+        for x1, y1, x2, y2 in rects:
+            coverage = np.where(claimed[y1:y2, x1:x2], 0, mask[y1:y2, x1:x2])
+            claimed[y1:y2, x1:x2] = True
+            parts.append((x1, y1, x2, y2, coverage[:, :, None].astype(np.uint16)))
+        return np.array(color, dtype=np.uint16), parts
+
+    @staticmethod
+    def _clip_rect(image, x1, y1, x2, y2, pad=4):
+        """
+        Returns the rectangle, padded for the line thickness and clipped to the image, or None if it is outside.
+        """
+        h, w = image.shape[:2]
+        x1, y1 = max(0, x1 - pad), max(0, y1 - pad)
+        x2, y2 = min(w, x2 + pad + 1), min(h, y2 + pad + 1)
+        return (x1, y1, x2, y2) if x1 < x2 and y1 < y2 else None
+
+    def _draw_all_object_boxes(self, image, aircraft_manager):
         """
         Draws bounding boxes and labels for all tracked aircraft.
         """
-        all_aircrafts = config.aircraft_manager.get_all_aircrafts()
+        all_aircrafts = aircraft_manager.get_all_aircrafts()
         if not all_aircrafts:
             return
 
@@ -80,16 +155,16 @@ class FrameCreator:
             label = f"ID:{track_id} {class_name} {conf:.2f}"
 
             # Draw a background box for the text
-            (w, h), _ = cv2.getTextSize(label, self.font, self.font_scale, self.font_thickness)
+            (w, h), _ = self._text_size(label, self.font_scale, self.font_thickness)
             cv2.rectangle(image, (x1, y1 - h - 5), (x1 + w, y1), color, -1)
             # Write the text
             cv2.putText(image, label, (x1, y1 - 5), self.font, self.font_scale, (255, 255, 255), self.font_thickness)
 
-    def _highlight_selected_aircraft(self, image, selected_id):
+    def _highlight_selected_aircraft(self, image, aircraft_manager, selected_id):
         """
         Draws a special, thicker box around the currently selected aircraft.
         """
-        selected_aircraft = config.aircraft_manager.get_aircraft(selected_id)
+        selected_aircraft = aircraft_manager.get_aircraft(selected_id)
         if selected_aircraft is None or selected_aircraft.bbox is None:
             return
 
@@ -104,26 +179,40 @@ class FrameCreator:
 
     def _draw_panel_box(self, image, panel_boundary_x):
         """
-        Draws a box around the detected OCR panel area.
+        Draws a box around the detected OCR panel area into the coverage mask of a static layer.
+
+        Returns:
+            tuple: The static layer (see _make_layer) of the four sides of the box and the label.
         """
+        panel_color = (255, 255, 0)  # Cyan
         if panel_boundary_x is None:
-            return
+            return self._make_layer(image, panel_color, [])
         h = image.shape[0]
-        panel_color = (255, 255, 0)  # Cyan
+        x = int(panel_boundary_x)
         panel_thickness = 3
 
-        cv2.rectangle(image, (0, 0), (panel_boundary_x, h - 1), panel_color, panel_thickness)
-        cv2.putText(image, "PANEL", (10, 30), self.font, 1, panel_color, 2)
+        cv2.rectangle(image, (0, 0), (x, h - 1), 255, panel_thickness)
+        cv2.putText(image, "PANEL", (10, 30), self.font, 1, 255, 2)
+
+        (w, text_h), baseline = self._text_size("PANEL", 1, 2)
+        rects = [self._clip_rect(image, 0, 0, x, 0), self._clip_rect(image, 0, h - 1, x, h - 1),
+                 self._clip_rect(image, 0, 0, 0, h - 1), self._clip_rect(image, x, 0, x, h - 1),
+                 self._clip_rect(image, 10, 30 - text_h, 10 + w, 30 + baseline)]
+        return self._make_layer(image, panel_color, [rect for rect in rects if rect is not None])
 
     def _draw_map_texts(self, image, map_texts):
         """
-        Draws the text detected on the map area of the screen with a pale color.
-        """
-        if not map_texts:
-            return
+        Draws the text detected on the map area of the screen into the coverage mask of a static layer.
 
+        Returns:
+            tuple: The static layer (see _make_layer) of the labels.
+        """
         # A pale and non-prominent color (light gray in BGR format)
         pale_color = (180, 180, 180)
+        rects = []
+        if not map_texts:
+            return self._make_layer(image, pale_color, rects)
+
         map_font_scale = 0.5
         map_font_thickness = 1
 
@@ -133,4 +222,10 @@ class FrameCreator:
             x1, y1, x2, y2 = box
 
             # Print the text at the top-left corner of the box
-            cv2.putText(image, text, (x1, y1 - 5), self.font, map_font_scale, pale_color, map_font_thickness)
\ No newline at end of file
+            cv2.putText(image, text, (x1, y1 - 5), self.font, map_font_scale, 255, map_font_thickness)
+
+            (w, h), baseline = self._text_size(text, map_font_scale, map_font_thickness)
+            rect = self._clip_rect(image, int(x1), int(y1) - 5 - h, int(x1) + w, int(y1) - 5 + baseline)
+            if rect is not None:
+                rects.append(rect)
+        return self._make_layer(image, pale_color, rects)
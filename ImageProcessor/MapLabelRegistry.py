@@ -0,0 +1,234 @@
+import math
+
+import cv2
+import numpy as np
+
+from ImageProcessor.SpatialGrid import SpatialGrid
+
+
+class MapLabelRegistry:
+    """
+    Keeps the texts read on the map (airport codes, place names) across frames.
+
+    Map labels are static for a given pan/zoom, so instead of rebuilding them on every OCR pass
+    the registry merges new readings into persistent entries, accumulates their confidence and
+    expires entries that are not confirmed any more. Pans are detected with phase correlation on a
+    downscaled copy of the map and applied to all entries; a zoom or a scene cut (low correlation
+    response) clears the registry and asks for a fresh OCR pass. A map without texture (e.g. open water)
+    also gives a low response, so a map that did not change is kept as it is.
+    """
+
+    # Outcomes of a motion measurement (see track_motion and apply_motion)
+    MOTION_NONE = 0  # Nothing to do (first frame, or the shift could not be measured)
+    MOTION_CLEAR = 1  # The map region changed, was zoomed or replaced: the labels are dropped
+    MOTION_SHIFT = 2  # The map was panned by (dx, dy)
+
+    def __init__(self, expiry_frames=60, match_distance=25.0, min_shift_response=0.2, downscale=4,
+                 still_difference=2.0):
+        """
+        Args:
+            expiry_frames (int): Processed frames after which a label that was not read again is dropped.
+            match_distance (float): Max center distance (px) for a new reading to confirm an existing label.
+            min_shift_response (float): Phase correlation responses below this mean the map was zoomed or replaced.
+            downscale (int): Factor by which the map is shrunk before the phase correlation.
+            still_difference (float): Mean absolute gray level difference to the previous map below which a low
+                                      response means an unchanged (uniform) map, not a zoom or a scene change.
+        """
+        self.expiry_frames = expiry_frames
+        self.match_distance = match_distance
+        self.min_shift_response = min_shift_response
+        self.downscale = max(1, downscale)
+        self.still_difference = still_difference
+
+        self.labels = []  # Each entry: {'text', 'box', 'confidence', 'hits', 'last_seen'}
+        self.frame_index = 0
+        self.version = 0  # Incremented on every change, so that users can cache lookups.
+        self.needs_refresh = True  # True until the first OCR pass, and after every zoom/scene change.
+
+        self._prev_map = None
+        self._prev_key = None
+        self._window = None
+        self._grid = None
+        self.last_motion = None  # The motion of the last track_motion call, recorded for replays.
+
+    def track_motion(self, image, panel_boundary_x):
+        """
+        Measures the global shift of the map since the previous frame and moves all labels with it.
+        Call once per processed frame, before the registry is used.
+
+        Args:
+            image (np.ndarray): The full frame in BGR format.
+            panel_boundary_x (int or None): The panel boundary; the map is everything to its right.
+
+        Returns:
+            tuple or None: The (dx, dy) shift in pixels, or None if it could not be measured.
+        """
+        motion = self._measure_motion(image, panel_boundary_x)
+        self.last_motion = motion
+        self.apply_motion(motion)
+        return (motion[1], motion[2]) if motion[0] == self.MOTION_SHIFT else None
+
+    def apply_motion(self, motion):
+        """
+        Advances the registry by one frame with a measured motion. track_motion calls it with the live
+        measurement; a replayed run calls it with the recorded `last_motion` of each frame, without images.
+
+        Args:
+            motion (tuple): (outcome, dx, dy, image width, image height, map offset).
+        """
+        self.frame_index += 1
+        self._expire()
+
+        outcome, dx, dy, img_w, img_h, offset = motion
+        if outcome == self.MOTION_CLEAR:
+            self.clear()
+        elif outcome == self.MOTION_SHIFT and (abs(dx) >= 1 or abs(dy) >= 1):
+            self._shift(dx, dy, img_w, img_h, offset)
+
+    def _measure_motion(self, image, panel_boundary_x):
+        """
+        Returns the motion tuple of apply_motion for the current frame.
+        """
+        offset = panel_boundary_x if panel_boundary_x is not None else 0
+        img_h, img_w = image.shape[:2]
+        small = self._prepare_map(image[:, offset:])
+        key = (offset, small.shape)
+        prev_map, prev_key = self._prev_map, self._prev_key
+        self._prev_map, self._prev_key = small, key
+
+        if prev_map is None or prev_key != key:
+            # The map region itself changed (e.g. the panel moved). Old positions can not be trusted.
+            outcome = self.MOTION_CLEAR if prev_map is not None else self.MOTION_NONE
+            return outcome, 0.0, 0.0, img_w, img_h, offset
+
+        difference = cv2.norm(prev_map, small, cv2.NORM_L1) / small.size
+        # phaseCorrelate applies the window to its inputs in place; the kept map must stay unwindowed.
+        (dx, dy), response = cv2.phaseCorrelate(prev_map, small.copy(), self._window)
+        if response < self.min_shift_response:
+            if difference < self.still_difference:
+                # A uniform map has no peak to correlate, but it did not change either.
+                return self.MOTION_NONE, 0.0, 0.0, img_w, img_h, offset
+            # Zoom or scene change: the labels are somewhere else now.
+            return self.MOTION_CLEAR, 0.0, 0.0, img_w, img_h, offset
+
+        return self.MOTION_SHIFT, dx * self.downscale, dy * self.downscale, img_w, img_h, offset
+
+    def update(self, map_texts):
+        """
+        Merges the results of a map OCR pass into the registry.
+
+        Args:
+            map_texts (list): OCR items with 'text', 'confidence' and 'box' ([x1, y1, x2, y2]).
+        """
+        self._build_grid()
+        matched = set()
+        for text_info in map_texts:
+            entry_index = self._find_match(text_info, matched)
+            if entry_index is None:
+                self.labels.append({
+                    'text': text_info['text'],
+                    'box': list(text_info['box']),
+                    'confidence': float(text_info['confidence']),
+                    'hits': 1,
+                    'last_seen': self.frame_index,
+                })
+                continue
+            matched.add(entry_index)
+            entry = self.labels[entry_index]
+            # Confidence accumulates as a running mean over all readings of the label.
+            entry['confidence'] = (entry['confidence'] * entry['hits'] + float(text_info['confidence'])) / (entry['hits'] + 1)
+            entry['hits'] += 1
+            entry['box'] = list(text_info['box'])
+            entry['last_seen'] = self.frame_index
+
+        self.needs_refresh = False
+        self._changed()
+
+    def clear(self):
+        """Drops all labels and asks for a fresh OCR pass."""
+        self.labels = []
+        self.needs_refresh = True
+        self._changed()
+
+    def get_labels(self):
+        """
+        Returns the current labels in the same structure as the map OCR results.
+        """
+        return [{'text': e['text'], 'confidence': e['confidence'], 'box': [int(round(v)) for v in e['box']]}
+                for e in self.labels]
+
+    def find_nearest(self, point, max_distance):
+        """
+        Returns the text of the label whose center is closest to the point, if it is within max_distance.
+        """
+        if not self.labels or point is None:
+            return None
+        self._build_grid()
+        x, y = point
+        best_text = None
+        best_distance = max_distance
+        for i in self._grid.query(x - max_distance, y - max_distance, x + max_distance, y + max_distance):
+            cx, cy = self._center(self.labels[i]['box'])
+            distance = math.hypot(cx - x, cy - y)
+            if distance < best_distance:
+                best_distance = distance
+                best_text = self.labels[i]['text']
+        return best_text
+
+    def _prepare_map(self, map_image):
+        gray = cv2.cvtColor(map_image, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        small = cv2.resize(gray, (max(1, w // self.downscale), max(1, h // self.downscale)),
+                           interpolation=cv2.INTER_AREA).astype(np.float32)
+        if self._window is None or self._window.shape != small.shape:
+            self._window = cv2.createHanningWindow((small.shape[1], small.shape[0]), cv2.CV_32F)
+        return small
+
+    def _shift(self, dx, dy, img_w, img_h, min_x):
+        """Moves every label by (dx, dy) and drops the ones that left the map."""
+        kept = []
+        for entry in self.labels:
+            x1, y1, x2, y2 = entry['box']
+            box = [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+            if box[2] < min_x or box[0] > img_w or box[3] < 0 or box[1] > img_h:
+                continue
+            entry['box'] = box
+            kept.append(entry)
+        self.labels = kept
+        self._changed()
+
+    def _expire(self):
+        alive = [e for e in self.labels if self.frame_index - e['last_seen'] <= self.expiry_frames]
+        if len(alive) != len(self.labels):
+            self.labels = alive
+            self._changed()
+
+    def _find_match(self, text_info, matched):
+        cx, cy = self._center(text_info['box'])
+        d = self.match_distance
+        best_index = None
+        best_distance = d
+        for i in self._grid.query(cx - d, cy - d, cx + d, cy + d):
+            entry = self.labels[i]
+            if i in matched or entry['text'] != text_info['text']:
+                continue
+            ex, ey = self._center(entry['box'])
+            distance = math.hypot(ex - cx, ey - cy)
+            if distance < best_distance:
+                best_distance = distance
+                best_index = i
+        return best_index
+
+    def _changed(self):
+        self.version += 1
+        self._grid = None
+
+    def _build_grid(self):
+        if self._grid is None:
+            self._grid = SpatialGrid()
+            for i, entry in enumerate(self.labels):
+                self._grid.insert(i, entry['box'])
+
+    @staticmethod
+    def _center(box):
+        return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
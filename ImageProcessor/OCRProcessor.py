@@ -1,9 +1,10 @@
-import re
+import copy
 
-import cv2
 import numpy as np
-import easyocr
 from Objects import PanelData
+from ImageProcessor.PanelBoundaryTracker import PanelBoundaryTracker
+from ImageProcessor.PanelLayout import PanelLayout
+from Telemetry import StageProfiler
 
 
 class OCRProcessor:
@@ -13,26 +14,82 @@ class OCRProcessor:
     positional logic to parse the text into key-value pairs.
     """
 
-    def __init__(self, languages=['en']):
+    def __init__(self, languages=['en'], panel_layout_path=None, gpu=True):
         """
         Initializes the OCRProcessor.
+
+        Args:
+            languages (list): Languages for the EasyOCR reader.
+            panel_layout_path (str or None): A JSON panel layout template. The built-in layout is used if None.
+            gpu (bool): Runs the EasyOCR reader on the GPU (EasyOCR falls back to the CPU without CUDA).
         """
+        # EasyOCR imports torch, so it is only imported when the reader is created.
+        import easyocr
+
         print("Initializing OCRProcessor: Loading EasyOCR model...")
-        self.reader = easyocr.Reader(languages, gpu=True)
+        self.reader = easyocr.Reader(languages, gpu=gpu)
 
         # The threshold value is set to a more reasonable level.
         # This value specifies how "strong" an edge must be to be considered
         # a panel boundary (normalized value).
         self.PANEL_EDGE_STRENGTH_THRESHOLD = 65  # You can test with a value between 60-80.
+        # The boundary almost never moves, so it is tracked across frames instead of searched from scratch.
+        self.boundary_tracker = PanelBoundaryTracker(self.PANEL_EDGE_STRENGTH_THRESHOLD)
+        # The panel layout template is compiled once and reused for every frame.
+        self.panel_layout = PanelLayout.from_json(panel_layout_path) if panel_layout_path else PanelLayout()
+        # Times the OCR passes; replaced by the profiler of the pipeline context (see PipelineContext).
+        self.profiler = StageProfiler(enabled=False)
 
         print("EasyOCR model loaded successfully.")
 
+    def warm_up(self):
+        """
+        Runs the detector and the recognizer of the reader once on a small blank image.
+        """
+        self.reader.readtext(np.zeros((64, 256, 3), dtype=np.uint8))
+
+    def share(self):
+        """
+        Returns an OCRProcessor that uses the same EasyOCR reader and panel layout, but tracks the panel
+        boundary on its own, so that it can be used by another pipeline context at the same time.
+        """
+        other = copy.copy(self)
+        other.boundary_tracker = PanelBoundaryTracker(self.PANEL_EDGE_STRENGTH_THRESHOLD)
+        return other
+
     def process_image(self, image):
-        # 1. Split the image into a panel and a map. If it fails, it returns panel_boundary_x = None.
-        panel_image, map_image, panel_boundary_x = self._split_image_into_panel_and_map(image)
+        # 1. Find the panel boundary. If it fails, panel_boundary_x = None.
+        panel_boundary_x = self.find_panel_boundary(image)
+
+        # 2. Run both OCR passes against the boundary that was just found.
+        return self.process_image_with_boundary(image, panel_boundary_x)
+
+    def find_panel_boundary(self, image):
+        """
+        Runs only the (cheap) panel boundary search, without any OCR.
+
+        Args:
+            image (np.ndarray): The full frame in BGR format.
+
+        Returns:
+            int or None: The x coordinate of the panel boundary, or None if no panel was found.
+        """
+        _, _, panel_boundary_x = self._split_image_into_panel_and_map(image)
+        return panel_boundary_x
+
+    def process_image_with_boundary(self, image, panel_boundary_x):
+        """
+        Runs the panel and map OCR passes for an already known panel boundary.
+
+        Returns:
+            tuple: (PanelData, panel_boundary_x, map_ocr_results)
+        """
+        # 1. Split the image into a panel and a map using the given boundary.
+        panel_image, map_image = self._crop_panel_and_map(image, panel_boundary_x)
 
         # 2. Always extract text from the map (whether a panel is found or not).
-        map_ocr_results = self._extract_text_from_map(map_image, panel_boundary_x)
+        with self.profiler.stage('map_ocr'):
+            map_ocr_results = self._extract_text_from_map(map_image, panel_boundary_x)
 
         # 3. If the panel was not found (panel_image is None),
         # return with an empty panel object and ONLY the map results.
@@ -40,7 +97,8 @@ class OCRProcessor:
             return self._create_panel_data_object({}), None, map_ocr_results
 
         # 4. If a panel was found, extract and process the text from the panel.
-        structured_ocr_results = self._extract_text_from_panel(panel_image)
+        with self.profiler.stage('panel_ocr'):
+            structured_ocr_results = self._extract_text_from_panel(panel_image)
 
         if not structured_ocr_results:
             return self._create_panel_data_object({}), panel_boundary_x, map_ocr_results
@@ -59,32 +117,17 @@ class OCRProcessor:
         """
         Uses an "edge strength" threshold for the panel boundary.
         If the strongest edge is below this threshold, it returns None as the panel boundary.
+        The full-frame Canny search only runs when the tracked boundary can not be re-validated.
         """
-        panel_boundary_x = None  # Initial value is None
-        img_h, img_w = original_image.shape[:2]
-
-        try:
-            gray = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            edges = cv2.Canny(blurred, 50, 150)
-
-            search_x_limit = min(img_w, int(img_w * 0.65))
-            vertical_projection = np.sum(edges[:, :search_x_limit], axis=0)
-
-            if vertical_projection.size > 0:
-                range_start = int(img_w * 0.15)
-                range_end = int(img_w * 0.55)
-                if range_end > range_start and range_end <= vertical_projection.size:
-                    best_x_candidate = np.argmax(vertical_projection[range_start:range_end]) + range_start
-                    peak_strength = vertical_projection[best_x_candidate]
-                    normalized_strength = peak_strength / img_h
-
-                    if normalized_strength >= self.PANEL_EDGE_STRENGTH_THRESHOLD:
-                        panel_boundary_x = best_x_candidate
+        panel_boundary_x = self.boundary_tracker.update(original_image)
 
-        except Exception as e:
-            print(f"Error during panel detection: {e}")
+        panel_image, map_image = self._crop_panel_and_map(original_image, panel_boundary_x)
+        return panel_image, map_image, panel_boundary_x
 
+    def _crop_panel_and_map(self, original_image, panel_boundary_x):
+        """
+        Crops the panel and map regions for a given boundary. The map is the whole image when there is no panel.
+        """
         if panel_boundary_x is not None:
             panel_image = original_image[:, 0:panel_boundary_x]
             map_image = original_image[:, panel_boundary_x:]
@@ -92,7 +135,7 @@ class OCRProcessor:
             panel_image = None
             map_image = original_image
 
-        return panel_image, map_image, panel_boundary_x
+        return panel_image, map_image
 
     def _extract_text_from_map(self, map_image, panel_offset_x):
         """
@@ -150,159 +193,11 @@ class OCRProcessor:
 
     def _parse_ocr_results(self, all_ocr_items_ref):
         """
-        Parses the structured OCR results using an improved logic.
-        This function utilizes text patterns, keywords, and both vertical and
-        horizontal positional logic to build a structured dictionary of flight data.
+        Parses the structured OCR results with the compiled panel layout template.
+        The template describes text patterns, label anchors and the regions where their values are searched,
+        so other panel layouts only need a different template.
         """
-
-        # --- Helper Functions (Adapted from your existing code) ---
-        def get_box_center_y(box):
-            return int(np.mean([p[1] for p in box]))
-
-        def get_box_min_x(box):
-            return min(p[0] for p in box)
-
-        def get_box_max_x(box):
-            return max(p[0] for p in box)
-
-        def get_box_min_y(box):
-            return min(p[1] for p in box)
-
-        def get_box_height(box):
-            return max(p[1] for p in box) - min(p[1] for p in box)
-
-        # --- NEW and Improved Value-Finding Function ---
-        def find_value_for_label(label_item, all_items, processed_indices,
-                                 search_below=True, search_right=True,
-                                 max_x_distance=150, y_tolerance_ratio=0.8, x_buffer=5):
-            """
-            Finds the most likely value located below or to the right of a given label.
-            """
-            label_box = label_item['box']
-            label_cy = get_box_center_y(label_box)
-            label_cx = (get_box_min_x(label_box) + get_box_max_x(label_box)) / 2
-            label_max_x = get_box_max_x(label_box)
-            label_max_y = max(p[1] for p in label_box)
-            label_height = get_box_height(label_box)
-
-            best_candidate = None
-            min_distance = float('inf')
-
-            for idx, item in enumerate(all_items):
-                if idx in processed_indices or item is label_item:
-                    continue
-
-                item_box = item['box']
-                item_cy = get_box_center_y(item_box)
-                item_cx = (get_box_min_x(item_box) + get_box_max_x(item_box)) / 2
-                item_min_x = get_box_min_x(item_box)
-                item_min_y = get_box_min_y(item_box)
-
-                # 1. Search for a value below the label
-                if search_below and item_min_y > label_max_y and abs(item_cx - label_cx) < 70:
-                    distance = item_min_y - label_max_y
-                    if distance < min_distance and distance < 50:  # Vertical distance limit
-                        min_distance = distance
-                        best_candidate = item
-
-                # 2. Search for a value to the right (only if a better candidate below was not found)
-                if search_right and item_min_x > (label_max_x + x_buffer) and abs(item_cy - label_cy) < (
-                        label_height * y_tolerance_ratio + 10):
-                    distance_x = item_min_x - label_max_x
-                    if distance_x < max_x_distance and distance_x < min_distance:
-                        min_distance = distance_x
-                        best_candidate = item
-
-            return best_candidate
-
-        # --- Main Parsing Logic ---
-
-        # Structure to store the extracted data
-        extracted_data = {
-            "flight_info": {
-                "flight_number": None,
-                "airline": None,
-                "departure_code": None,
-                "arrival_code": None,
-                "departure_city": None,
-                "arrival_city": None,
-            },
-            "aircraft_details": {
-                "type": None,
-                "registration": None,
-                "country_of_reg": None,
-                "category": None
-            },
-            "unassigned_texts": []
-        }
-
-        processed_items_indices = set()
-        all_results_with_indices = list(enumerate(all_ocr_items_ref))
-
-        # 1. Find specific patterns first, like Flight Number, Airline, and Airport Codes, using regex
-        airport_codes = []
-        for i, item in all_results_with_indices:
-            text = item['text']
-            # Flight Number (e.g., VY1872)
-            if re.match(r'^[A-Z]{2}\d{3,4}$', text) and not extracted_data["flight_info"]["flight_number"]:
-                extracted_data["flight_info"]["flight_number"] = text
-                processed_items_indices.add(i)
-            # Airline
-            elif 'vueling' in text.lower():
-                extracted_data["flight_info"]["airline"] = "Vueling"
-                processed_items_indices.add(i)
-            # Airport Codes (3 uppercase letters) within a specific vertical range
-            elif re.match(r'^[A-Z]{3}$', text) and 250 < get_box_center_y(item['box']) < 320:
-                airport_codes.append(item)
-                processed_items_indices.add(i)
-            # Airport Names
-            elif 'barcelona' in text.lower():
-                extracted_data["flight_info"]["departure_city"] = "BARCELONA"
-                processed_items_indices.add(i)
-            elif 'copenhagen' in text.lower():
-                extracted_data["flight_info"]["arrival_city"] = "COPENHAGEN"
-                processed_items_indices.add(i)
-
-        # Sort the found airport codes by their x-coordinate (left is departure, right is arrival)
-        if len(airport_codes) >= 2:
-            airport_codes.sort(key=lambda x: get_box_min_x(x['box']))
-            extracted_data["flight_info"]["departure_code"] = airport_codes[0]['text']
-            extracted_data["flight_info"]["arrival_code"] = airport_codes[1]['text']
-
-        # 2. Process the remaining general label-value pairs
-        labels_map = {
-            "AIRCRAFT TYPE": ("aircraft_details", "type"),
-            "REGISTRATION": ("aircraft_details", "registration"),
-            "COUNTRY OF REG": ("aircraft_details", "country_of_reg"),
-            "AIRCRAFT CATEGORY": ("aircraft_details", "category")
-        }
-
-        for label_text, (key1, key2) in labels_map.items():
-            label_item_info = None
-            for i, item in all_results_with_indices:
-                if i not in processed_items_indices and label_text.lower() in item['text'].lower():
-                    label_item_info = (i, item)
-                    break
-
-            if label_item_info:
-                label_index, label_item = label_item_info
-
-                # Search for a value both below and to the right of this label
-                value_item = find_value_for_label(label_item, all_ocr_items_ref, processed_items_indices)
-
-                if value_item:
-                    value_index = all_ocr_items_ref.index(value_item)
-                    extracted_data[key1][key2] = value_item['text']
-
-                    processed_items_indices.add(label_index)
-                    processed_items_indices.add(value_index)
-
-        # 3. Collect any remaining unassigned texts
-        for i, item in all_results_with_indices:
-            if i not in processed_items_indices:
-                extracted_data["unassigned_texts"].append(item)
-
-        return extracted_data
+        return self.panel_layout.parse(all_ocr_items_ref)
 
     def _create_panel_data_object(self, flight_data_dict):
         """
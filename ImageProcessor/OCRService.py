@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OCRService:
+    """
+    Runs the OCR passes of an OCRProcessor on a background thread so that they overlap with
+    YOLO detection. EasyOCR and torch spend most of their time in native code that releases the GIL,
+    so a thread is enough to run both at the same time.
+
+    Requests are keyed by frame index. At most `max_pending` requests can be in flight;
+    submitting more blocks until one of them has finished (a bounded queue).
+    """
+
+    def __init__(self, ocr_processor, max_pending=2):
+        """
+        Args:
+            ocr_processor (OCRProcessor): The processor whose OCR passes are run in the background.
+            max_pending (int): The maximum number of queued or running OCR requests.
+        """
+        self.ocr_processor = ocr_processor
+        # A single worker: the EasyOCR reader is not meant to be used from several threads at once.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ocr')
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._futures = {}
+
+    def submit(self, frame_index, image, panel_boundary_x):
+        """
+        Queues the OCR passes of a frame.
+
+        Args:
+            frame_index (int): The key under which the result can be collected.
+            image (np.ndarray): The full frame in BGR format. It must not be modified until the result is collected.
+            panel_boundary_x (int or None): The already known panel boundary of the frame.
+
+        Returns:
+            concurrent.futures.Future: Resolves to (PanelData, panel_boundary_x, map_ocr_results).
+        """
+        self._slots.acquire()  # Blocks while the queue is full.
+        try:
+            future = self._executor.submit(self.ocr_processor.process_image_with_boundary, image, panel_boundary_x)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures[frame_index] = future
+        return future
+
+    def pending(self):
+        """Returns the number of submitted requests whose result has not been collected yet."""
+        return len(self._futures)
+
+    def has_pending(self, frame_index):
+        """Returns True if a request was submitted for the frame and has not been collected yet."""
+        return frame_index in self._futures
+
+    def result(self, frame_index, timeout=None):
+        """
+        Waits for and returns the OCR result of a frame. Exceptions raised by the OCR passes are re-raised here.
+        """
+        future = self._futures.pop(frame_index)
+        return future.result(timeout)
+
+    def shutdown(self):
+        """Waits for the running requests and stops the worker thread."""
+        self._executor.shutdown(wait=True)
+        self._futures.clear()
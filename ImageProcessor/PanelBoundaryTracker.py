@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+
+
+class PanelBoundaryTracker:
+    """
+    Tracks the x coordinate of the side panel boundary across frames.
+
+    The full Canny search over the whole frame runs only once (or when the boundary is lost).
+    On the following frames only a narrow column band around the last known boundary is
+    re-validated, which is a small fraction of the work. Hysteresis on both the position and the
+    edge strength keeps the boundary from jittering between neighbouring columns.
+    """
+
+    def __init__(self, edge_strength_threshold, band_half_width=8, position_hysteresis=3,
+                 keep_strength_ratio=0.8, max_misses=2, retry_interval=3):
+        """
+        Args:
+            edge_strength_threshold (float): Normalized edge strength needed to accept a new boundary.
+            band_half_width (int): Half width (in pixels) of the column band re-validated on each frame.
+            position_hysteresis (int): The boundary only moves if the new peak is further away than this.
+            keep_strength_ratio (float): A known boundary is kept while its strength stays above
+                                         edge_strength_threshold * keep_strength_ratio.
+            max_misses (int): Consecutive failed validations before falling back to a full search.
+            retry_interval (int): While no panel is visible, a full search runs only every this many frames.
+        """
+        self.th = edge_strength_threshold
+        self.band_half_width = band_half_width
+        self.position_hysteresis = position_hysteresis
+        self.keep_th = edge_strength_threshold * keep_strength_ratio
+        self.max_misses = max_misses
+        self.retry_interval = max(1, retry_interval)
+
+        self.boundary_x = None
+        self._misses = 0
+        self._frames_without_panel = 0
+        self._searched_once = False
+
+    def reset(self):
+        """Forgets the tracked boundary so that the next update runs a full search."""
+        self.boundary_x = None
+        self._misses = 0
+        self._frames_without_panel = 0
+        self._searched_once = False
+
+    def update(self, image):
+        """
+        Returns the panel boundary for the given frame.
+
+        Args:
+            image (np.ndarray): The full frame in BGR format.
+
+        Returns:
+            int or None: The x coordinate of the panel boundary, or None if there is no panel.
+        """
+        if self.boundary_x is None:
+            # No panel known: search the whole frame, but not on every single frame.
+            if self._searched_once and self._frames_without_panel % self.retry_interval != 0:
+                self._frames_without_panel += 1
+                return None
+            self._searched_once = True
+            self.boundary_x = self._full_search(image)
+            self._frames_without_panel = 0 if self.boundary_x is not None else 1
+            return self.boundary_x
+
+        # 1. Cheap path: re-validate only the band around the last known boundary.
+        candidate_x, strength = self._band_search(image, self.boundary_x)
+        if candidate_x is not None and strength >= self.keep_th:
+            self._misses = 0
+            if abs(candidate_x - self.boundary_x) > self.position_hysteresis:
+                self.boundary_x = candidate_x
+            return self.boundary_x
+
+        # 2. Validation failed. Hold the boundary through short glitches (e.g. an icon over the edge).
+        self._misses += 1
+        if self._misses < self.max_misses:
+            return self.boundary_x
+
+        # 3. The boundary really moved or disappeared: fall back to a full search.
+        self._misses = 0
+        self.boundary_x = self._full_search(image)
+        self._frames_without_panel = 0 if self.boundary_x is not None else 1
+        return self.boundary_x
+
+    def _search_range(self, img_w):
+        # Same search window as the original full-frame projection.
+        return int(img_w * 0.15), int(img_w * 0.55)
+
+    def _edges(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        return cv2.Canny(blurred, 50, 150)
+
+    def _full_search(self, image):
+        """
+        Runs Canny over the whole frame and projects the edges onto the x axis.
+        """
+        img_h, img_w = image.shape[:2]
+        try:
+            range_start, range_end = self._search_range(img_w)
+            if range_end <= range_start:
+                return None
+
+            # A few extra columns so the kernels at the right end of the window see real neighbours.
+            edges = self._edges(image[:, :min(img_w, range_end + 3)])
+            vertical_projection = np.sum(edges[:, range_start:range_end], axis=0)
+            if vertical_projection.size == 0:
+                return None
+
+            best_x_candidate = int(np.argmax(vertical_projection)) + range_start
+            normalized_strength = vertical_projection[best_x_candidate - range_start] / img_h
+            if normalized_strength >= self.th:
+                return best_x_candidate
+        except Exception as e:
+            print(f"Error during panel detection: {e}")
+        return None
+
+    def _band_search(self, image, center_x):
+        """
+        Runs Canny only over a narrow column band around center_x.
+
+        Returns:
+            tuple: (best_x, normalized_strength) or (None, 0.0) if the band is empty.
+        """
+        img_h, img_w = image.shape[:2]
+        range_start, range_end = self._search_range(img_w)
+        band_start = max(range_start, center_x - self.band_half_width)
+        band_end = min(range_end, center_x + self.band_half_width + 1)
+        if band_end <= band_start:
+            return None, 0.0
+
+        # A few extra columns on both sides so the blur and Sobel kernels see the same
+        # neighbourhood as in the full-frame search.
+        pad = 3
+        crop_start = max(0, band_start - pad)
+        crop_end = min(img_w, band_end + pad)
+        try:
+            edges = self._edges(image[:, crop_start:crop_end])
+        except Exception as e:
+            print(f"Error during panel detection: {e}")
+            return None, 0.0
+
+        band_projection = np.sum(edges[:, band_start - crop_start:band_end - crop_start], axis=0)
+        best_offset = int(np.argmax(band_projection))
+        return band_start + best_offset, band_projection[best_offset] / img_h
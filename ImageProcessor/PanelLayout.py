@@ -0,0 +1,241 @@
+import json
+import re
+
+import numpy as np
+
+from ImageProcessor.SpatialGrid import SpatialGrid
+
+
+# The declarative description of the flight information panel.
+# Field paths are written as "<section>.<key>" and refer to the keys under "fields".
+DEFAULT_PANEL_LAYOUT = {
+    # The sections and keys of the parsed dictionary. Every key starts as None.
+    "fields": {
+        "flight_info": ["flight_number", "airline", "departure_code", "arrival_code",
+                        "departure_city", "arrival_city"],
+        "aircraft_details": ["type", "registration", "country_of_reg", "category"],
+    },
+    # Rules applied to each OCR item in order; the first rule that matches claims the item.
+    #   regex:       the pattern the (stripped) text must match (re.search).
+    #   ignore_case: compile the pattern case-insensitively.
+    #   field:       where to store the value. "value" overrides the stored text.
+    #   keep_first:  only match while the field is still empty.
+    #   group:       collect the item into a named group instead of storing it directly.
+    #   y_range:     exclusive (min, max) range for the vertical center of the item box.
+    "patterns": [
+        {"regex": r"^[A-Z]{2}\d{3,4}$", "field": "flight_info.flight_number", "keep_first": True},
+        {"regex": r"vueling", "ignore_case": True, "field": "flight_info.airline", "value": "Vueling"},
+        {"regex": r"^[A-Z]{3}$", "group": "airport_codes", "y_range": [250, 320]},
+        {"regex": r"barcelona", "ignore_case": True, "field": "flight_info.departure_city", "value": "BARCELONA"},
+        {"regex": r"copenhagen", "ignore_case": True, "field": "flight_info.arrival_city", "value": "COPENHAGEN"},
+    ],
+    # Grouped items are sorted by their left edge and assigned to the fields in order,
+    # but only when at least "min_items" of them were found.
+    "groups": {
+        "airport_codes": {"fields": ["flight_info.departure_code", "flight_info.arrival_code"], "min_items": 2},
+    },
+    # Label anchors (case-insensitive substrings) whose value is found next to them.
+    "labels": [
+        {"anchor": "AIRCRAFT TYPE", "field": "aircraft_details.type"},
+        {"anchor": "REGISTRATION", "field": "aircraft_details.registration"},
+        {"anchor": "COUNTRY OF REG", "field": "aircraft_details.country_of_reg"},
+        {"anchor": "AIRCRAFT CATEGORY", "field": "aircraft_details.category"},
+    ],
+    # Where a label's value is searched for, relative to the label box.
+    # A label may override any of these with its own "search_regions" entry.
+    "search_regions": {
+        "below": {"max_dy": 50, "max_center_dx": 70},
+        "right": {"max_dx": 150, "x_buffer": 5, "y_tolerance_ratio": 0.8, "y_padding": 10},
+    },
+}
+
+
+class PanelLayout:
+    """
+    Compiles a declarative panel layout template once and parses OCR results with it.
+    Label-to-value matching runs against a spatial grid over the OCR boxes, so parsing a panel is
+    linear in the number of OCR items instead of labels x items.
+    """
+
+    def __init__(self, template=None, grid_cell_size=64):
+        template = template if template is not None else DEFAULT_PANEL_LAYOUT
+        self.grid_cell_size = grid_cell_size
+        self.fields = {section: list(keys) for section, keys in template.get("fields", {}).items()}
+
+        # 1. Pattern rules: precompile every regex.
+        self.patterns = []
+        for rule in template.get("patterns", []):
+            flags = re.IGNORECASE if rule.get("ignore_case") else 0
+            y_range = rule.get("y_range")
+            self.patterns.append({
+                "regex": re.compile(rule["regex"], flags),
+                "field": self._split_field(rule["field"]) if "field" in rule else None,
+                "value": rule.get("value"),
+                "keep_first": rule.get("keep_first", False),
+                "group": rule.get("group"),
+                "y_range": tuple(y_range) if y_range else None,
+            })
+
+        self.groups = {
+            name: {"fields": [self._split_field(f) for f in group["fields"]],
+                   "min_items": group.get("min_items", len(group["fields"]))}
+            for name, group in template.get("groups", {}).items()
+        }
+
+        # 2. Label anchors: one alternation regex finds every anchor of an item in a single scan.
+        default_regions = template.get("search_regions", DEFAULT_PANEL_LAYOUT["search_regions"])
+        self.labels = []
+        alternatives = []
+        for i, label in enumerate(template.get("labels", [])):
+            regions = {name: dict(params) for name, params in default_regions.items()}
+            for name, params in label.get("search_regions", {}).items():
+                regions.setdefault(name, {}).update(params)
+            self.labels.append({"field": self._split_field(label["field"]), "regions": regions})
+            alternatives.append(f"(?P<label_{i}>{re.escape(label['anchor'])})")
+        self.anchor_regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    @classmethod
+    def from_json(cls, path):
+        """Loads a layout template from a JSON file with the same structure as DEFAULT_PANEL_LAYOUT."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _split_field(path):
+        section, key = path.split(".", 1)
+        return section, key
+
+    def _empty_result(self):
+        extracted_data = {section: {key: None for key in keys} for section, keys in self.fields.items()}
+        extracted_data["unassigned_texts"] = []
+        return extracted_data
+
+    @staticmethod
+    def _box_geometry(box):
+        """Precomputes the box measures that the parser needs (the box is a list of 4 corner points)."""
+        xs = [p[0] for p in box]
+        ys = [p[1] for p in box]
+        min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+        return {
+            "min_x": min_x, "max_x": max_x, "min_y": min_y, "max_y": max_y,
+            "cx": (min_x + max_x) / 2,
+            "cy": int(np.mean(ys)),
+            "height": max_y - min_y,
+        }
+
+    def parse(self, all_ocr_items):
+        """
+        Parses the structured OCR results of the panel into the flight data dictionary.
+
+        Args:
+            all_ocr_items (list): Items with 'text', 'confidence' and 'box' (4 corner points).
+
+        Returns:
+            dict: The parsed data, one sub-dictionary per section plus 'unassigned_texts'.
+        """
+        extracted_data = self._empty_result()
+        geometry = [self._box_geometry(item['box']) for item in all_ocr_items]
+        processed = set()
+
+        # 1. Pattern rules and label anchors, in a single pass over the items.
+        group_items = {name: [] for name in self.groups}
+        anchor_candidates = [[] for _ in self.labels]
+        for i, item in enumerate(all_ocr_items):
+            text = item['text']
+            if self._apply_patterns(i, text, geometry[i], extracted_data, group_items):
+                processed.add(i)
+                continue
+            if self.anchor_regex is not None:
+                for match in self.anchor_regex.finditer(text):
+                    anchor_candidates[int(match.lastgroup.split("_")[1])].append(i)
+
+        for name, items in group_items.items():
+            group = self.groups[name]
+            if len(items) >= group["min_items"]:
+                items.sort(key=lambda idx: geometry[idx]["min_x"])
+                for (section, key), idx in zip(group["fields"], items):
+                    extracted_data[section][key] = all_ocr_items[idx]['text']
+
+        # 2. Label-value pairs, looked up through the spatial grid.
+        grid = SpatialGrid(self.grid_cell_size)
+        for i, g in enumerate(geometry):
+            if i not in processed:
+                grid.insert(i, (g["min_x"], g["min_y"], g["max_x"], g["max_y"]))
+
+        for label, candidates in zip(self.labels, anchor_candidates):
+            label_index = next((i for i in candidates if i not in processed), None)
+            if label_index is None:
+                continue
+            value_index = self._find_value_for_label(label_index, label["regions"], geometry, grid, processed)
+            if value_index is not None:
+                section, key = label["field"]
+                extracted_data[section][key] = all_ocr_items[value_index]['text']
+                processed.add(label_index)
+                processed.add(value_index)
+
+        # 3. Collect any remaining unassigned texts
+        for i, item in enumerate(all_ocr_items):
+            if i not in processed:
+                extracted_data["unassigned_texts"].append(item)
+
+        return extracted_data
+
+    def _apply_patterns(self, index, text, geometry, extracted_data, group_items):
+        """Applies the pattern rules to one item. Returns True if a rule claimed it."""
+        for rule in self.patterns:
+            field = rule["field"]
+            if rule["keep_first"] and field is not None and extracted_data[field[0]][field[1]]:
+                continue
+            if rule["y_range"] is not None and not (rule["y_range"][0] < geometry["cy"] < rule["y_range"][1]):
+                continue
+            if not rule["regex"].search(text):
+                continue
+
+            if rule["group"] is not None:
+                group_items.setdefault(rule["group"], []).append(index)
+            elif field is not None:
+                extracted_data[field[0]][field[1]] = rule["value"] if rule["value"] is not None else text
+            return True
+        return False
+
+    def _find_value_for_label(self, label_index, regions, geometry, grid, processed):
+        """
+        Finds the most likely value located below or to the right of a given label.
+        Only the items in the grid cells of the two search regions are examined.
+        """
+        label = geometry[label_index]
+        below = regions.get("below")
+        right = regions.get("right")
+
+        candidates = set()
+        if below:
+            candidates.update(grid.query(label["cx"] - below["max_center_dx"], label["max_y"],
+                                         label["cx"] + below["max_center_dx"], label["max_y"] + below["max_dy"]))
+        if right:
+            y_tolerance = label["height"] * right["y_tolerance_ratio"] + right["y_padding"]
+            candidates.update(grid.query(label["max_x"] + right["x_buffer"], label["cy"] - y_tolerance,
+                                         label["max_x"] + right["max_dx"], label["cy"] + y_tolerance))
+
+        best_candidate = None
+        min_distance = float('inf')
+        for idx in sorted(candidates):
+            if idx in processed or idx == label_index:
+                continue
+            item = geometry[idx]
+
+            # 1. Search for a value below the label
+            if below and item["min_y"] > label["max_y"] and abs(item["cx"] - label["cx"]) < below["max_center_dx"]:
+                distance = item["min_y"] - label["max_y"]
+                if distance < min_distance and distance < below["max_dy"]:
+                    min_distance = distance
+                    best_candidate = idx
+
+            # 2. Search for a value to the right
+            if right and item["min_x"] > (label["max_x"] + right["x_buffer"]) and abs(item["cy"] - label["cy"]) < (
+                    label["height"] * right["y_tolerance_ratio"] + right["y_padding"]):
+                distance_x = item["min_x"] - label["max_x"]
+                if distance_x < right["max_dx"] and distance_x < min_distance:
+                    min_distance = distance_x
+                    best_candidate = idx
+
+        return best_candidate
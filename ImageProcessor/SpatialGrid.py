@@ -0,0 +1,44 @@
+class SpatialGrid:
+    """
+    A uniform grid index over axis-aligned boxes.
+    Each box is registered in every cell it overlaps, so a rectangular query only has to look at
+    the items in the cells the query rectangle touches instead of at every item.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> list of item indices
+
+    def _cell_range(self, x1, y1, x2, y2):
+        cs = self.cell_size
+        return int(x1 // cs), int(y1 // cs), int(x2 // cs), int(y2 // cs)
+
+    def insert(self, index, box):
+        """
+        Registers an item.
+
+        Args:
+            index (int): The identifier of the item (e.g. its index in the OCR result list).
+            box (tuple): (x1, y1, x2, y2) of the item.
+        """
+        cx1, cy1, cx2, cy2 = self._cell_range(*box)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self.cells.setdefault((cx, cy), []).append(index)
+
+    def query(self, x1, y1, x2, y2):
+        """
+        Returns the indices of all items whose cells overlap the given rectangle.
+        This is a superset of the items that really intersect it; callers apply their exact checks on top.
+
+        Returns:
+            list: The matching indices in ascending order.
+        """
+        if x2 < x1 or y2 < y1:
+            return []
+        found = set()
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return sorted(found)
@@ -2,5 +2,10 @@ from .yolov12 import yolov12
 from .FindCurrentAircraft import FindCurrentAircraft
 from .OCRProcessor import OCRProcessor
 from .FrameCreator import FrameCreator
+from .PanelBoundaryTracker import PanelBoundaryTracker
+from .PanelLayout import PanelLayout
+from .SpatialGrid import SpatialGrid
+from .OCRService import OCRService
+from .MapLabelRegistry import MapLabelRegistry
 
-__all__ = ["yolov12","FindCurrentAircraft", "OCRProcessor" , "FrameCreator"]
\ No newline at end of file
+__all__ = ["yolov12","FindCurrentAircraft", "OCRProcessor" , "FrameCreator", "PanelBoundaryTracker", "PanelLayout", "SpatialGrid", "OCRService", "MapLabelRegistry"]
\ No newline at end of file
@@ -1,21 +1,106 @@
-import torch
+import copy
+import pickle
+
+import numpy as np
 
 import config
-from ultralytics import YOLO
 
 
 class yolov12:
-    def __init__(self):
+    # The input size of the model (height, width), unless config.model_imgsz is set.
+    IMGSZ = (1088, 1920)
+
+    def __init__(self, model_path=None, device=None):
         """
         Initializes the processor by loading the YOLO model.
         The model object will hold the tracker's state.
+
+        Args:
+            model_path (str or None): The model weights. config.yolov12_path is used if None.
+            device (str or None): 'cuda', 'cpu', ... The GPU is used when it is available if None.
         """
+        # torch and ultralytics take seconds to import, so they are only imported when a model is loaded.
+        import torch
+        from ultralytics import YOLO
+
         # Load the model only once. The tracker state will be stored within this model object.
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
         print(f"YOLO modeli '{device}' üzerinde çalışacak şekilde yükleniyor.")
-        self.model = YOLO(config.yolov12_path).to(device)
+        self.model = YOLO(model_path or config.yolov12_path).to(device)
+        self._restored_tracker = None  # Tracker state waiting to be applied (see set_tracker_state).
+
+    def warm_up(self):
+        """
+        Runs one inference on a blank frame, so that the first real frame does not pay for setting up
+        the predictor (layer fusion, CUDA kernels and memory).
+        """
+        imgsz = self._imgsz()
+        self.model.predict(source=np.zeros((*imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+
+    def share(self):
+        """
+        Returns a detector that uses the same loaded weights, but has a tracker of its own.
+        The weights are only read during inference, so the detectors can be used by different
+        pipeline contexts (see FrameProcessor.PipelineContext) at the same time.
+        """
+        other = copy.copy(self)
+        other.model = copy.copy(self.model)
+        # The tracker lives in the predictor, so the copy starts without one and creates its own on the first frame.
+        other.model.predictor = None
+        # Creating the tracker registers its callbacks on the model. A shallow copy would add them to the callback
+        # lists of the shared model, so every later detector would run the tracker of every earlier one per frame.
+        other.model.callbacks = {event: list(funcs) for event, funcs in self.model.callbacks.items()}
+        other._restored_tracker = None
+        return other
 
     def find_objects(self, image):
+        results = self._track(image)
+        if self._restored_tracker is not None:
+            # The tracker only exists after the first tracked frame. It is replaced with the restored one,
+            # and the frame is tracked again so that it continues the restored tracks.
+            state, self._restored_tracker = self._restored_tracker, None
+            if self._apply_tracker_state(state):
+                results = self._track(image)
+        return results
+
+    def get_tracker_state(self):
+        """
+        Takes a snapshot of the BoT-SORT tracker for run checkpoints. This is best effort: if the tracker
+        can not be pickled, only the track ID counter is saved, so that resumed runs do not reuse IDs.
+
+        Returns:
+            bytes: The pickled tracker state.
+        """
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        trackers = getattr(getattr(self.model, 'predictor', None), 'trackers', None)
+        try:
+            return pickle.dumps({'trackers': trackers, 'next_id': BaseTrack._count})
+        except Exception as e:
+            print(f"Warning: The tracker state could not be saved ({e}). Only the track ID counter is kept.")
+            return pickle.dumps({'trackers': None, 'next_id': BaseTrack._count})
+
+    def set_tracker_state(self, state):
+        """
+        Restores a snapshot of get_tracker_state. It is applied on the next call of find_objects.
+        """
+        self._restored_tracker = pickle.loads(state) if state is not None else None
+
+    def _apply_tracker_state(self, state):
+        """
+        Returns True if the tracks were restored, False if only the track ID counter was.
+        """
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        # Creating the tracker resets the ID counter, so it is set after the first tracked frame.
+        BaseTrack._count = max(BaseTrack._count, state['next_id'])
+        predictor = getattr(self.model, 'predictor', None)
+        if state['trackers'] is None or predictor is None:
+            return False
+        predictor.trackers = state['trackers']
+        return True
+
+    def _track(self, image):
         results = self.model.track(
             source=image,
             show=False,  # Don't display the image automatically
@@ -24,6 +109,10 @@ class yolov12:
             iou=0.5,  # IoU threshold for NMS
             persist=True,  # IMPORTANT: This keeps the tracker alive between frames
             verbose=False,  # Set to True for more detailed output
-            imgsz=(1088, 1920)  # Specify image size for better performance
+            imgsz=self._imgsz()  # Specify image size for better performance
         )
         return results[0]
+
+    def _imgsz(self):
+        # Read on every frame, so runs with other sizes can share the loaded model.
+        return tuple(config.model_imgsz) if config.model_imgsz else self.IMGSZ
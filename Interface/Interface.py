@@ -1,12 +1,19 @@
 # interface.py
 
 import streamlit as st
+import streamlit.components.v1 as components
 import os
 import time
 import shutil
 import re
 import config
 import base64
+import json
+import pickle
+import subprocess
+import sys
+from Storage import JobQueue
+from Report import HistoryQuery
 
 
 class Interface:
@@ -22,6 +29,10 @@ class Interface:
             st.session_state.last_video_bytes = None
         if 'last_pdf_bytes' not in st.session_state:
             st.session_state.last_pdf_bytes = None
+        if 'last_tracks_bytes' not in st.session_state:
+            st.session_state.last_tracks_bytes = None
+        if 'last_history_query' not in st.session_state:
+            st.session_state.last_history_query = None
         # ---
         if 'run_completed' not in st.session_state:
             st.session_state.run_completed = False
@@ -32,6 +43,14 @@ class Interface:
             st.session_state.new_model_name = ""
         if 'model_to_delete' not in st.session_state:
             st.session_state.model_to_delete = None
+        # İş kuyruğu için state'ler
+        if 'workers_started_at' not in st.session_state:
+            st.session_state.workers_started_at = None
+        if 'shown_job_id' not in st.session_state:
+            st.session_state.shown_job_id = None
+        # Placeholders of the processing screen, filled while a video is processed (see progress_reporter)
+        self._progress_bar = None
+        self._profile_view = None
 
     def run(self):
         """
@@ -60,6 +79,10 @@ class Interface:
             # Ana ayarlar arayüzünü çiz
             self._draw_settings_ui()
 
+            # İş kuyruğu açıksa, işlerin durumunu göster
+            if config.job_queue_path:
+                self._draw_jobs_panel()
+
             # Eğer bir "run" işlemi tamamlandıysa, sonuçları göster
             if st.session_state.run_completed:
                 self._display_previous_results()
@@ -70,7 +93,10 @@ class Interface:
                           disabled=st.session_state.is_busy)
 
         st.header("1. Path Selection")
-        video_path = st.text_input("Source Video Path", value=config.video_path)
+        video_paths_text = st.text_area("Source Video Path(s), one per line", value=config.video_path,
+                                        help="Each video becomes its own job. With several videos, the output file "
+                                             "names get the name of the source video appended.")
+        video_paths = [line.strip() for line in video_paths_text.splitlines() if line.strip()]
         output_video_path = st.text_input("Output Video Path", value=config.output_video_path)
         pdf_report_path = st.text_input("PDF Report Path", value=config.pdf_report_path)
 
@@ -78,17 +104,61 @@ class Interface:
         selected_model = self._draw_model_manager()
 
         st.header("2. Processing Parameters")
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         memory_time = col1.number_input("Memory Time (seconds)", min_value=1, value=config.memory_time, step=1)
         skip_frame = col2.number_input("Frame Skip Interval", min_value=1, value=config.skip_frame, step=1)
+        ocr_interval = col3.number_input("OCR Interval (processed frames)", min_value=1, value=config.ocr_interval,
+                                         step=1)
+        autotune = st.checkbox("Auto-tune the frame skip, model input size, OCR interval and confidence on a sample "
+                               "of the video", value=config.autotune_target_fps is not None
+                               or config.autotune_target_latency_ms is not None,
+                               help="A few seconds of the video are processed with several settings on this machine "
+                                    "first. The most accurate setting that reaches the target replaces the values "
+                                    "above.")
+        col1, col2 = st.columns(2)
+        autotune_targets = {'fps': "Throughput (video frames per second)", 'latency': "Latency (ms per frame)"}
+        latency_target = config.autotune_target_fps is None and config.autotune_target_latency_ms is not None
+        autotune_target = col1.radio("Auto-tune Target", options=list(autotune_targets),
+                                     format_func=autotune_targets.get, index=int(latency_target),
+                                     disabled=not autotune)
+        if autotune_target == 'fps':
+            target_value = col2.number_input("Target Frames per Second", min_value=0.1, step=1.0,
+                                             value=float(config.autotune_target_fps or 30.0), disabled=not autotune)
+        else:
+            target_value = col2.number_input("Target Milliseconds per Frame", min_value=1.0, step=10.0,
+                                             value=float(config.autotune_target_latency_ms or 200.0),
+                                             disabled=not autotune)
+        output_modes = {'video': "Burn annotations into the video", 'sidecar': "Sidecar track file (no re-encode)",
+                        'headless': "Analytics only (report + track file)"}
+        output_mode = st.radio("Output Mode", options=list(output_modes), format_func=output_modes.get,
+                               index=list(output_modes).index(config.output_mode), horizontal=True)
+        resume_run = st.checkbox("Resume an interrupted run of this video from its last checkpoint",
+                                 value=config.resume_run)
+        live_source = st.checkbox("Live source: read the source as a stream or capture device (a file is replayed at "
+                                  "its frame rate), dropping frames to keep up", value=config.live_source,
+                                  help="Enter an OpenCV/FFMPEG URL (rtsp://, http://, ...) or a device number "
+                                       "('0') as the source. Stops when the source ends or after live_max_seconds.")
+        replay_inference = st.checkbox("Replay the recorded detections and OCR results (re-tunes tracking and the report "
+                                       "without running the models)", value=config.replay_inference,
+                                       disabled=not config.inference_cache_dir)
 
         st.header("3. Start Process")
-        if st.button("Start Processing", use_container_width=True, type="primary", disabled=st.session_state.is_busy):
-            if selected_model:
-                st.session_state.run_settings = {
-                    "video_path": video_path, "yolov12_path": selected_model, "output_video_path": output_video_path,
-                    "pdf_report_path": pdf_report_path, "memory_time": int(memory_time), "skip_frame": int(skip_frame)
+        button_label = "Add to Queue" if config.job_queue_path else "Start Processing"
+        if st.button(button_label, use_container_width=True, type="primary", disabled=st.session_state.is_busy):
+            if selected_model and video_paths:
+                run_settings = {
+                    "video_path": video_paths[0], "yolov12_path": selected_model, "output_video_path": output_video_path,
+                    "pdf_report_path": pdf_report_path, "memory_time": int(memory_time), "skip_frame": int(skip_frame),
+                    "ocr_interval": int(ocr_interval), "output_mode": output_mode, "resume_run": bool(resume_run),
+                    "replay_inference": bool(replay_inference), "live_source": bool(live_source),
+                    "autotune_target_fps": float(target_value) if autotune and autotune_target == 'fps' else None,
+                    "autotune_target_latency_ms": (float(target_value) if autotune and autotune_target == 'latency'
+                                                   else None)
                 }
+                if config.job_queue_path:
+                    self._submit_processing_jobs(run_settings, video_paths)
+                    return
+                st.session_state.run_settings = run_settings
                 st.session_state.is_busy = True
                 st.session_state.status_message = "Processing video..."
                 st.session_state.run_completed = False  # Yeni işlem başlarken eski sonuçları gizle
@@ -98,9 +168,44 @@ class Interface:
     def _draw_processing_ui(self):
         st.header(st.session_state.status_message)
         st.info("The application is currently busy. Please wait until the process is complete.")
-        st.progress(0)  # Bu bar, dışarıdan (tqdm hook ile) güncellenebilir
+        # The bar and the stage breakdown are updated during processing (see progress_reporter)
+        self._progress_bar = st.progress(0, text="Starting...")
+        self._profile_view = st.empty()
         st.code("Processing logs will appear in the terminal...", language="text")
 
+    def progress_reporter(self, profiler, interval=0.5):
+        """
+        Returns a progress callback for Main.run_video_processing that updates the progress bar and the live
+        stage breakdown of the processing screen, at most every `interval` seconds.
+
+        Args:
+            profiler (StageProfiler): The profiler of the run.
+            interval (float): Minimum seconds between two updates.
+        """
+        last_update = [0.0]
+
+        def report_progress(processed, total):
+            now = time.monotonic()
+            if self._progress_bar is None or now - last_update[0] < interval:
+                return
+            last_update[0] = now
+
+            summary = profiler.summary() if profiler.enabled else None
+            text = f"{processed} / {total} frames" if total else f"{processed} frames"
+            if summary is not None and summary['fps']:
+                text += f" ({summary['fps']:.1f} frames/s)"
+            self._progress_bar.progress(min(processed / total, 1.0) if total else 0.0, text=text)
+
+            if summary is not None and summary['stages']:
+                self._profile_view.dataframe([
+                    {'Stage': name, 'Runs': stats['count'], 'Mean ms': stats['mean_ms'], 'p90 ms': stats['p90_ms'],
+                     'Max ms': stats['max_ms'], 'Share %': round(stats['share'] * 100, 1),
+                     'Peak MB': stats['peak_rss_mb']}
+                    for name, stats in summary['stages'].items()
+                ], hide_index=True, use_container_width=True)
+
+        return report_progress
+
     # --- Train Page UI ---
     def _draw_train_page(self):
         st.title("Train Your Model")
@@ -134,6 +239,11 @@ class Interface:
                 "MIN_ICON_SCALE": float(min_scale), "MAX_ICON_SCALE": float(max_scale),
                 "model_name": model_name
             }
+            if config.job_queue_path:
+                # Training runs in a worker; the app goes back to the main page, where the job list is shown.
+                self._submit_jobs('train', [self._job_settings(st.session_state.train_settings)])
+                st.session_state.page = 'main'
+                st.rerun()
             st.session_state.is_busy = True
             st.session_state.status_message = "Training model..."
             st.session_state.page = 'main'  # İşlem ekranını göstermek için ana sayfaya yönlendir
@@ -153,12 +263,18 @@ class Interface:
         st.session_state.page = 'main'
         st.rerun()
 
-    def update_config_file(self, settings_dict):
+    @staticmethod
+    def _resolve_model_name(settings_dict):
+        # The model name of the train page is stored as the path of the trained weights.
         if 'model_name' in settings_dict:
             model_name = settings_dict.pop('model_name')
             if model_name:
                 full_model_path = os.path.join('Models', model_name + '.pt')
                 settings_dict['BEST_MODEL_SAVE_PATH'] = full_model_path
+        return settings_dict
+
+    def update_config_file(self, settings_dict):
+        self._resolve_model_name(settings_dict)
 
         config_path = "config.py"
         with open(config_path, 'r', encoding='utf-8') as f:
@@ -169,8 +285,10 @@ class Interface:
             updated = False
             for key, value in settings_dict.items():
                 if re.match(fr"^\s*{key}\s*=", line):
-                    if isinstance(value, str):
+                    if self._is_file_path(key, value):
                         new_lines.append(f"{key} = r'{os.path.abspath(value)}'\n")
+                    elif isinstance(value, str):
+                        new_lines.append(f"{key} = {value!r}\n")
                     elif isinstance(value, tuple):
                         new_lines.append(f"{key} = {value[0]}, {value[1]}\n")
                     else:
@@ -184,21 +302,158 @@ class Interface:
             f.writelines(new_lines)
         st.toast("Configuration updated!")
 
+    # --- Job Queue ---
+    def _job_settings(self, settings):
+        """
+        Returns the settings of a job. They are applied to the config of the worker in memory, so the paths are
+        made absolute here, like update_config_file does for config.py.
+        """
+        settings = self._resolve_model_name(dict(settings))
+        return {key: os.path.abspath(value) if self._is_file_path(key, value) else value
+                for key, value in settings.items()}
+
+    @staticmethod
+    def _is_file_path(key, value):
+        # Live sources (see config.live_source) are URLs or device numbers, which must stay as they are.
+        return (isinstance(value, str) and key.lower().endswith('path') and '://' not in value
+                and not value.isdigit())
+
+    def _submit_processing_jobs(self, run_settings, video_paths):
+        """
+        Queues one processing job per source video. Every job writes its outputs to its own directory
+        (see JobWorker).
+        """
+        jobs = [self._job_settings(dict(run_settings, video_path=video_path)) for video_path in video_paths]
+        self._submit_jobs('process', jobs)
+
+    def _submit_jobs(self, kind, settings_list):
+        queue = JobQueue(config.job_queue_path).open()
+        try:
+            for settings in settings_list:
+                queue.submit(kind, settings)
+            self._ensure_workers(queue)
+        finally:
+            queue.close()
+        st.toast(f"{len(settings_list)} job(s) added to the queue.")
+
+    def _ensure_workers(self, queue):
+        """
+        Starts the workers (worker.py) in the background if none of them is alive.
+        """
+        if not config.job_autostart_workers or queue.live_workers(config.job_poll_interval * 5) > 0:
+            return
+        started_at = st.session_state.workers_started_at
+        if started_at is not None and time.time() - started_at < 60:
+            return  # They were just started and are still loading.
+        if sys.platform == 'win32':
+            subprocess.Popen([sys.executable, 'worker.py'], creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            subprocess.Popen([sys.executable, 'worker.py'], start_new_session=True)
+        st.session_state.workers_started_at = time.time()
+
+    def _draw_jobs_panel(self):
+        """
+        Lists the queued, running and finished jobs. The list refreshes itself every job_poll_interval seconds,
+        without rerunning the rest of the page.
+        """
+        st.markdown("---")
+        st.header("Jobs")
+
+        @st.fragment(run_every=config.job_poll_interval)
+        def jobs_list():
+            queue = JobQueue(config.job_queue_path).open()
+            try:
+                jobs = queue.list_jobs()
+                workers = queue.live_workers(config.job_poll_interval * 5)
+            finally:
+                queue.close()
+
+            st.caption(f"{workers} worker(s) running.")
+            if not jobs:
+                st.info("No jobs yet. Add videos to the queue above.")
+                return
+
+            for job in jobs:
+                settings = job['settings']
+                if job['kind'] == 'process':
+                    name = os.path.basename(settings.get('video_path', ''))
+                else:
+                    name = "Training " + os.path.basename(settings.get('BEST_MODEL_SAVE_PATH', ''))
+                col_name, col_status, col_action = st.columns([3, 4, 1])
+                col_name.write(f"**#{job['id']}** {name}")
+
+                if job['status'] == JobQueue.RUNNING:
+                    col_status.progress(job['progress'], text=job['message'] or "Running...")
+                elif job['status'] == JobQueue.FAILED:
+                    col_status.error(job['error'])
+                else:
+                    col_status.write(job['status'].capitalize() + (f" ({job['message']})" if job['message'] else ""))
+
+                if job['status'] == JobQueue.QUEUED:
+                    if col_action.button("Cancel", key=f"cancel_job_{job['id']}", use_container_width=True):
+                        queue = JobQueue(config.job_queue_path).open()
+                        try:
+                            queue.cancel(job['id'])
+                        finally:
+                            queue.close()
+                        st.rerun(scope="fragment")
+                elif job['status'] == JobQueue.DONE and job['kind'] == 'process':
+                    if col_action.button("Show", key=f"show_job_{job['id']}", use_container_width=True):
+                        self._load_job_results(job)
+                        st.rerun()
+
+        jobs_list()
+
+    def _load_job_results(self, job):
+        """
+        Loads the outputs of a finished processing job into the session, where the result view reads them.
+        """
+        result = job['result'] or {}
+
+        def read(name):
+            path = result.get(name)
+            if not path or not os.path.exists(path):
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+
+        st.session_state.last_video_bytes = read('video')
+        st.session_state.last_pdf_bytes = read('pdf')
+        st.session_state.last_tracks_bytes = read('tracks')
+        st.session_state.last_history_query = None
+        timeline_bytes = read('timeline')
+        if timeline_bytes is not None:
+            st.session_state.last_history_query = HistoryQuery(
+                pickle.loads(timeline_bytes), frame_step=job['settings'].get('skip_frame', config.skip_frame),
+                condition_names=config.conditions)
+        st.session_state.shown_job_id = job['id']
+        st.session_state.run_completed = True
+
     def _display_previous_results(self):
         """
         Displays the last generated video and PDF report directly from byte data
         stored in the session state.
         """
         st.markdown("---")
-        st.header("Last Run Results")
+        if st.session_state.shown_job_id is not None:
+            st.header(f"Results of Job #{st.session_state.shown_job_id}")
+        else:
+            st.header("Last Run Results")
 
         # --- VİDEOYU GÖRÜNTÜLE ---
         video_bytes = st.session_state.get('last_video_bytes')
-        if video_bytes:
+        tracks_bytes = st.session_state.get('last_tracks_bytes')
+        if video_bytes and tracks_bytes:
+            self._draw_sidecar_player(video_bytes, tracks_bytes)
+            st.info(f"Showing the source video with the annotations drawn from the sidecar track file.")
+        elif video_bytes:
             st.video(video_bytes)
             st.info(f"Showing last processed video.")
         else:
             st.warning("No video data from the last run to display.")
+            if tracks_bytes:
+                st.download_button("Download Track Export (.jsonl)", data=tracks_bytes, file_name="tracks.jsonl",
+                                   mime="application/jsonl")
 
         # --- PDF'İ GÖRÜNTÜLE ---
         pdf_bytes = st.session_state.get('last_pdf_bytes')
@@ -215,6 +470,138 @@ class Interface:
         else:
             st.warning("No PDF data from the last run to display.")
 
+        if st.session_state.get('last_history_query') is not None:
+            self._draw_history_query_panel(st.session_state.last_history_query)
+
+    def _draw_history_query_panel(self, history):
+        """
+        Answers questions about the tracking history of the last run (see Report.HistoryQuery).
+        """
+        st.subheader("Query Tracking History")
+        query_type = st.radio("Question", options=["intervals", "transitions", "at_frame"], horizontal=True,
+                              format_func={"intervals": "State intervals", "transitions": "Status transitions",
+                                           "at_frame": "All aircraft at a frame"}.get)
+
+        col1, col2, col3 = st.columns(3)
+        aircraft_text = col1.text_input("Aircraft ID (optional)", value="")
+        start_frame = col2.number_input("From frame", min_value=0, value=0, step=1)
+        end_frame = col3.number_input("To frame", min_value=0, value=0, step=1,
+                                      help="0 means until the end of the run.")
+        col4, col5 = st.columns(2)
+        location = col4.text_input("Location contains (e.g. BCN)", value="")
+        condition = col5.selectbox("Status", options=["Any"] + history.condition_names)
+
+        try:
+            aircraft_id = int(aircraft_text) if aircraft_text.strip() else None
+        except ValueError:
+            st.error("The aircraft ID must be a number.")
+            return
+        window_end = int(end_frame) if end_frame > 0 else None
+
+        start_time = time.perf_counter()
+        if query_type == "intervals":
+            results = history.intervals(int(start_frame), window_end, aircraft_id=aircraft_id,
+                                        location=location or None,
+                                        condition=None if condition == "Any" else condition)
+        elif query_type == "transitions":
+            results = history.transitions(aircraft_id, conditions=None if condition == "Any" else [condition],
+                                          start_frame=int(start_frame), end_frame=window_end)
+        else:
+            results = history.at_frame(int(start_frame))
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+        st.caption(f"{len(results)} results in {elapsed_ms:.2f} ms")
+        if results:
+            st.dataframe(results, use_container_width=True)
+
+    def _draw_sidecar_player(self, video_bytes, tracks_bytes):
+        """
+        Plays the untouched source video and draws the annotations of the sidecar track file
+        on a canvas on top of it, in the browser.
+
+        The video is served by st.video (streamed by Streamlit's media endpoint, not embedded in the page). The
+        track file is passed to a small component that puts a canvas over that video element in the page; the
+        component's frame comes from the same origin, so it can reach the page.
+        """
+        st.video(video_bytes, format='video/mp4')
+        tracks_json = json.dumps(tracks_bytes.decode('utf-8'))
+        player_html = f"""
+<script>
+const page = window.parent.document;
+const lines = {tracks_json}.trim().split("\\n").map(JSON.parse);
+const header = lines[0];
+const records = lines.slice(1);
+let labels = [];
+for (const r of records) {{ if (r.labels) labels = r.labels; r.allLabels = labels; }}
+// Same palette as FrameCreator.class_colors (converted from BGR).
+const colors = ["#0000ff", "#ff0000", "#ffff00", "#ff00ff", "#00ff00", "#00ffff", "#ffa500", "#800080", "#ffffff"];
+let video = null, canvas = null, ctx = null;
+
+function attach() {{
+  // The st.video element right before this component. It may not be in the page yet.
+  const videos = Array.from(page.querySelectorAll("video")).filter(
+    v => v.compareDocumentPosition(window.frameElement) & Node.DOCUMENT_POSITION_FOLLOWING);
+  if (!videos.length) return false;
+  video = videos[videos.length - 1];
+  const container = video.parentElement;
+  container.style.position = "relative";
+  container.querySelectorAll("canvas.sidecar-tracks").forEach(c => c.remove());
+  canvas = page.createElement("canvas");
+  canvas.className = "sidecar-tracks";
+  canvas.style.cssText = "position:absolute;pointer-events:none";
+  container.appendChild(canvas);
+  // The canvas belongs to the page; it goes when this component is re-rendered or removed.
+  window.addEventListener("pagehide", () => canvas.remove());
+  ctx = canvas.getContext("2d");
+  return true;
+}}
+
+function recordAt(t) {{
+  let lo = 0, hi = records.length - 1, found = -1;
+  while (lo <= hi) {{
+    const mid = (lo + hi) >> 1;
+    if (records[mid].t <= t) {{ found = mid; lo = mid + 1; }} else {{ hi = mid - 1; }}
+  }}
+  return found >= 0 ? records[found] : null;
+}}
+
+function draw() {{
+  if (!video && !attach()) {{ requestAnimationFrame(draw); return; }}
+  canvas.style.left = video.offsetLeft + "px";
+  canvas.style.top = video.offsetTop + "px";
+  canvas.width = video.clientWidth;
+  canvas.height = video.clientHeight;
+  const sx = canvas.width / (header.width || video.videoWidth || 1);
+  const sy = canvas.height / (header.height || video.videoHeight || 1);
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  const r = recordAt(video.currentTime);
+  if (r) {{
+    ctx.font = "12px sans-serif";
+    ctx.fillStyle = "#b4b4b4";
+    for (const [text, x1, y1] of r.allLabels) ctx.fillText(text, x1 * sx, (y1 - 5) * sy);
+    if (r.panel !== null) {{
+      ctx.strokeStyle = "#00ffff"; ctx.lineWidth = 2;
+      ctx.strokeRect(0, 0, r.panel * sx, canvas.height - 1);
+    }}
+    for (const [id, cls, x1, y1, x2, y2, conf, selected] of r.objs) {{
+      const color = colors[cls] || "#ffffff";
+      const label = "ID:" + id + " " + (header.classes[cls] || ("Class " + cls)) + " " + conf.toFixed(2);
+      ctx.strokeStyle = selected ? "#00ff00" : color;
+      ctx.lineWidth = selected ? 3 : 1.5;
+      ctx.strokeRect(x1 * sx, y1 * sy, (x2 - x1) * sx, (y2 - y1) * sy);
+      ctx.fillStyle = color;
+      ctx.fillRect(x1 * sx, y1 * sy - 14, ctx.measureText(label).width + 4, 14);
+      ctx.fillStyle = "#ffffff";
+      ctx.fillText(label, x1 * sx + 2, y1 * sy - 3);
+    }}
+  }}
+  requestAnimationFrame(draw);
+}}
+requestAnimationFrame(draw);
+</script>
+"""
+        components.html(player_html, height=0)
+
     def _draw_model_manager(self):
         models_dir = "Models"
         if not os.path.exists(models_dir):
@@ -0,0 +1,234 @@
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# The worker of this process and the thread that renders its PDF reports, created by _init_worker (one per pool
+# process).
+_worker = None
+_report_executor = None
+
+
+def _init_worker(counter, threads, cpu_count):
+    """
+    Initializes a pool process: limits its intra-op threads and pins it to its own CPU cores.
+    """
+    global _worker, _report_executor
+
+    # 1. Thread limits. The BLAS thread limits come with the environment (see BatchRunner.run).
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+    # 2. CPU pinning: worker i gets the cores [i * threads, (i + 1) * threads), wrapping around.
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cores = sorted({(index * threads + i) % cpu_count for i in range(threads)})
+    try:
+        try:
+            import psutil
+            psutil.Process().cpu_affinity(cores)
+        except ImportError:
+            os.sched_setaffinity(0, cores)
+    except (AttributeError, OSError) as e:
+        # cpu_affinity is not available on every platform (e.g. macOS); the thread limits still apply.
+        print(f"Warning: Could not pin the batch worker to CPU cores {cores}: {e}")
+
+    # 3. The metrics endpoint of the worker: metrics_port + 1 + its index (see Telemetry.MetricsServer)
+    import config
+    from Telemetry import MetricsServer
+    if config.metrics_port is not None:
+        MetricsServer.ensure(config.metrics_port + 1 + index, config.metrics_host)
+
+    from Jobs.JobWorker import JobWorker
+    _worker = JobWorker()
+    # The pool process joins this (non-daemon) thread when it exits, so every report is saved before the pool closes.
+    _report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report')
+
+
+def _run_video(settings):
+    # A report from an earlier batch would hide a failed one: BatchRunner.run checks that every report was saved.
+    if os.path.exists(settings['pdf_report_path']):
+        os.remove(settings['pdf_report_path'])
+    # The models stay loaded in the worker between videos (see FrameProcessor.ModelRegistry). The report is rendered
+    # in the background while the worker takes the next video.
+    result, _ = _worker.start_video(settings, report_executor=_report_executor)
+    return result
+
+
+class BatchRunner:
+    """
+    Processes many videos from the command line (see batch.py) with a pool of worker processes.
+
+    Every worker process loads the models once and processes one video after another with them. The intra-op
+    threads of every worker (torch, OpenCV, BLAS) are limited to `threads_per_worker`, and each worker is pinned
+    to its own CPU cores, so the workers do not oversubscribe the machine.
+
+    The PDF report of a video is rendered on a background thread of its worker while the worker processes the next
+    video; the pool waits for the reports before the summary is written.
+
+    Each video writes its outputs to its own directory `<output_dir>/<video name>/`, and a summary of all
+    videos is written to `<output_dir>/summary.csv` and `summary.json`.
+
+    The workers share the result cache, the inference cache and the run store of the config: their updates are
+    locked (see Storage.FileLock) or transactional, so a video processed by one worker can be reused by another.
+    """
+
+    VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv')
+    # The environment variables that limit the threads of the BLAS libraries (numpy, torch).
+    THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+    SUMMARY_FIELDS = ['video', 'status', 'frames', 'seconds', 'fps', 'aircraft', 'output_video', 'pdf', 'tracks',
+                      'profile', 'error']
+
+    def __init__(self, output_dir, workers=2, threads_per_worker=None, settings=None):
+        """
+        Args:
+            output_dir (str): The directory of the per-video outputs and the summary.
+            workers (int): The number of worker processes.
+            threads_per_worker (int or None): The intra-op threads of a worker. None shares the CPU cores
+                                              evenly among the workers.
+            settings (dict or None): Config values applied to every video (e.g. output_mode, skip_frame).
+        """
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = max(1, workers)
+        self.cpu_count = os.cpu_count() or 1
+        self.threads_per_worker = max(1, threads_per_worker or self.cpu_count // self.workers)
+        self.settings = settings or {}
+
+    @classmethod
+    def find_videos(cls, inputs):
+        """
+        Expands directories (their videos, not recursive), glob patterns and file paths into a sorted list of
+        video files without duplicates.
+        """
+        videos = []
+        for item in inputs:
+            if os.path.isdir(item):
+                paths = [os.path.join(item, name) for name in os.listdir(item)
+                         if name.lower().endswith(cls.VIDEO_EXTENSIONS)]
+            else:
+                paths = glob.glob(item) or [item]
+            for path in sorted(paths):
+                if not os.path.isfile(path):
+                    print(f"Warning: '{path}' is not a file, skipped.")
+                    continue
+                path = os.path.abspath(path)
+                if path not in videos:
+                    videos.append(path)
+        return videos
+
+    def run(self, video_paths):
+        """
+        Processes the videos and writes the summary.
+
+        Returns:
+            list: One summary row (dict with SUMMARY_FIELDS) per video, in the order of video_paths.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        jobs = self._video_settings(video_paths)
+        rows = {}
+        start_time = time.perf_counter()
+        print(f"Processing {len(jobs)} video(s) with {self.workers} worker(s), "
+              f"{self.threads_per_worker} thread(s) each.")
+
+        context = multiprocessing.get_context('spawn')
+        counter = context.Value('i', 0)
+        # The BLAS libraries read their thread limits once, when numpy is imported, which a spawned worker does
+        # before its initializer runs. The workers inherit the limits from the environment of this process instead.
+        saved_env = {name: os.environ.get(name) for name in self.THREAD_ENV_VARS}
+        os.environ.update({name: str(self.threads_per_worker) for name in self.THREAD_ENV_VARS})
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)) or 1, mp_context=context,
+                                     initializer=_init_worker,
+                                     initargs=(counter, self.threads_per_worker, self.cpu_count)) as pool:
+                futures = {pool.submit(_run_video, settings): video_path for video_path, settings in jobs}
+                for future in as_completed(futures):
+                    video_path = futures[future]
+                    try:
+                        rows[video_path] = self._summary_row(video_path, future.result())
+                    except Exception as e:
+                        print(f"Error: Processing '{video_path}' failed: {e}")
+                        rows[video_path] = {'video': video_path, 'status': 'failed',
+                                            'error': f"{type(e).__name__}: {e}"}
+                    print(f"[{len(rows)}/{len(jobs)}] {os.path.basename(video_path)}: {rows[video_path]['status']}")
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+        # The pool has closed, so the background reports are finished: a missing one failed (see the worker's log).
+        for row in rows.values():
+            if row['status'] == 'done' and not (row['pdf'] and os.path.exists(row['pdf'])):
+                print(f"Error: No report was produced for '{row['video']}'.")
+                row.update(status='failed', error="RuntimeError: No report was produced (see the log).")
+
+        summary = [rows[video_path] for video_path, _ in jobs]
+        self._write_summary(summary)
+        failed = sum(row['status'] != 'done' for row in summary)
+        print(f"Finished {len(summary)} video(s) in {time.perf_counter() - start_time:.1f} s, {failed} failed. "
+              f"Summary: {os.path.join(self.output_dir, 'summary.csv')}")
+        return summary
+
+    def _video_settings(self, video_paths):
+        """
+        Returns (video path, settings) per video, with the output paths inside the video's own directory.
+        """
+        jobs = []
+        used_names = set()
+        for video_path in video_paths:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            # Videos with the same name in different directories get numbered output directories.
+            name, number = stem, 2
+            while name.lower() in used_names:
+                name, number = f"{stem}_{number}", number + 1
+            used_names.add(name.lower())
+
+            video_dir = os.path.join(self.output_dir, name)
+            os.makedirs(video_dir, exist_ok=True)
+            settings = dict(self.settings)
+            settings.update({
+                'video_path': video_path,
+                'output_video_path': os.path.join(video_dir, f"{stem}_annotated.mp4"),
+                'pdf_report_path': os.path.join(video_dir, 'report.pdf'),
+                'timeline_csv_path': os.path.join(video_dir, 'timeline.csv'),
+                'timeline_parquet_path': os.path.join(video_dir, 'timeline.parquet'),
+                'profile_path': os.path.join(video_dir, 'profile.json'),
+            })
+            jobs.append((video_path, settings))
+        return jobs
+
+    @staticmethod
+    def _summary_row(video_path, result):
+        frames, seconds = result.get('frames', 0), result.get('seconds', 0)
+        return {
+            'video': video_path,
+            'status': 'done',
+            'frames': frames,
+            'seconds': seconds,
+            'fps': round(frames / seconds, 2) if seconds else None,
+            'aircraft': result.get('aircraft'),
+            'output_video': result.get('video'),
+            'pdf': result.get('pdf'),
+            'tracks': result.get('tracks'),
+            'profile': result.get('profile'),
+            'error': None,
+        }
+
+    def _write_summary(self, summary):
+        with open(os.path.join(self.output_dir, 'summary.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(summary)
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,269 @@
+import os
+import pickle
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from Storage import JobQueue
+from Telemetry import MetricsServer
+
+
+class JobWorker:
+    """
+    A long-lived worker that takes jobs from the JobQueue and runs them one after another.
+
+    The worker keeps the models loaded between jobs (see FrameProcessor.ModelRegistry), so only the first job
+    of a model pays for loading it; with config.model_preload, the default models are loaded as soon as the
+    worker starts. The settings of a job are applied to this process's `config` module before
+    the job runs and reverted afterwards; config.py itself is never rewritten. A background thread keeps the
+    heartbeat of the worker while a job runs. With a metrics port, the worker serves the state of the job queue
+    and the metrics of the running video (see Telemetry.MetricsServer).
+
+    The PDF report of a processing job is rendered on a background thread while the worker takes the next job;
+    the job is completed when its report is saved.
+
+    Every processing job writes its outputs to its own directory `job_<id>` next to the configured output paths,
+    so jobs of the same or equally named videos never overwrite each other.
+    """
+
+    OUTPUT_KEYS = ('output_video_path', 'pdf_report_path', 'timeline_csv_path', 'timeline_parquet_path',
+                   'profile_path')
+
+    def __init__(self, queue_path=None, poll_interval=2.0, progress_interval=1.0, metrics_port=None):
+        """
+        Args:
+            queue_path (str or None): Path of the job queue database. None if the worker is only used through
+                                      process_video (e.g. by the BatchRunner).
+            poll_interval (float): Seconds between two polls of an empty queue, and between two heartbeats.
+            progress_interval (float): Minimum seconds between two progress updates of a job.
+            metrics_port (int or None): The port of the metrics endpoint of this worker. None disables it.
+        """
+        self.queue_path = queue_path
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.metrics_port = metrics_port
+        self._current_job = None
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # The settings as loaded from config.py, restored before every job.
+        self._defaults = {name: value for name, value in vars(config).items()
+                          if not name.startswith('_') and not isinstance(value, types.ModuleType)}
+
+    def run(self, stop_event=None):
+        """
+        Processes jobs until stop_event is set (or forever).
+        """
+        if config.model_preload:
+            from FrameProcessor import ModelRegistry
+            ModelRegistry.default().preload(config.yolov12_path, config.panel_layout_path, config.model_device)
+
+        metrics_server = MetricsServer.ensure(self.metrics_port, config.metrics_host)
+        if metrics_server is not None:
+            metrics_server.add_source('worker', self._collect_metrics)
+
+        queue = JobQueue(self.queue_path).open()
+        queue.register_worker(self.worker_id)
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_stop,), daemon=True)
+        heartbeat.start()
+        report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report')
+        print(f"Worker {self.worker_id} is waiting for jobs.")
+        try:
+            while stop_event is None or not stop_event.is_set():
+                job = queue.claim(self.worker_id)
+                if job is None:
+                    time.sleep(self.poll_interval)
+                    continue
+                self._run_job(queue, job, report_executor)
+        finally:
+            # The reports that are still being generated complete their jobs first.
+            report_executor.shutdown(wait=True)
+            heartbeat_stop.set()
+            heartbeat.join()
+            queue.unregister_worker(self.worker_id)
+            queue.close()
+
+    def _run_job(self, queue, job, report_executor):
+        print(f"Worker {self.worker_id} starts job {job['id']} ({job['kind']}).")
+        self._current_job = job['id']
+        try:
+            if job['kind'] == 'process':
+                result, report_future = self.start_video(self._job_output_settings(job),
+                                                         self._progress_reporter(queue, job['id']), report_executor)
+                if report_future is not None:
+                    queue.update_progress(job['id'], 1.0, "Generating the PDF report")
+                    report_future.add_done_callback(lambda future: self._complete_report(job['id'], result, future))
+                    print(f"Job {job['id']} is processed; its report is generated in the background.")
+                    return
+            elif job['kind'] == 'train':
+                result = self._train(job['settings'])
+            else:
+                raise ValueError(f"Unknown job kind '{job['kind']}'")
+            queue.complete(job['id'], result)
+            print(f"Job {job['id']} completed.")
+        except Exception as e:
+            print(f"Error: Job {job['id']} failed: {e}")
+            queue.fail(job['id'], f"{type(e).__name__}: {e}")
+        finally:
+            self._current_job = None
+
+    def _job_output_settings(self, job):
+        """
+        Returns the settings of a processing job with its output paths moved into the job's own directory.
+        A requeued job keeps its ID, so it finds the outputs of its interrupted run again.
+        """
+        settings = dict(job['settings'])
+        for key in self.OUTPUT_KEYS:
+            path = settings.get(key, self._defaults.get(key))
+            if path:
+                job_dir = os.path.join(os.path.dirname(os.path.abspath(path)), f"job_{job['id']}")
+                os.makedirs(job_dir, exist_ok=True)
+                settings[key] = os.path.join(job_dir, os.path.basename(path))
+        return settings
+
+    def _complete_report(self, job_id, result, report_future):
+        """
+        Completes a processing job when its background report is done. Runs on the report thread, which needs its
+        own connection to the queue.
+        """
+        queue = JobQueue(self.queue_path).open()
+        try:
+            error = report_future.exception()
+            if error is None and not report_future.result():
+                error = RuntimeError("No report was produced (see the log).")
+            if error is None:
+                queue.complete(job_id, result)
+                print(f"Job {job_id} completed.")
+            else:
+                print(f"Error: Job {job_id} failed: {error}")
+                queue.fail(job_id, f"{type(error).__name__}: {error}")
+        finally:
+            queue.close()
+
+    def process_video(self, settings, progress_callback=None):
+        """
+        Runs the video pipeline with the given settings applied to config. With an auto-tune target, skip_frame,
+        model_imgsz, ocr_interval and add_object_th are chosen on a sample of the video first (see AutoTuner).
+
+        Args:
+            settings (dict): The config values of the run.
+            progress_callback (callable or None): Passed on to Main.run_video_processing.
+
+        Returns:
+            dict: The paths of the outputs ('video', 'pdf', 'tracks', 'timeline', 'profile'; None if not produced) and
+                  the statistics of the run ('frames', 'seconds', 'aircraft').
+        """
+        result, _ = self.start_video(settings, progress_callback)
+        return result
+
+    def start_video(self, settings, progress_callback=None, report_executor=None):
+        """
+        Like process_video, but with a report executor the PDF report is rendered on it (see
+        Main.run_video_processing), so the caller can go on while it is generated.
+
+        Returns:
+            tuple: (the result of process_video, the Future of the report or None). The Future completes with True
+                   when the report is saved at result['pdf'].
+        """
+        # Imported here: main imports the whole pipeline, which is only needed for processing jobs.
+        from main import Main
+        from Video import AnnotationWriter
+
+        self._apply_settings(settings)
+        try:
+            if config.autotune_target_fps is not None or config.autotune_target_latency_ms is not None:
+                # The tuned values are applied over the settings of the job, before the pipeline reads them.
+                from Benchmark import AutoTuner
+                self._apply_settings(dict(settings, **AutoTuner.from_config().tune(settings)))
+            processed = [0]
+
+            def on_progress(done, total):
+                processed[0] = done
+                if progress_callback is not None:
+                    progress_callback(done, total)
+
+            main_app = Main()
+            start_time = time.perf_counter()
+            video_bytes, pdf_bytes, tracks_bytes = main_app.run_video_processing(progress_callback=on_progress,
+                                                                                 report_executor=report_executor)
+            elapsed = time.perf_counter() - start_time
+            report_future = main_app.report_future
+            if pdf_bytes is None and report_future is None:
+                raise RuntimeError("No report was produced (see the log).")
+
+            # The timeline is kept next to the report, so the app can answer history queries about this run.
+            timeline_path = os.path.splitext(config.pdf_report_path)[0] + '.timeline.pkl'
+            with open(timeline_path, 'wb') as f:
+                pickle.dump(main_app.report_generator.timeline, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            tracks_path, _ = AnnotationWriter.sidecar_paths(config.output_video_path)
+            profile_path = config.profile_path if config.profile_stages and config.profile_path else None
+            return {
+                'video': config.output_video_path if video_bytes is not None else None,
+                'pdf': config.pdf_report_path,
+                'tracks': tracks_path if tracks_bytes is not None else None,
+                'timeline': timeline_path,
+                'profile': profile_path if profile_path and os.path.exists(profile_path) else None,
+                'frames': processed[0],
+                'seconds': round(elapsed, 2),
+                'aircraft': len(main_app.report_generator.history),
+            }, report_future
+        finally:
+            self._apply_settings({})
+
+    def _progress_reporter(self, queue, job_id):
+        """
+        Returns a progress callback that stores the progress of a job, at most every progress_interval seconds.
+        """
+        last_update = [0.0]
+
+        def report_progress(processed, total):
+            now = time.monotonic()
+            if now - last_update[0] < self.progress_interval:
+                return
+            last_update[0] = now
+            progress = min(processed / total, 0.99) if total else 0.0
+            queue.update_progress(job_id, progress, f"{processed} frames processed")
+
+        return report_progress
+
+    def _train(self, settings):
+        from Trainer.Trainer import Trainer
+
+        self._apply_settings(settings)
+        try:
+            Trainer().train()
+            return {'model': config.BEST_MODEL_SAVE_PATH}
+        finally:
+            self._apply_settings({})
+
+    def _apply_settings(self, settings):
+        for name, value in self._defaults.items():
+            setattr(config, name, value)
+        for name, value in settings.items():
+            setattr(config, name, value)
+
+    def _collect_metrics(self):
+        # Scrapes run on the thread of the metrics server, which needs its own connection.
+        queue = JobQueue(self.queue_path).open()
+        try:
+            counts = queue.counts()
+        finally:
+            queue.close()
+        return [
+            ('aircraft_pipeline_jobs', 'gauge', 'Jobs in the queue per state.',
+             [({'status': status}, count) for status, count in counts.items()]),
+            ('aircraft_pipeline_worker_busy', 'gauge', '1 while the worker runs a job.',
+             [({'worker': self.worker_id}, int(self._current_job is not None))]),
+        ]
+
+    def _heartbeat_loop(self, stop):
+        # SQLite connections can not be shared between threads, so the heartbeat has its own.
+        queue = JobQueue(self.queue_path).open()
+        try:
+            while not stop.wait(self.poll_interval):
+                queue.heartbeat(self.worker_id)
+        finally:
+            queue.close()
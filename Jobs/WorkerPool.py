@@ -0,0 +1,75 @@
+import multiprocessing
+import time
+
+import config
+from Jobs.JobWorker import JobWorker
+from Storage import JobQueue
+
+
+def _worker_main(queue_path, poll_interval, stop_event, metrics_port):
+    JobWorker(queue_path, poll_interval, metrics_port=metrics_port).run(stop_event)
+
+
+class WorkerPool:
+    """
+    Starts a number of JobWorker processes and keeps them running.
+
+    Workers are spawned (not forked), so each one starts from a clean interpreter and loads the models itself.
+    A worker process that dies is replaced, and the jobs it was running are queued again
+    (see JobQueue.requeue_orphans). With config.metrics_port, the worker in slot i serves its metrics on
+    metrics_port + 1 + i, so the ports stay the same when a worker is replaced.
+    """
+
+    def __init__(self, queue_path, workers=2, poll_interval=2.0):
+        """
+        Args:
+            queue_path (str): Path of the job queue database.
+            workers (int): The number of worker processes.
+            poll_interval (float): Seconds between two polls of the queue and two health checks of the workers.
+        """
+        self.queue_path = queue_path
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+        self._processes = [None] * self.workers  # One process per worker slot
+
+    def run(self):
+        """
+        Runs the pool until it is interrupted (Ctrl+C).
+        """
+        queue = JobQueue(self.queue_path).open()
+        # A worker is considered dead when it missed a few heartbeats.
+        timeout = self.poll_interval * 5
+        try:
+            while True:
+                for slot, process in enumerate(self._processes):
+                    if process is None or not process.is_alive():
+                        self._processes[slot] = self._start_worker(slot)
+                requeued = queue.requeue_orphans(timeout)
+                if requeued:
+                    print(f"{requeued} job(s) of stopped workers were queued again.")
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping the workers...")
+        finally:
+            self.shutdown()
+            queue.close()
+
+    def shutdown(self):
+        """
+        Asks the workers to stop after their current job and waits for them.
+        """
+        self._stop.set()
+        for process in self._processes:
+            if process is not None:
+                process.join()
+        self._processes = [None] * self.workers
+
+    def _start_worker(self, slot):
+        metrics_port = config.metrics_port + 1 + slot if config.metrics_port is not None else None
+        process = self._context.Process(target=_worker_main,
+                                        args=(self.queue_path, self.poll_interval, self._stop, metrics_port),
+                                        daemon=False)
+        process.start()
+        return process
@@ -0,0 +1,4 @@
+from .JobWorker import JobWorker
+from .WorkerPool import WorkerPool
+from .BatchRunner import BatchRunner
+__all__ = ['JobWorker', 'WorkerPool', 'BatchRunner']
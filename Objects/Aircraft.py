@@ -1,10 +1,10 @@
-import config
 import math
 
 
 class Aircraft():
-    def __init__(self, id, bbox, conf ,cls_id):
+    def __init__(self, id, bbox, conf ,cls_id, view_bounds=(0, 0, 1920, 1080)):
         self._id = id
+        self._view_bounds = view_bounds # (left, up, right, down) of the visible area, used by is_in_sight.
         self._bbox = bbox
         self._conf = conf
         self._cls_id = cls_id
@@ -164,17 +164,19 @@ class Aircraft():
         # Get angle values from the find_px_velocity function
         _, angle = self.find_px_velocity()
 
+        l, u, r, d = self._view_bounds
+
         # Tendency to go left (between 225 and 315 degrees)
-        if x1 <= config.l and 225 < angle < 315:
+        if x1 <= l and 225 < angle < 315:
             return False
         # Tendency to go right (between 45 and 135 degrees)
-        elif x2 >= config.r and 45 < angle < 135:
+        elif x2 >= r and 45 < angle < 135:
             return False
         # Tendency to go up (between 315 and 45 degrees)
-        elif y1 <= config.u and (angle > 315 or angle < 45):
+        elif y1 <= u and (angle > 315 or angle < 45):
             return False
         # Tendency to go down (between 135 and 225 degrees)
-        elif y2 >= config.d and 135 < angle < 225:
+        elif y2 >= d and 135 < angle < 225:
             return False
 
         return True
\ No newline at end of file
@@ -3,18 +3,20 @@ import math
 from Objects import Aircraft , PanelData
 
 class AircraftManager:
-    def __init__(self,add_object_th , memory_time , relation_airport_th):
+    def __init__(self,add_object_th , memory_time , relation_airport_th, view_bounds=(0, 0, 1920, 1080)):
         self.aircrafts = {} # A dictionary to store Aircraft objects, with their ID as the key.
         self.th = add_object_th # Confidence threshold for adding a new object.
         self.memory_time = memory_time # How long to keep a lost aircraft in memory before deleting.
         self.relation_airport_th = relation_airport_th # Distance threshold to associate an aircraft with an airport text.
+        self.view_bounds = view_bounds # (left, up, right, down) of the visible area, passed to every Aircraft.
+        self._location_keys = {} # aircraft ID -> (bbox, registry version) of its last location lookup.
     def add_or_update_aircraft(self, aircraft_id, bbox, conf , cls_id):
         if aircraft_id in self.aircrafts:
             # If the aircraft already exists, call its update method with the new data.
             self.aircrafts[aircraft_id].update(bbox,conf ,cls_id)
         else:
             # If it's a new ID, create a new Aircraft object and add it to the dictionary.
-            new_aircraft = Aircraft(id=aircraft_id, bbox=bbox, conf = conf,cls_id=cls_id)
+            new_aircraft = Aircraft(id=aircraft_id, bbox=bbox, conf = conf,cls_id=cls_id, view_bounds=self.view_bounds)
             self.aircrafts[aircraft_id] = new_aircraft
 
     def get_aircraft(self, aircraft_id):
@@ -25,6 +27,7 @@ class AircraftManager:
         # Delete an aircraft from the manager.
         if aircraft_id in self.aircrafts:
             del self.aircrafts[aircraft_id]
+            self._location_keys.pop(aircraft_id, None)
             return True # Return True on successful removal.
         else:
             return False # Return False if the aircraft was not found.
@@ -41,17 +44,18 @@ class AircraftManager:
 
 
 
-    def update(self, result , panel_boundaries , map_texts):
+    def update(self, detections , panel_boundaries , map_labels):
+        # detections is an Objects.Detections (the tracked boxes of the current frame).
         track_id_list = [] # Keep track of all object IDs seen in the current frame.
-        if result.boxes.id is None:
+        if detections.ids is None:
             return # Exit if there are no tracked objects in the result.
-        for i in range(len(result.boxes.id)):
-            bbox = result.boxes.xyxy[i].tolist() # Get the bounding box coordinates.
+        for i in range(len(detections.ids)):
+            bbox = detections.xyxy[i].tolist() # Get the bounding box coordinates.
             if self._is_in(bbox, panel_boundaries): # Check if the object is within the side panel area.
                 continue # If it's a panel element, ignore it.
-            conf = result.boxes.conf[i].item() # Get the detection confidence.
-            cls = result.boxes.cls[i].item() # Get the class ID.
-            track_id = result.boxes.id[i].int().item() # Get the unique tracking ID.
+            conf = detections.conf[i].item() # Get the detection confidence.
+            cls = detections.cls[i].item() # Get the class ID.
+            track_id = int(detections.ids[i]) # Get the unique tracking ID.
             track_id_list.append(track_id) # Add the ID to the list for this frame.
             if conf > self.th:
                 # If confidence is high enough, add or update the aircraft.
@@ -64,7 +68,12 @@ class AircraftManager:
             # For each lost aircraft, update its status (bbox=None, conf=0).
             self.add_or_update_aircraft(track_id, None, 0, None)
         self._cleanup_lost_aircrafts() # Clean up aircraft that have been lost for too long.
-        self._determine_aircrafts_locations(map_texts) # Try to associate aircraft with nearby text on the map.
+        self._determine_aircrafts_locations(map_labels) # Try to associate aircraft with nearby text on the map.
+
+    def refresh_locations(self, map_labels):
+        # Associates the aircraft with the map texts again after the labels were read again (e.g. by an OCR pass
+        # that ran after update). Only aircraft whose lookup is out of date are looked up.
+        self._determine_aircrafts_locations(map_labels)
 
     def add_panel_to_aircraft(self, aircraft_id, panel_data):
         # Assigns PanelData (from OCR) to a specific aircraft.
@@ -102,27 +111,33 @@ class AircraftManager:
         distance = math.sqrt((center1[0] - center2[0])**2 + (center1[1] - center2[1])**2)
         return distance
 
-    def _determine_aircrafts_locations(self, map_texts):
+    def _determine_aircrafts_locations(self, map_labels):
+        # map_labels is the MapLabelRegistry holding the texts found on the map.
         # Creates a set of aircraft that are currently in a "lost" state.
         currently_lost_aircrafts = set()
         for id, aircraft in self.aircrafts.items():
             if aircraft.condition == 1: # Condition 1 typically means 'lost'.
                 currently_lost_aircrafts.add(id)
-        # Iterate through all texts found on the map.
-        for text in map_texts:
-            # Iterate through all managed aircraft.
-            for id, aircraft in self.aircrafts.items():
-                c1 = self._get_box_center(aircraft.bbox) # Aircraft's center.
-                c2 = self._get_box_center(text['box']) # Text's center.
-
-                centers_distance = self._distance(c1, c2) # Calculate distance between them.
-
-                if centers_distance < self.relation_airport_th:
-                    # If the text is close enough to the aircraft, assume it's its location.
-                    aircraft.location = text['text']
-                    if id in currently_lost_aircrafts:
-                        # If a lost aircraft is now near a location, update its status.
-                        aircraft.condition = 6 # Condition 6 might mean 're-identified at location'.
+        # Iterate through all managed aircraft and look up the nearest map text.
+        for id, aircraft in self.aircrafts.items():
+            c1 = self._get_box_center(aircraft.bbox) # Aircraft's center.
+            if c1 is None:
+                continue
+            # Only look again if the aircraft moved or the map labels changed since the last lookup.
+            lookup_key = (tuple(aircraft.bbox), map_labels.version)
+            if self._location_keys.get(id) == lookup_key:
+                continue
+            self._location_keys[id] = lookup_key
+
+            # _get_box_center works with doubled coordinates, so the point and the threshold are halved
+            # to keep the same association distance as before.
+            text = map_labels.find_nearest((c1[0] / 2, c1[1] / 2), self.relation_airport_th / 2)
+            if text is not None:
+                # If the text is close enough to the aircraft, assume it's its location.
+                aircraft.location = text
+                if id in currently_lost_aircrafts:
+                    # If a lost aircraft is now near a location, update its status.
+                    aircraft.condition = 6 # Condition 6 might mean 're-identified at location'.
     def _cleanup_lost_aircrafts(self):
         # It's important to create a separate list of IDs to remove,
         # because you can't modify a dictionary while iterating over it.
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+class Detections:
+    """
+    The tracked detections of one frame as plain NumPy arrays.
+
+    It decouples the tracking logic from the detector: AircraftManager reads the same values whether they
+    come from a live YOLO result or from a recorded run (see Storage.InferenceCache).
+    """
+
+    def __init__(self, xyxy, conf, cls, ids=None):
+        """
+        Args:
+            xyxy (np.ndarray): (N, 4) float32 boxes.
+            conf (np.ndarray): (N,) float32 confidences.
+            cls (np.ndarray): (N,) float32 class IDs.
+            ids (np.ndarray or None): (N,) int64 track IDs, or None if the tracker did not assign any.
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls, dtype=np.float32).reshape(-1)
+        self.ids = np.asarray(ids, dtype=np.int64).reshape(-1) if ids is not None else None
+
+    @classmethod
+    def from_result(cls, result):
+        """
+        Converts an ultralytics tracking result (one image) into Detections.
+        """
+        boxes = result.boxes
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy(),
+            boxes.id.int().cpu().numpy() if boxes.id is not None else None,
+        )
+
+    def __len__(self):
+        return len(self.xyxy)
@@ -1,4 +1,5 @@
 from .Aircraft import Aircraft
 from .PanelData import PanelData
+from .Detections import Detections
 
-__all__ = ['Aircraft', 'PanelData']
\ No newline at end of file
+__all__ = ['Aircraft', 'PanelData', 'Detections']
\ No newline at end of file
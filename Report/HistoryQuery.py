@@ -0,0 +1,199 @@
+import numpy as np
+
+from Report.IntervalTree import IntervalTree
+
+
+class HistoryQuery:
+    """
+    A read-only query layer over the tracking history of a run.
+
+    The timeline is collapsed into per-aircraft state intervals (see TimelineStore.intervals) and indexed:
+
+    * an interval tree over all intervals, for time window queries,
+    * inverted indexes from each location and each condition to an interval tree of its own intervals,
+    * per-aircraft slices of the intervals and the precomputed condition transitions of each aircraft.
+
+    Typical questions ("which aircraft were near BCN between frames 3000 and 6000", "all lost/re-detected
+    transitions of ID 17") are then answered from the indexes without scanning the timeline.
+    """
+
+    def __init__(self, timeline, frame_step=None, condition_names=None):
+        """
+        Args:
+            timeline (TimelineStore): The logged timeline of the run.
+            frame_step (int or None): Frame distance between two logged frames. Larger gaps split intervals.
+            condition_names (list): Names of the condition codes (config.conditions), used in the results
+                                    and accepted in the queries.
+        """
+        self.condition_names = list(condition_names or [])
+        self.location_names = list(timeline.location_names)
+
+        # 1. Collapse every aircraft into intervals and store them column-wise, grouped by aircraft
+        parts = []
+        self._aircraft_slices = {}
+        offset = 0
+        for aircraft_id in timeline.group_by_aircraft():
+            intervals = timeline.intervals(aircraft_id, frame_step=frame_step)
+            count = len(intervals['start_frame'])
+            parts.append((aircraft_id, intervals))
+            self._aircraft_slices[aircraft_id] = (offset, offset + count)
+            offset += count
+
+        def column(key, dtype):
+            if not parts:
+                return np.empty(0, dtype=dtype)
+            return np.concatenate([intervals[key] for _, intervals in parts]).astype(dtype)
+
+        self.aircraft_id = np.concatenate([np.full(len(intervals['start_frame']), aircraft_id, dtype=np.int64)
+                                           for aircraft_id, intervals in parts]) if parts else np.empty(0, np.int64)
+        self.start_frame = column('start_frame', np.int64)
+        self.end_frame = column('end_frame', np.int64)
+        self.location = column('location', np.int32)
+        self.condition = column('condition', np.int16)
+        self.direction_bucket = column('direction_bucket', np.int16)
+
+        # 2. Interval tree over everything, plus the inverted indexes (value -> tree of its intervals)
+        self._tree = IntervalTree(self.start_frame, self.end_frame)
+        self._location_index = self._build_index(self.location)
+        self._condition_index = self._build_index(self.condition)
+
+        # 3. Condition transitions: consecutive intervals of the same aircraft with different conditions
+        same_aircraft = self.aircraft_id[1:] == self.aircraft_id[:-1]
+        changed = np.flatnonzero(same_aircraft & (self.condition[1:] != self.condition[:-1])) + 1
+        self._transition_index = changed  # Index of the interval that starts with the new condition
+
+    @classmethod
+    def from_report(cls, report, frame_step=None, condition_names=None):
+        """Builds the query layer over the timeline of a Report."""
+        return cls(report.timeline, frame_step=frame_step, condition_names=condition_names)
+
+    def _build_index(self, values):
+        """
+        Returns {value: (interval indices, IntervalTree over those intervals)}.
+        """
+        index = {}
+        if values.size == 0:
+            return index
+        order = np.argsort(values, kind='stable')
+        bounds = np.flatnonzero(np.diff(values[order])) + 1
+        for members in np.split(order, bounds):
+            index[int(values[members[0]])] = (members, IntervalTree(self.start_frame[members], self.end_frame[members]))
+        return index
+
+    # --- Queries ---
+
+    def intervals(self, start_frame=None, end_frame=None, aircraft_id=None, location=None, condition=None):
+        """
+        Returns the state intervals that overlap a frame window and match the filters.
+
+        Args:
+            start_frame, end_frame (int or None): The frame window (inclusive). None means unbounded.
+            aircraft_id (int or None): Only intervals of this aircraft.
+            location (str or None): Only intervals whose location name contains this text (case-insensitive).
+            condition (int, str or None): Only intervals with this condition (code or name).
+
+        Returns:
+            list: One dict per interval ('aircraft_id', 'start_frame', 'end_frame', 'location',
+                  'condition', 'direction_bucket'), grouped by aircraft (in order of appearance) and
+                  ordered by start frame.
+        """
+        low = start_frame if start_frame is not None else np.iinfo(np.int64).min
+        high = end_frame if end_frame is not None else np.iinfo(np.int64).max
+
+        # 1. Start from the most selective index
+        if aircraft_id is not None:
+            begin, end = self._aircraft_slices.get(aircraft_id, (0, 0))
+            # The intervals of one aircraft are disjoint and sorted, so the window is found by binary search
+            starts = self.start_frame[begin:end]
+            ends = self.end_frame[begin:end]
+            first = begin + int(np.searchsorted(ends, low, side='left'))
+            last = begin + int(np.searchsorted(starts, high, side='right'))
+            hits = np.arange(first, last)
+        elif location is not None:
+            hits = self._query_index(self._location_index, self._location_codes(location), low, high)
+        elif condition is not None:
+            hits = self._query_index(self._condition_index, [self._condition_code(condition)], low, high)
+        else:
+            hits = np.asarray(self._tree.query(low, high), dtype=np.int64)
+
+        # 2. Apply the remaining filters on the (few) candidates
+        if hits.size and location is not None:
+            hits = hits[np.isin(self.location[hits], self._location_codes(location))]
+        if hits.size and condition is not None:
+            hits = hits[self.condition[hits] == self._condition_code(condition)]
+        return [self._record(i) for i in np.sort(hits)]
+
+    def aircraft_near(self, location, start_frame=None, end_frame=None):
+        """
+        Returns the sorted IDs of the aircraft whose location matched `location` at some point of the window.
+        """
+        hits = self._query_index(self._location_index, self._location_codes(location),
+                                 start_frame if start_frame is not None else np.iinfo(np.int64).min,
+                                 end_frame if end_frame is not None else np.iinfo(np.int64).max)
+        return np.unique(self.aircraft_id[hits]).tolist()
+
+    def at_frame(self, frame):
+        """
+        Returns the state intervals of all aircraft that contain the given frame.
+        """
+        return [self._record(i) for i in sorted(self._tree.stab(frame))]
+
+    def transitions(self, aircraft_id=None, conditions=None, start_frame=None, end_frame=None):
+        """
+        Returns the condition changes (e.g. 'Tracking' -> 'Lost now' -> 'Tracking').
+
+        Args:
+            aircraft_id (int or None): Only the transitions of this aircraft.
+            conditions (list or None): Only transitions from or to one of these conditions (codes or names).
+            start_frame, end_frame (int or None): Only transitions inside this frame window.
+
+        Returns:
+            list: One dict per transition ('aircraft_id', 'frame', 'from', 'to'), ordered by aircraft and frame.
+        """
+        index = self._transition_index
+        if aircraft_id is not None:
+            begin, end = self._aircraft_slices.get(aircraft_id, (0, 0))
+            index = index[np.searchsorted(index, begin + 1):np.searchsorted(index, end)]
+        if start_frame is not None:
+            index = index[self.start_frame[index] >= start_frame]
+        if end_frame is not None:
+            index = index[self.start_frame[index] <= end_frame]
+        if conditions is not None:
+            codes = [self._condition_code(c) for c in conditions]
+            index = index[np.isin(self.condition[index], codes) | np.isin(self.condition[index - 1], codes)]
+        return [{
+            'aircraft_id': int(self.aircraft_id[i]),
+            'frame': int(self.start_frame[i]),
+            'from': self._condition_name(self.condition[i - 1]),
+            'to': self._condition_name(self.condition[i]),
+        } for i in index]
+
+    # --- Helpers ---
+
+    def _query_index(self, index, keys, low, high):
+        hits = [members[np.asarray(tree.query(low, high), dtype=np.int64)]
+                for members, tree in (index[key] for key in keys if key in index)]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
+
+    def _location_codes(self, location):
+        text = str(location).strip().lower()
+        return [code for code, name in enumerate(self.location_names) if text in name.lower()]
+
+    def _condition_code(self, condition):
+        if isinstance(condition, str):
+            return self.condition_names.index(condition) if condition in self.condition_names else -1
+        return int(condition)
+
+    def _condition_name(self, code):
+        code = int(code)
+        return self.condition_names[code] if 0 <= code < len(self.condition_names) else code
+
+    def _record(self, i):
+        return {
+            'aircraft_id': int(self.aircraft_id[i]),
+            'start_frame': int(self.start_frame[i]),
+            'end_frame': int(self.end_frame[i]),
+            'location': self.location_names[self.location[i]],
+            'condition': self._condition_name(self.condition[i]),
+            'direction_bucket': int(self.direction_bucket[i]),
+        }
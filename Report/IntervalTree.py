@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class IntervalTree:
+    """
+    A static interval tree over closed integer intervals [start, end].
+
+    The intervals are sorted by start and the sorted array itself is used as an implicit, balanced binary
+    search tree (the layout of cgranges): the node at index i on level k has its children at i -/+ 2^(k-1).
+    Every node stores the maximum end of its subtree, so a query only visits the subtrees that can overlap.
+    Building takes O(n log n), a query O(log n + number of hits), and there are no per-node objects.
+    """
+
+    def __init__(self, starts, ends):
+        """
+        Args:
+            starts, ends (array-like): The interval bounds (inclusive). Interval i is reported as index i.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        # Python lists are faster than NumPy arrays for the scalar accesses of the queries.
+        self._starts = starts[order].tolist()
+        self._ends = ends[order].tolist()
+        self._ids = order.tolist()
+        self._max_ends, self._root_level = self._build(self._ends)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @staticmethod
+    def _build(ends):
+        """
+        Computes the subtree maximum ends of the implicit tree. Returns (max_ends, root level).
+        """
+        n = len(ends)
+        if n == 0:
+            return [], -1
+        max_ends = list(ends)
+        # The last leaf (even index) and the maximum end of the last subtree built so far
+        last_i = (n - 1) // 2 * 2
+        last = ends[last_i]
+        k = 1
+        while 1 << k <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                # A right child beyond the array end stands for the last existing subtree
+                right = max_ends[i + x] if i + x < n else last
+                max_ends[i] = max(ends[i], max_ends[i - x], right)
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            k += 1
+        return max_ends, k - 1
+
+    def query(self, low, high):
+        """
+        Returns the indices of the intervals that overlap [low, high], in the order of their start.
+        """
+        n = len(self._ids)
+        if n == 0 or high < low:
+            return []
+        starts, ends, max_ends, ids = self._starts, self._ends, self._max_ends, self._ids
+        hits = []
+        # Entries: (node index, level, left child done)
+        stack = [((1 << self._root_level) - 1, self._root_level, False)]
+        while stack:
+            x, k, left_done = stack.pop()
+            if k <= 3:
+                # Small subtree: scan it linearly
+                i0 = x >> k << k
+                i1 = min(i0 + (1 << (k + 1)) - 1, n)
+                i = i0
+                while i < i1 and starts[i] <= high:
+                    if ends[i] >= low:
+                        hits.append(ids[i])
+                    i += 1
+            elif not left_done:
+                stack.append((x, k, True))
+                y = x - (1 << (k - 1))
+                # The left child may be out of range (y >= n); it then stands for the existing left part
+                if y >= n or max_ends[y] >= low:
+                    stack.append((y, k - 1, False))
+            elif x < n and starts[x] <= high:
+                if ends[x] >= low:
+                    hits.append(ids[x])
+                stack.append((x + (1 << (k - 1)), k - 1, False))
+        return hits
+
+    def stab(self, point):
+        """
+        Returns the indices of the intervals that contain point.
+        """
+        return self.query(point, point)
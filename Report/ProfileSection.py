@@ -0,0 +1,85 @@
+class ProfileSection:
+    """
+    The printable stage profile of a run (see Telemetry.StageProfiler.summary): the frame rate and one table row
+    per pipeline stage. It is drawn like a ReportSection, so it is rendered, listed in the table of contents
+    and bookmarked like the aircraft sections.
+    """
+
+    # Column headers and widths of the stage table
+    COLUMNS = [('Stage', 34), ('Runs', 18), ('Mean ms', 20), ('p50 ms', 20), ('p90 ms', 20), ('p99 ms', 20),
+               ('Max ms', 20), ('Share', 16), ('Peak MB', 22)]
+
+    def __init__(self, profile):
+        """
+        Args:
+            profile (dict): The profile summary.
+        """
+        self.title = 'Processing Profile'
+        self.profile = profile
+
+    def draw(self, pdf, font_family):
+        """
+        Draws the profile on a new page of the given document.
+        """
+        pdf.add_page()
+        pdf.set_font(font_family, 'B', 16)
+        pdf.cell(0, 10, self.title, 0, 1, 'C')
+        pdf.ln(5)
+
+        fps = self.profile['fps']
+        pdf.set_font(font_family, '', 10)
+        pdf.multi_cell(0, 6, (
+            f"Processed frames: {self.profile['frames']}\n"
+            f"Wall time: {self.profile['wall_s']:.1f} s\n"
+            f"Frame rate: {f'{fps:.2f} frames/s' if fps else 'N/A'}"
+        ), border=1, align='L')
+        pdf.ln(8)
+
+        pdf.set_font(font_family, 'B', 10)
+        for header, width in self.COLUMNS:
+            pdf.cell(width, 8, header, 1, 0, 'C')
+        pdf.ln()
+
+        pdf.set_font(font_family, '', 9)
+        for name, stats in self.profile['stages'].items():
+            peak = stats['peak_rss_mb']
+            values = [name, str(stats['count']), f"{stats['mean_ms']:.2f}", f"{stats['p50_ms']:.2f}",
+                      f"{stats['p90_ms']:.2f}", f"{stats['p99_ms']:.2f}", f"{stats['max_ms']:.2f}",
+                      f"{stats['share'] * 100:.1f}%", f"{peak:.0f}" if peak is not None else "N/A"]
+            for value, (_, width) in zip(values, self.COLUMNS):
+                pdf.cell(width, 8, value, 1, 0, 'C')
+            pdf.ln()
+
+        pdf.ln(4)
+        pdf.set_font(font_family, 'I', 8)
+        pdf.multi_cell(0, 5, "Latencies per run of a stage. The OCR stages run on a background thread and overlap "
+                             "with YOLO; 'ocr_wait' is the time the pipeline waited for them. Share is the part of "
+                             "the total stage time.")
+
+        live = self.profile.get('live')
+        if live is not None:
+            self._draw_live(pdf, font_family, live)
+
+    @staticmethod
+    def _draw_live(pdf, font_family, live):
+        """
+        Draws the end-to-end latency and the dropped frames of a live run (see FrameProcessor.LiveScheduler).
+        """
+        def ms(value):
+            return f"{value:.1f} ms" if value is not None else "N/A"
+
+        pdf.ln(6)
+        pdf.set_font(font_family, 'B', 12)
+        pdf.cell(0, 8, 'Live Source', 0, 1, 'L')
+        pdf.set_font(font_family, '', 10)
+        drop_rate = live.get('drop_rate')
+        levels = ', '.join(f"{name}: {count}" for name, count in live['levels'].items())
+        pdf.multi_cell(0, 6, (
+            f"Deadline per frame: {ms(live['deadline_ms'])}\n"
+            f"End-to-end latency: mean {ms(live['latency_mean_ms'])}, p50 {ms(live['latency_p50_ms'])}, "
+            f"p90 {ms(live['latency_p90_ms'])}, p99 {ms(live['latency_p99_ms'])}, max {ms(live['latency_max_ms'])}\n"
+            f"Frames over the deadline: {live['deadline_misses']} of {live['frames']}\n"
+            f"Dropped frames: {live.get('frames_dropped', 'N/A')} of {live.get('frames_offered', 'N/A')}"
+            f"{f' ({drop_rate * 100:.1f}%)' if drop_rate is not None else ''}\n"
+            f"Processed frames per level: {levels}"
+        ), border=1, align='L')
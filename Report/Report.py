@@ -1,7 +1,18 @@
 import config
-from fpdf import FPDF
+import functools
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-import copy
+from Report.TimelineStore import TimelineStore
+from Report.ReportSection import ReportSection
+from Report.ProfileSection import ProfileSection
+from Report.HistoryQuery import HistoryQuery
+
+# Names of the 45 degree direction buckets. Angles are counter-clockwise with 0 degrees pointing right.
+DIRECTION_NAMES = ['E', 'NE', 'N', 'NW', 'W', 'SW', 'S', 'SE']
 
 
 class Report:
@@ -10,25 +21,35 @@ class Report:
     and generates a detailed PDF report at the end of the process.
     """
 
+    # Below this many sections, starting the worker processes takes longer than rendering them here
+    MIN_PARALLEL_SECTIONS = 16
+
     def __init__(self):
         """
-        Initializes the reporter with an empty dictionary to hold the history data.
+        Initializes the reporter with an empty dictionary for the static data and an empty timeline store.
         """
-        # Main data structure for storing history data:
-        # { aircraft_id: {'static_data': {...}, 'timeline': [...]}, ... }
+        # Static data per aircraft:
+        # { aircraft_id: {'static_data': {...}}, ... }
         self.history = {}
+        # The per-frame states of all aircraft, stored column-wise (see TimelineStore).
+        self.timeline = TimelineStore()
         self.current_frame_number = 0
+        # Optional Storage.RunStore that receives a copy of every logged row.
+        self.run_store = None
+        # Optional stage profile of the run (Telemetry.StageProfiler.summary), appended to the PDF report.
+        self.profile = None
 
-    def log_frame_data(self):
+    def log_frame_data(self, all_aircrafts, ocr_staleness=0):
         """
         Called after each frame is processed.
-        It takes the instantaneous aircraft data from the config and adds it to its own history record.
+        It takes the instantaneous aircraft data and adds it to its own history record.
+
+        Args:
+            all_aircrafts (list): The tracked Aircraft objects (AircraftManager.get_all_aircrafts).
+            ocr_staleness (int): Number of processed frames since the served OCR results were produced.
         """
         self.current_frame_number += config.skip_frame
 
-        # Get all current aircraft from config
-        all_aircrafts = config.aircraft_manager.get_all_aircrafts()
-
         for aircraft in all_aircrafts:
             aircraft_id = aircraft.id
 
@@ -38,121 +59,337 @@ class Report:
                     'static_data': {
                         'cls_id': aircraft.cls_id,
                         'panel_data': None  # Initially no panel data
-                    },
-                    'timeline': []
+                    }
                 }
 
-            # If panel data is assigned to the aircraft and we don't have it recorded, save it
+            # If panel data is assigned to the aircraft and we don't have it recorded, save it.
+            # PanelData objects are never modified after parsing, so a reference is enough.
             if aircraft.panel is not None and self.history[aircraft_id]['static_data']['panel_data'] is None:
-                # Store by copying the PanelData object
-                self.history[aircraft_id]['static_data']['panel_data'] = copy.deepcopy(aircraft.panel)
+                self.history[aircraft_id]['static_data']['panel_data'] = aircraft.panel
+
+        # Add the state of the current frame to the timeline, one row per aircraft.
+        # The age of the panel/map OCR data is stored in video frames (0 means it was read on this frame).
+        self.timeline.append_rows(
+            self.current_frame_number,
+            [aircraft.id for aircraft in all_aircrafts],
+            [aircraft.location for aircraft in all_aircrafts],
+            [aircraft.direction for aircraft in all_aircrafts],
+            [aircraft.velocity for aircraft in all_aircrafts],
+            [aircraft.condition for aircraft in all_aircrafts],
+            ocr_staleness * config.skip_frame,
+        )
+        if self.run_store is not None:
+            self.run_store.append_rows(self.current_frame_number, all_aircrafts, ocr_staleness * config.skip_frame)
+
+    def build_history_query(self):
+        """
+        Indexes the logged history for fast queries (see HistoryQuery).
+        """
+        return HistoryQuery.from_report(self, frame_step=config.skip_frame, condition_names=config.conditions)
+
+    def get_state(self):
+        """
+        Returns the state needed to continue logging after a restart, for run checkpoints.
+        The timeline itself is not included, it is rebuilt from the rows in the run store.
+        """
+        return {'history': self.history, 'current_frame_number': self.current_frame_number}
 
-            # Create the state of the current frame as a dictionary
-            frame_state = {
-                'frame': self.current_frame_number,
-                'location': aircraft.location,
-                'direction': aircraft.direction,
-                'velocity': aircraft.velocity,
-                'condition': aircraft.condition
-            }
+    def restore_state(self, state, timeline_rows):
+        """
+        Restores a state returned by get_state.
 
-            # Add this state to the aircraft's timeline
-            self.history[aircraft_id]['timeline'].append(frame_state)
+        Args:
+            state (dict): The saved state.
+            timeline_rows (iterable): The logged rows grouped by frame, as yielded by RunStore.iter_timeline.
+        """
+        self.history = state['history']
+        self.current_frame_number = state['current_frame_number']
+        self.timeline = TimelineStore()
+        for frame, aircraft_ids, locations, directions, velocities, conditions, ocr_age in timeline_rows:
+            self.timeline.append_rows(frame, aircraft_ids, locations, directions, velocities, conditions, ocr_age)
+
+    def export_timeline(self, csv_path=None, parquet_path=None):
+        """
+        Writes the timeline to CSV and/or Parquet files.
+        """
+        if len(self.timeline) == 0:
+            print("No logged data found to export.")
+            return
+        if csv_path:
+            try:
+                self.timeline.to_csv(csv_path)
+                print(f"Timeline CSV saved to '{csv_path}'.")
+            except Exception as e:
+                print(f"ERROR: An issue occurred while saving the timeline CSV: {e}")
+        if parquet_path:
+            try:
+                self.timeline.to_parquet(parquet_path)
+                print(f"Timeline Parquet file saved to '{parquet_path}'.")
+            except Exception as e:
+                print(f"ERROR: An issue occurred while saving the timeline Parquet file: {e}")
 
     def generate_pdf_report(self):
         """
         Generates and saves the PDF report using all the collected history data.
+
+        The per-frame timeline is collapsed into intervals of identical state (location, status and
+        direction bucket), so the size of the report and the time to build it scale with the number of
+        events instead of the number of frames. The aircraft sections are independent of each other:
+        they are rendered as separate PDF fragments in worker processes and merged in ID order behind
+        a summary page and a table of contents. The stage profile of the run (if set) is the last section.
+
+        Returns:
+            bool: True if the report was saved.
+        """
+        write_report = self.prepare_pdf_report()
+        return write_report() if write_report is not None else False
+
+    def prepare_pdf_report(self):
+        """
+        Collects the content of the PDF report and returns a function that renders and saves it (see
+        generate_pdf_report). The function only uses what was collected here, so it can run in the background
+        while this process goes on with the next video under other config values.
+
+        Returns:
+            callable or None: Renders and saves the report and returns True if it was saved. None if there is
+                              nothing to report.
         """
-        if not self.history:
+        if not self.history or len(self.timeline) == 0:
             print("No logged data found to generate a report.")
-            return
+            return None
+
+        # Collapse the timeline of each aircraft into intervals and prepare its printable section
+        track_stats = []
+        sections = []
+        for aircraft_id in sorted(self.timeline.group_by_aircraft()):
+            intervals = self.timeline.intervals(aircraft_id, frame_step=config.skip_frame)
+            cls_id = self.history[aircraft_id]['static_data']['cls_id']
+            track_stats.append({
+                'aircraft_id': aircraft_id,
+                'class_name': config.cls_names.get(cls_id, "Unknown Class"),
+                'events': len(intervals['start_frame']),
+                'first_frame': int(intervals['start_frame'][0]),
+                'last_frame': int(intervals['end_frame'][-1]),
+            })
+            sections.append(self._build_section(aircraft_id, intervals))
+        if self.profile is not None:
+            sections.append(ProfileSection(self.profile))
+        return functools.partial(self._write_pdf_report, track_stats, sections, config.pdf_report_path)
 
+    def _write_pdf_report(self, track_stats, sections, pdf_path):
+        """
+        Renders the prepared sections behind the front matter and saves the report to pdf_path.
+        """
         print("Generating PDF report...")
-        pdf = FPDF()
-        # It is important to add a font to avoid issues with non-ASCII characters.
-        # Make sure this font file (.ttf) is in your project's directory.
+
+        # Render the sections and assemble the document
+        try:
+            try:
+                from pypdf import PdfReader, PdfWriter
+            except ImportError:
+                from fpdf import FPDF
+
+                print("Warning: pypdf is not installed. Rendering the report in a single document "
+                      "without a table of contents.")
+                pdf = FPDF()
+                font_family = ReportSection.register_fonts(pdf)
+                self._draw_front_matter(pdf, font_family, track_stats)
+                for section in sections:
+                    section.draw(pdf, font_family)
+                pdf.output(pdf_path)
+            else:
+                fragments = self._render_fragments(sections)
+                page_counts = [count for _, counts in fragments for count in counts]
+                front_matter = PdfReader(io.BytesIO(self._render_front_matter(track_stats, sections, page_counts)))
+
+                writer = PdfWriter()
+                writer.append(front_matter)
+                for fragment, _ in fragments:
+                    writer.append(PdfReader(io.BytesIO(fragment)))
+
+                # Bookmarks to the first page of each aircraft section, matching the table of contents
+                page = len(front_matter.pages)
+                for section, page_count in zip(sections, page_counts):
+                    writer.add_outline_item(section.title, page)
+                    page += page_count
+
+                with open(pdf_path, 'wb') as f:
+                    writer.write(f)
+            print(f"PDF report successfully saved to '{pdf_path}'.")
+            return True
+        except Exception as e:
+            print(f"ERROR: An issue occurred while saving the PDF report: {e}")
+            return False
+
+    def _build_section(self, aircraft_id, intervals):
+        """
+        Formats the header, the panel data and the interval rows of one aircraft.
+
+        Returns:
+            ReportSection: The printable section.
+        """
+        static_info = self.history[aircraft_id]['static_data']
+        cls_name = config.cls_names.get(static_info['cls_id'], "Unknown Class")
+        title = f'Tracking Report: Object ID {aircraft_id} ({cls_name})'
+
+        info_text = None
+        panel_data = static_info.get('panel_data')
+        if panel_data is not None:
+            # Retrieve all relevant data using the PanelData methods
+            flight_num = panel_data.get_flight_number() or "N/A"
+            airline = panel_data.get_airline() or "N/A"
+            reg = panel_data.get_registration() or "N/A"
+            ac_type = panel_data.get_aircraft_type() or "N/A"
+            dep_code = panel_data.get_departure_code() or "???"
+            arr_code = panel_data.get_arrival_code() or "???"
+            route = f"{dep_code} to {arr_code}"
+
+            # Format the information into a multi-line string for better readability in the PDF
+            info_text = (
+                f"Flight: {flight_num} ({airline})\n"
+                f"Route: {route}\n"
+                f"Registration: {reg}   |   Aircraft Type: {ac_type}"
+            )
+
+        rows = []
+        location_names = self.timeline.location_names
+        for i in range(len(intervals['start_frame'])):
+            try:
+                condition_str = config.conditions[intervals['condition'][i]]
+            except (IndexError, TypeError):
+                condition_str = "Unknown"
+
+            bucket = intervals['direction_bucket'][i]
+            direction_str = f"{DIRECTION_NAMES[bucket]} (~{bucket * 45}°)" if bucket >= 0 else "N/A"
+
+            start, end = intervals['start_frame'][i], intervals['end_frame'][i]
+            frames_str = f"{start} - {end}" if end != start else str(start)
+
+            rows.append((frames_str, location_names[intervals['location'][i]], direction_str,
+                         condition_str, str(intervals['max_ocr_age'][i])))
+
+        return ReportSection(aircraft_id, title, info_text, rows)
+
+    def _render_fragments(self, sections):
+        """
+        Renders the sections into PDF fragments, using all cores for long reports. Each worker renders a batch of
+        consecutive sections, so the fragments are already in ID order.
+
+        Returns:
+            list: (PDF fragment bytes, page count per section) tuples, in the order of the sections.
+        """
+        workers = min(len(sections), os.cpu_count() or 1)
+        if workers < 2 or len(sections) < self.MIN_PARALLEL_SECTIONS:
+            return [ReportSection.render_sections(sections)]
+
+        # The workers are never forked from this process: it runs other threads (e.g. the Streamlit server),
+        # whose locks a forked child could inherit in a held state. A forkserver (spawn on Windows) starts them
+        # from a fresh interpreter, and they only import the Report package (see ReportSection.render_sections).
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['Report.ReportSection'])
+        else:
+            context = multiprocessing.get_context('spawn')
+
+        # A few batches per worker keep the load balanced when the sections differ in length
+        n_batches = min(len(sections), workers * 2)
+        bounds = [round(i * len(sections) / n_batches) for i in range(n_batches + 1)]
+        batches = [sections[bounds[i]:bounds[i + 1]] for i in range(n_batches)]
         try:
-            pdf.add_font('DejaVu', '', 'Font/dejavu-fonts-ttf-2.37/ttf/DejaVuSansCondensed.ttf', uni=True)
-            pdf.add_font('DejaVu', 'B', 'Font/dejavu-fonts-ttf-2.37/ttf/DejaVuSansCondensed-Bold.ttf', uni=True)
-            pdf.add_font('DejaVu', 'I', 'Font/dejavu-fonts-ttf-2.37/ttf/DejaVuSansCondensed-Oblique.ttf', uni=True)
-            pdf.add_font('DejaVu', 'BI', 'Font/dejavu-fonts-ttf-2.37/ttf/DejaVuSansCondensed-BoldOblique.ttf', uni=True)
-            font_family = 'DejaVu'
-        except RuntimeError:
-            print("Warning: DejaVu font not found. Using standard font (non-ASCII characters may cause issues).")
-            font_family = 'Arial'
-
-        # Create a separate section for each aircraft
-        for aircraft_id, data in self.history.items():
-            pdf.add_page()
-
-            # --- Header Section ---
-            static_info = data['static_data']
-            cls_name = config.cls_names.get(static_info['cls_id'], "Unknown Class")
-            pdf.set_font(font_family, 'B', 16)
-            pdf.cell(0, 10, f'Tracking Report: Object ID {aircraft_id} ({cls_name})', 0, 1, 'C')
-            pdf.ln(5)
-
-            # --- Panel Data Section (if available) ---
-            panel_data = static_info.get('panel_data')
-            if panel_data is not None:
-                pdf.set_font(font_family, 'B', 12)
-                pdf.cell(0, 10, 'Flight Information (Panel Data)', 0, 1, 'L')
-                pdf.set_font(font_family, '', 10)
-
-                # MODIFICATION: Replaced calls to deprecated methods (get_ground_speed, get_barometric_altitude)
-                # with new methods that reflect the updated data structure from the parser.
-
-                # Retrieve all relevant data using the new PanelData methods
-                flight_num = panel_data.get_flight_number() or "N/A"
-                airline = panel_data.get_airline() or "N/A"
-                reg = panel_data.get_registration() or "N/A"
-                ac_type = panel_data.get_aircraft_type() or "N/A"
-                dep_code = panel_data.get_departure_code() or "???"
-                arr_code = panel_data.get_arrival_code() or "???"
-                route = f"{dep_code} to {arr_code}"
-
-                # Format the information into a multi-line string for better readability in the PDF
-                info_text = (
-                    f"Flight: {flight_num} ({airline})\n"
-                    f"Route: {route}\n"
-                    f"Registration: {reg}   |   Aircraft Type: {ac_type}"
-                )
-
-                # Use multi_cell to render the multi-line string with a border
-                pdf.multi_cell(0, 6, info_text, border=1, align='L')
-                pdf.ln(10)
-
-            # CHANGE: Table header updated (Speed removed, Location header changed)
-            pdf.set_font(font_family, 'B', 10)
-            col_widths = {'frame': 30, 'location': 65, 'direction': 45, 'condition': 50}
-            pdf.cell(col_widths['frame'], 8, 'Frame No', 1, 0, 'C')
-            pdf.cell(col_widths['location'], 8, 'Location', 1, 0, 'C')
-            pdf.cell(col_widths['direction'], 8, 'Direction (Angle)', 1, 0, 'C')
-            pdf.cell(col_widths['condition'], 8, 'Status', 1, 1, 'C')
-
-            # CHANGE: Table content updated (velocity_str removed)
-            pdf.set_font(font_family, '', 9)
-            for frame_log in data['timeline']:
-                try:
-                    condition_str = config.conditions[frame_log['condition']]
-                except (IndexError, TypeError):
-                    condition_str = "Unknown"
-
-                direction_str = f"{frame_log['direction']:.1f}°" if frame_log['direction'] is not None else "N/A"
-
-                pdf.cell(col_widths['frame'], 8, str(frame_log['frame']), 1, 0, 'C')
-                pdf.cell(col_widths['location'], 8, str(frame_log['location']), 1, 0, 'C')
-                pdf.cell(col_widths['direction'], 8, direction_str, 1, 0, 'C')
-                pdf.cell(col_widths['condition'], 8, condition_str, 1, 1, 'C')
-
-        # The report date is added to the last page
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                return list(pool.map(ReportSection.render_sections, batches))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Warning: Parallel report rendering failed ({e}). Rendering the sections sequentially.")
+            return [ReportSection.render_sections(sections)]
+
+    def _render_front_matter(self, track_stats, sections, page_counts):
+        """
+        Renders the summary page and the table of contents as a PDF fragment.
+
+        Args:
+            track_stats (list): Summary numbers per track.
+            sections (list): The sections in the order they are merged.
+            page_counts (list): Number of pages of each rendered section.
+
+        Returns:
+            bytes: The PDF fragment.
+        """
+        from fpdf import FPDF
+
+        # The page numbers in the contents depend on the length of the front matter itself,
+        # so it is rendered again until its page count does not change anymore.
+        front_pages = 2
+        while True:
+            contents = []
+            page = front_pages + 1
+            for section, page_count in zip(sections, page_counts):
+                contents.append((section.title, page))
+                page += page_count
+
+            pdf = FPDF()
+            font_family = ReportSection.register_fonts(pdf)
+            self._draw_front_matter(pdf, font_family, track_stats, contents)
+            if pdf.page_no() == front_pages:
+                return bytes(pdf.output())
+            front_pages = pdf.page_no()
+
+    def _draw_front_matter(self, pdf, font_family, track_stats, contents=None, top_n=20):
+        """
+        Draws the summary page (totals and the tracks with the most events) and, if given,
+        the table of contents as a list of (title, page number) entries.
+        """
+        pdf.add_page()
+        pdf.set_font(font_family, 'B', 16)
+        pdf.cell(0, 10, 'Tracking Report Summary', 0, 1, 'C')
+        pdf.ln(5)
+
+        total_events = sum(stats['events'] for stats in track_stats)
+        pdf.set_font(font_family, '', 10)
+        pdf.multi_cell(0, 6, (
+            f"Tracked objects: {len(track_stats)}\n"
+            f"Logged frames: {self.current_frame_number}\n"
+            f"Events (state intervals): {total_events}"
+        ), border=1, align='L')
+        pdf.ln(8)
+
+        pdf.set_font(font_family, 'B', 12)
+        pdf.cell(0, 10, f'Tracks with the Most Events (top {min(top_n, len(track_stats))})', 0, 1, 'L')
+
+        pdf.set_font(font_family, 'B', 10)
+        col_widths = {'id': 30, 'class': 50, 'events': 30, 'first': 40, 'last': 40}
+        pdf.cell(col_widths['id'], 8, 'Object ID', 1, 0, 'C')
+        pdf.cell(col_widths['class'], 8, 'Class', 1, 0, 'C')
+        pdf.cell(col_widths['events'], 8, 'Events', 1, 0, 'C')
+        pdf.cell(col_widths['first'], 8, 'First Frame', 1, 0, 'C')
+        pdf.cell(col_widths['last'], 8, 'Last Frame', 1, 1, 'C')
+
+        pdf.set_font(font_family, '', 9)
+        busiest = sorted(track_stats, key=lambda stats: stats['events'], reverse=True)[:top_n]
+        for stats in busiest:
+            pdf.cell(col_widths['id'], 8, str(stats['aircraft_id']), 1, 0, 'C')
+            pdf.cell(col_widths['class'], 8, stats['class_name'], 1, 0, 'C')
+            pdf.cell(col_widths['events'], 8, str(stats['events']), 1, 0, 'C')
+            pdf.cell(col_widths['first'], 8, str(stats['first_frame']), 1, 0, 'C')
+            pdf.cell(col_widths['last'], 8, str(stats['last_frame']), 1, 1, 'C')
+
+        # The report date is added to the bottom of the summary page.
+        # The automatic page break is paused, the footer lies below the page break margin.
         pdf.set_font(font_family, 'I', 8)
         report_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        pdf.set_auto_page_break(False)
         pdf.set_y(-15)
         pdf.cell(0, 10, f'Report Generation Date: {report_time}', 0, 0, 'C')
+        pdf.set_auto_page_break(True, margin=20)
 
-        try:
-            pdf.output(config.pdf_report_path)
-            print(f"PDF report successfully saved to '{config.pdf_report_path}'.")
-        except Exception as e:
-            print(f"ERROR: An issue occurred while saving the PDF report: {e}")
\ No newline at end of file
+        if contents is None:
+            return
+
+        # --- Table of contents ---
+        pdf.add_page()
+        pdf.set_font(font_family, 'B', 16)
+        pdf.cell(0, 10, 'Contents', 0, 1, 'C')
+        pdf.ln(5)
+        pdf.set_font(font_family, '', 10)
+        for title, page in contents:
+            pdf.cell(170, 7, title, 0, 0, 'L')
+            pdf.cell(20, 7, str(page), 0, 1, 'R')
@@ -0,0 +1,106 @@
+# Folder of the DejaVu fonts, relative to the project directory.
+FONT_DIR = 'Font/dejavu-fonts-ttf-2.37/ttf'
+
+
+class ReportSection:
+    """
+    The printable content of one aircraft section of the PDF report: the header, the panel data block
+    and the interval table.
+
+    A section only holds plain strings, so it can be sent to a worker process and rendered there into
+    a PDF fragment, without access to the project config or the tracking objects.
+    """
+
+    # Column widths of the interval table
+    COL_WIDTHS = {'frames': 40, 'location': 55, 'direction': 30, 'condition': 45, 'ocr_age': 20}
+
+    def __init__(self, aircraft_id, title, info_text, rows):
+        """
+        Args:
+            aircraft_id (int): ID of the aircraft.
+            title (str): Title of the section.
+            info_text (str or None): The multi-line flight information, None if no panel data was read.
+            rows (list): One (frames, location, direction, status, max_ocr_age) tuple of strings per interval.
+        """
+        self.aircraft_id = aircraft_id
+        self.title = title
+        self.info_text = info_text
+        self.rows = rows
+
+    @staticmethod
+    def register_fonts(pdf):
+        """
+        Registers the DejaVu fonts on a document. Returns the font family to use.
+        """
+        # It is important to add a font to avoid issues with non-ASCII characters.
+        # Make sure this font file (.ttf) is in your project's directory.
+        try:
+            pdf.add_font('DejaVu', '', f'{FONT_DIR}/DejaVuSansCondensed.ttf', uni=True)
+            pdf.add_font('DejaVu', 'B', f'{FONT_DIR}/DejaVuSansCondensed-Bold.ttf', uni=True)
+            pdf.add_font('DejaVu', 'I', f'{FONT_DIR}/DejaVuSansCondensed-Oblique.ttf', uni=True)
+            pdf.add_font('DejaVu', 'BI', f'{FONT_DIR}/DejaVuSansCondensed-BoldOblique.ttf', uni=True)
+            return 'DejaVu'
+        except (RuntimeError, FileNotFoundError):
+            print("Warning: DejaVu font not found. Using standard font (non-ASCII characters may cause issues).")
+            return 'Arial'
+
+    def draw(self, pdf, font_family):
+        """
+        Draws the section on new pages of the given document.
+        """
+        pdf.add_page()
+
+        # --- Header Section ---
+        pdf.set_font(font_family, 'B', 16)
+        pdf.cell(0, 10, self.title, 0, 1, 'C')
+        pdf.ln(5)
+
+        # --- Panel Data Section (if available) ---
+        if self.info_text is not None:
+            pdf.set_font(font_family, 'B', 12)
+            pdf.cell(0, 10, 'Flight Information (Panel Data)', 0, 1, 'L')
+            pdf.set_font(font_family, '', 10)
+            # Use multi_cell to render the multi-line string with a border
+            pdf.multi_cell(0, 6, self.info_text, border=1, align='L')
+            pdf.ln(10)
+
+        # --- Interval table: one row per run of identical state ---
+        col_widths = self.COL_WIDTHS
+        pdf.set_font(font_family, 'B', 10)
+        pdf.cell(col_widths['frames'], 8, 'Frames', 1, 0, 'C')
+        pdf.cell(col_widths['location'], 8, 'Location', 1, 0, 'C')
+        pdf.cell(col_widths['direction'], 8, 'Direction', 1, 0, 'C')
+        pdf.cell(col_widths['condition'], 8, 'Status', 1, 0, 'C')
+        pdf.cell(col_widths['ocr_age'], 8, 'Max OCR Age', 1, 1, 'C')
+
+        pdf.set_font(font_family, '', 9)
+        for frames_str, location_str, direction_str, condition_str, ocr_age_str in self.rows:
+            pdf.cell(col_widths['frames'], 8, frames_str, 1, 0, 'C')
+            pdf.cell(col_widths['location'], 8, location_str, 1, 0, 'C')
+            pdf.cell(col_widths['direction'], 8, direction_str, 1, 0, 'C')
+            pdf.cell(col_widths['condition'], 8, condition_str, 1, 0, 'C')
+            pdf.cell(col_widths['ocr_age'], 8, ocr_age_str, 1, 1, 'C')
+
+    @staticmethod
+    def render_sections(sections):
+        """
+        Renders consecutive sections into one standalone PDF fragment with its own font registration.
+        Registering the fonts is the expensive part, so a worker renders a batch of sections at once.
+
+        Args:
+            sections (list): The sections to render, in order.
+
+        Returns:
+            tuple: (the PDF fragment as bytes, the number of pages of each section)
+        """
+        # fpdf takes a moment to import; it is only needed when a report is rendered.
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        font_family = ReportSection.register_fonts(pdf)
+        page_counts = []
+        for section in sections:
+            first_page = pdf.page_no()
+            section.draw(pdf, font_family)
+            page_counts.append(pdf.page_no() - first_page)
+        return bytes(pdf.output()), page_counts
@@ -0,0 +1,238 @@
+import csv
+
+import numpy as np
+
+
+class TimelineStore:
+    """
+    A columnar store for the per-frame state of every tracked aircraft.
+
+    Each column is a preallocated NumPy array that grows geometrically, so logging a frame only writes
+    a few numbers instead of creating a dictionary per aircraft. Locations are dictionary-encoded
+    (an int32 code per row plus one list of distinct names). Missing directions/velocities are NaN.
+    The columns can be exported to Parquet (through pyarrow, without copying the numeric data) and CSV,
+    and grouped per aircraft for the PDF report.
+    """
+
+    COLUMNS = {
+        'frame': np.int64,
+        'aircraft_id': np.int64,
+        'location': np.int32,  # Code into self.location_names
+        'direction': np.float32,
+        'velocity': np.float32,
+        'condition': np.int16,
+        'ocr_age': np.int32,
+    }
+
+    def __init__(self, initial_capacity=4096):
+        self._capacity = max(1, initial_capacity)
+        self._size = 0
+        self._data = {name: np.empty(self._capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.location_names = []
+        self._location_codes = {}
+        self._groups = None  # Cached result of group_by_aircraft, invalidated by appends.
+
+    def __len__(self):
+        return self._size
+
+    def encode_location(self, name):
+        """Returns the dictionary code of a location name, adding it if it is new."""
+        name = str(name)
+        code = self._location_codes.get(name)
+        if code is None:
+            code = len(self.location_names)
+            self.location_names.append(name)
+            self._location_codes[name] = code
+        return code
+
+    def append_rows(self, frame, aircraft_ids, locations, directions, velocities, conditions, ocr_age=0):
+        """
+        Appends the rows of one frame (one row per aircraft).
+
+        Args:
+            frame (int): The frame number shared by all rows.
+            aircraft_ids, locations, directions, velocities, conditions (sequences): One entry per aircraft.
+                Locations are names; directions/velocities may contain None.
+            ocr_age (int): Age of the OCR data for this frame, shared by all rows.
+        """
+        n = len(aircraft_ids)
+        if n == 0:
+            return
+        self._reserve(self._size + n)
+        start, end = self._size, self._size + n
+
+        d = self._data
+        d['frame'][start:end] = frame
+        d['aircraft_id'][start:end] = aircraft_ids
+        d['location'][start:end] = [self.encode_location(loc) for loc in locations]
+        d['direction'][start:end] = [np.nan if v is None else v for v in directions]
+        d['velocity'][start:end] = [np.nan if v is None else v for v in velocities]
+        d['condition'][start:end] = conditions
+        d['ocr_age'][start:end] = ocr_age
+
+        self._size = end
+        self._groups = None
+
+    def column(self, name):
+        """Returns a read-only view (no copy) of the filled part of a column."""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def columns(self):
+        """Returns all columns as a dict of read-only views."""
+        return {name: self.column(name) for name in self.COLUMNS}
+
+    def decode_locations(self, codes):
+        """Turns location codes back into names."""
+        names = self.location_names
+        return [names[c] for c in codes]
+
+    def group_by_aircraft(self):
+        """
+        Groups the row indices by aircraft.
+
+        Returns:
+            dict: aircraft_id -> array of row indices in frame order. Aircraft are ordered by first appearance.
+        """
+        if self._groups is not None:
+            return self._groups
+
+        ids = self.column('aircraft_id')
+        if ids.size == 0:
+            self._groups = {}
+            return self._groups
+
+        # A stable sort keeps the rows of every aircraft in insertion (= frame) order.
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        boundaries = np.flatnonzero(np.diff(sorted_ids)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [sorted_ids.size]))
+
+        groups = {int(sorted_ids[s]): order[s:e] for s, e in zip(starts, ends)}
+        # Keep the order in which the aircraft were first seen (like the old history dictionary).
+        self._groups = dict(sorted(groups.items(), key=lambda item: item[1][0]))
+        return self._groups
+
+    def aircraft_view(self, aircraft_id):
+        """
+        Returns the columns of one aircraft's rows (gathered copies of the group's rows).
+        """
+        rows = self.group_by_aircraft().get(aircraft_id)
+        if rows is None:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        return {name: self._data[name][rows] for name in self.COLUMNS}
+
+    @staticmethod
+    def direction_buckets(directions, bucket_size=45.0):
+        """
+        Quantizes direction angles into buckets centered on multiples of bucket_size. NaN becomes -1.
+        """
+        buckets = np.full(directions.shape, -1, dtype=np.int16)
+        valid = ~np.isnan(directions)
+        n_buckets = int(round(360.0 / bucket_size))
+        buckets[valid] = (((directions[valid] + bucket_size / 2) % 360.0) // bucket_size).astype(np.int16) % n_buckets
+        return buckets
+
+    def intervals(self, aircraft_id, frame_step=None, bucket_size=45.0):
+        """
+        Collapses the rows of one aircraft into intervals of identical state
+        (same location, condition and direction bucket, without gaps in the frame numbers).
+
+        Args:
+            aircraft_id (int): The aircraft to collapse.
+            frame_step (int or None): The expected frame distance between two rows. A larger distance
+                                      starts a new interval. If None, gaps are ignored.
+            bucket_size (float): Width of the direction buckets in degrees.
+
+        Returns:
+            dict: Arrays 'start_frame', 'end_frame', 'location', 'condition', 'direction_bucket',
+                  'rows' (number of rows per interval) and 'max_ocr_age', one entry per interval.
+        """
+        view = self.aircraft_view(aircraft_id)
+        frames = view['frame']
+        n = frames.size
+        if n == 0:
+            return {key: np.empty(0, dtype=np.int64) for key in
+                    ('start_frame', 'end_frame', 'location', 'condition', 'direction_bucket', 'rows', 'max_ocr_age')}
+
+        buckets = self.direction_buckets(view['direction'], bucket_size)
+        changed = np.zeros(n, dtype=bool)
+        changed[0] = True
+        changed[1:] |= view['location'][1:] != view['location'][:-1]
+        changed[1:] |= view['condition'][1:] != view['condition'][:-1]
+        changed[1:] |= buckets[1:] != buckets[:-1]
+        if frame_step is not None:
+            changed[1:] |= np.diff(frames) > frame_step
+
+        starts = np.flatnonzero(changed)
+        ends = np.concatenate((starts[1:], [n])) - 1
+        return {
+            'start_frame': frames[starts],
+            'end_frame': frames[ends],
+            'location': view['location'][starts],
+            'condition': view['condition'][starts],
+            'direction_bucket': buckets[starts],
+            'rows': ends - starts + 1,
+            'max_ocr_age': np.maximum.reduceat(view['ocr_age'], starts),
+        }
+
+    def to_arrow(self):
+        """
+        Returns the timeline as a pyarrow Table. Numeric columns are wrapped without copying;
+        the location column becomes a dictionary array over the location names.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise RuntimeError("pyarrow is required for Arrow/Parquet export.") from e
+
+        arrays = {}
+        for name in self.COLUMNS:
+            if name == 'location':
+                arrays[name] = pa.DictionaryArray.from_arrays(pa.array(self.column('location')),
+                                                              pa.array(self.location_names, type=pa.string()))
+            elif name in ('direction', 'velocity'):
+                values = self.column(name)
+                arrays[name] = pa.array(values, mask=np.isnan(values))
+            else:
+                arrays[name] = pa.array(self.column(name))
+        return pa.table(arrays)
+
+    def to_parquet(self, path):
+        """Writes the timeline to a Parquet file."""
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    def to_csv(self, path):
+        """Writes the timeline to a CSV file (locations as names, missing values as empty cells)."""
+        cols = self.columns()
+        names = self.location_names
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(self.COLUMNS))
+            for i in range(self._size):
+                direction = cols['direction'][i]
+                velocity = cols['velocity'][i]
+                writer.writerow([
+                    int(cols['frame'][i]),
+                    int(cols['aircraft_id'][i]),
+                    names[cols['location'][i]],
+                    '' if np.isnan(direction) else f"{direction:.2f}",
+                    '' if np.isnan(velocity) else f"{velocity:.2f}",
+                    int(cols['condition'][i]),
+                    int(cols['ocr_age'][i]),
+                ])
+
+    def _reserve(self, required):
+        if required <= self._capacity:
+            return
+        new_capacity = self._capacity
+        while new_capacity < required:
+            new_capacity *= 2
+        for name, column in self._data.items():
+            grown = np.empty(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+        self._capacity = new_capacity
@@ -1,2 +1,7 @@
 from .Report import Report
-__all__ = ['Report']
\ No newline at end of file
+from .TimelineStore import TimelineStore
+from .ReportSection import ReportSection
+from .ProfileSection import ProfileSection
+from .IntervalTree import IntervalTree
+from .HistoryQuery import HistoryQuery
+__all__ = ['Report', 'TimelineStore', 'ReportSection', 'ProfileSection', 'IntervalTree', 'HistoryQuery']
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+
+from Storage.FileLock import FileLock
+
+
+class FileDigests:
+    """
+    SHA-256 digests of file contents, memoized by (size, modification time) in a small JSON file,
+    so that a large video or model file is only hashed once as long as it does not change. The file may be shared
+    by several processes: it is re-read and rewritten under a file lock, so no process drops the digests of another.
+    """
+
+    def __init__(self, memo_path):
+        """
+        Args:
+            memo_path (str): Path of the JSON file that keeps the digests.
+        """
+        self.memo_path = memo_path
+        self._lock = FileLock(memo_path + '.lock')
+        with self._lock:
+            self._memo = self._load()
+
+    def digest(self, path):
+        """
+        Returns the SHA-256 of a file's content. The result is remembered until the file changes.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        memo = self._memo.get(path)
+        if memo is not None and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+            return memo[2]
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._memo = self._load()
+            self._memo[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self._save()
+        return digest
+
+    def _load(self):
+        try:
+            with open(self.memo_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        # Written to a temporary file first, so a crash never leaves a half-written file behind.
+        # Only called while the lock is held.
+        temp_path = FileLock.temp_path(self.memo_path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._memo, f)
+        os.replace(temp_path, self.memo_path)
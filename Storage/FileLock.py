@@ -0,0 +1,60 @@
+import os
+import threading
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class FileLock:
+    """
+    An exclusive lock between processes on a lock file, used as a context manager around read-modify-write
+    updates of files that several workers share (e.g. the index of the result cache). The lock is released
+    by the operating system if the process dies.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The lock file. It is created if it does not exist and is never removed.
+        """
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        try:
+            if msvcrt is not None:
+                # msvcrt.LK_LOCK only retries for 10 seconds, so it is retried until the lock is taken.
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def temp_path(path):
+        """Returns a temporary file name next to path that no other process or thread uses."""
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
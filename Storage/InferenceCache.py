@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from Objects import Detections
+from Storage.FileDigests import FileDigests
+from Storage.FileLock import FileLock
+
+
+class InferenceCache:
+    """
+    Records the raw inference outputs of a run, so that the tracking and report parameters can be re-tuned
+    by replaying the run without running YOLO, the OCR or even decoding the video.
+
+    Per processed frame it keeps what the post-processing reads from the images:
+
+    * the tracked detections (boxes, confidences, classes, track IDs),
+    * the average color of every box that the current aircraft search may look at,
+    * the panel boundary and the measured map motion,
+    * the OCR results, if an OCR pass ran on the frame.
+
+    A recording is a directory named after its key, with one flat binary file of fixed-size records per
+    table (frames, detections, box colors) plus a byte file of the JSON-encoded OCR results. The files are
+    appended while the run is processed and memory-mapped when they are replayed. A recording is written to a
+    temporary directory and only moved to its key directory, with its `meta.json`, when it is complete, so an
+    interrupted run is never replayed and several processes (e.g. the batch workers) can share the cache.
+
+    The OCR passes are replayed as they were recorded: changing the OCR interval or the panel layout
+    needs a new recording (they are part of the key).
+
+    When the recordings grow above `max_bytes`, the least recently recorded or replayed ones are removed, together
+    with the temporary directories of recordings that were interrupted (e.g. by a crash) long ago.
+    """
+
+    # Changing the record layout invalidates all older recordings.
+    CACHE_VERSION = 1
+    META_FILE = 'meta.json'
+    DIGESTS_FILE = 'digests.json'
+    LOCK_FILE = 'recordings.lock'
+    # A temporary recording that was not written to for this many seconds belongs to a crashed process.
+    STALE_SECONDS = 24 * 3600
+
+    # What kind of OCR pass ran on a frame (see FrameProcessor.process_frame)
+    OCR_NONE = 0
+    OCR_SCHEDULED = 1  # Before the detections, because it was due
+    OCR_FORCED = 2  # After the detections, because the selected aircraft changed
+
+    FRAME_DTYPE = np.dtype([
+        ('frame', '<i8'),
+        ('panel_boundary_x', '<i4'),  # -1: no panel
+        ('motion', 'i1'), ('dx', '<f8'), ('dy', '<f8'), ('img_w', '<i4'), ('img_h', '<i4'), ('map_offset', '<i4'),
+        ('has_ids', '?'),
+        ('det_start', '<i8'), ('det_count', '<i4'),
+        ('color_start', '<i8'), ('color_count', '<i4'),
+        ('ocr_kind', 'i1'), ('ocr_start', '<i8'), ('ocr_length', '<i8'),
+    ])
+    DETECTION_DTYPE = np.dtype([('xyxy', '<f4', (4,)), ('conf', '<f4'), ('cls', '<f4'), ('track_id', '<i8')])
+    COLOR_DTYPE = np.dtype([('box', '<f4', (4,)), ('color', '<f8', (3,))])
+
+    TABLES = {'frames': FRAME_DTYPE, 'detections': DETECTION_DTYPE, 'colors': COLOR_DTYPE}
+
+    def __init__(self, cache_dir, max_bytes=None):
+        """
+        Args:
+            cache_dir (str): Directory of the recordings. It is created if it does not exist.
+            max_bytes (int or None): The maximum total size of the recordings. None does not limit it.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._digests = FileDigests(os.path.join(cache_dir, self.DIGESTS_FILE))
+        self._lock = FileLock(os.path.join(cache_dir, self.LOCK_FILE))
+        self._key = None
+        self._record_dir = None  # The temporary directory of the current recording
+        self._files = None
+        self._counts = None
+
+    def file_digest(self, path):
+        """
+        Returns the SHA-256 of a file's content. The result is remembered until the file changes.
+        """
+        return self._digests.digest(path)
+
+    def make_key(self, video_path, model_path, params):
+        """
+        Returns the key of a recording.
+
+        Args:
+            video_path (str): The source video.
+            model_path (str): The model weights.
+            params (dict): The parameters that change the inference outputs (JSON serializable).
+        """
+        key_data = {
+            'version': self.CACHE_VERSION,
+            'video': self.file_digest(video_path),
+            'model': self.file_digest(model_path),
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def has_recording(self, key):
+        """Returns True if a complete recording exists for the key."""
+        return os.path.exists(os.path.join(self.cache_dir, key, self.META_FILE))
+
+    # --- Recording ---
+
+    def start_recording(self, key):
+        """
+        Starts a new recording for the key. An older recording with the same key is replaced when the new one is
+        finished.
+        """
+        record_dir = FileLock.temp_path(os.path.join(self.cache_dir, key))
+        shutil.rmtree(record_dir, ignore_errors=True)
+        os.makedirs(record_dir)
+        self._key = key
+        self._record_dir = record_dir
+        self._files = {name: open(os.path.join(record_dir, name + '.bin'), 'wb')
+                       for name in list(self.TABLES) + ['ocr']}
+        self._counts = {'detections': 0, 'colors': 0, 'ocr': 0, 'frames': 0}
+        return self
+
+    def record_frame(self, frame, panel_boundary_x, motion, detections, box_colors, ocr_kind=OCR_NONE, ocr=None):
+        """
+        Appends the inference outputs of one processed frame.
+
+        Args:
+            frame (int): The frame number in the source video.
+            panel_boundary_x (int or None): The panel boundary of the frame.
+            motion (tuple): The map motion (MapLabelRegistry.last_motion).
+            detections (Detections): The tracked detections.
+            box_colors (dict): tuple(box) -> average color (FindCurrentAircraft.box_colors).
+            ocr_kind (int): One of the OCR_* constants.
+            ocr (tuple or None): (panel data dict or None, map texts) of the OCR pass.
+        """
+        # 1. Detections
+        det = np.zeros(len(detections), dtype=self.DETECTION_DTYPE)
+        det['xyxy'] = detections.xyxy
+        det['conf'] = detections.conf
+        det['cls'] = detections.cls
+        if detections.ids is not None:
+            det['track_id'] = detections.ids
+        det.tofile(self._files['detections'])
+
+        # 2. Box colors
+        colors = np.zeros(len(box_colors), dtype=self.COLOR_DTYPE)
+        if box_colors:
+            colors['box'] = np.array(list(box_colors.keys()), dtype=np.float32)
+            colors['color'] = np.array(list(box_colors.values()), dtype=np.float64)
+        colors.tofile(self._files['colors'])
+
+        # 3. OCR results
+        ocr_bytes = b''
+        if ocr_kind != self.OCR_NONE:
+            ocr_bytes = json.dumps(ocr, default=self._to_json).encode('utf-8')
+            self._files['ocr'].write(ocr_bytes)
+
+        # 4. The frame record pointing into the other tables
+        record = np.zeros(1, dtype=self.FRAME_DTYPE)
+        record['frame'] = frame
+        record['panel_boundary_x'] = panel_boundary_x if panel_boundary_x is not None else -1
+        (record['motion'], record['dx'], record['dy'],
+         record['img_w'], record['img_h'], record['map_offset']) = motion
+        record['has_ids'] = detections.ids is not None
+        record['det_start'], record['det_count'] = self._counts['detections'], len(det)
+        record['color_start'], record['color_count'] = self._counts['colors'], len(colors)
+        record['ocr_kind'] = ocr_kind
+        record['ocr_start'], record['ocr_length'] = self._counts['ocr'], len(ocr_bytes)
+        record.tofile(self._files['frames'])
+
+        self._counts['detections'] += len(det)
+        self._counts['colors'] += len(colors)
+        self._counts['ocr'] += len(ocr_bytes)
+        self._counts['frames'] += 1
+
+    def finish_recording(self, info=None):
+        """
+        Closes the recording and marks it as complete.
+
+        Args:
+            info (dict or None): Additional JSON serializable information stored in the metadata (e.g. fps).
+        """
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.close()
+        meta = {'version': self.CACHE_VERSION, 'counts': self._counts, 'info': info or {}}
+        with open(os.path.join(self._record_dir, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        # The complete recording replaces an older one of the same key (e.g. from another worker) at once.
+        entry_dir = os.path.join(self.cache_dir, self._key)
+        try:
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(self._record_dir, entry_dir)
+                self._evict(keep=self._key)
+        except OSError as e:
+            # E.g. the older recording is being replayed by another process (Windows does not remove open files).
+            print(f"Warning: The inference recording could not be stored ({e}).")
+            shutil.rmtree(self._record_dir, ignore_errors=True)
+        self._files = None
+        self._record_dir = None
+
+    def abandon_recording(self):
+        """
+        Closes and deletes an unfinished recording.
+        """
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self._record_dir, ignore_errors=True)
+        self._files = None
+        self._record_dir = None
+
+    # --- Replay ---
+
+    def load_info(self, key):
+        """Returns the `info` dict of a complete recording, and marks the recording as recently used."""
+        meta_path = os.path.join(self.cache_dir, key, self.META_FILE)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)['info']
+        try:
+            # The modification time of the metadata is the last use of the recording (see _evict).
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return info
+
+    def iter_frames(self, key):
+        """
+        Yields the recorded frames in order. Each frame is a dict with 'frame', 'panel_boundary_x',
+        'motion', 'detections' (Detections), 'box_colors' (tuple(box) -> color), 'ocr_kind' and 'ocr'.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        tables = {name: self._map(os.path.join(entry_dir, name + '.bin'), dtype) for name, dtype in self.TABLES.items()}
+        ocr_bytes = self._map(os.path.join(entry_dir, 'ocr.bin'), np.uint8)
+        detections, colors = tables['detections'], tables['colors']
+
+        for record in tables['frames']:
+            det = detections[record['det_start']:record['det_start'] + record['det_count']]
+            col = colors[record['color_start']:record['color_start'] + record['color_count']]
+            ocr = None
+            if record['ocr_kind'] != self.OCR_NONE:
+                start = int(record['ocr_start'])
+                ocr = json.loads(ocr_bytes[start:start + int(record['ocr_length'])].tobytes().decode('utf-8'))
+            boundary = int(record['panel_boundary_x'])
+            yield {
+                'frame': int(record['frame']),
+                'panel_boundary_x': boundary if boundary >= 0 else None,
+                'motion': (int(record['motion']), float(record['dx']), float(record['dy']),
+                           int(record['img_w']), int(record['img_h']), int(record['map_offset'])),
+                'detections': Detections(det['xyxy'], det['conf'], det['cls'],
+                                         det['track_id'] if record['has_ids'] else None),
+                'box_colors': {tuple(box): color for box, color in zip(col['box'].tolist(), np.array(col['color']))},
+                'ocr_kind': int(record['ocr_kind']),
+                'ocr': ocr,
+            }
+
+    def _evict(self, keep):
+        """
+        Removes the least recently used recordings until their total size fits into max_bytes, and the stale
+        temporary directories of interrupted recordings. The recording `keep` (the newest) is never removed.
+        Called under the lock.
+        """
+        now = time.time()
+        recordings = []  # (last use, size, directory)
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if not os.path.isdir(path):
+                    continue
+                files = [os.path.join(path, file_name) for file_name in os.listdir(path)]
+                if name.endswith('.tmp'):
+                    last_write = max((os.path.getmtime(file_path) for file_path in files), default=0)
+                    if now - last_write > self.STALE_SECONDS:
+                        shutil.rmtree(path, ignore_errors=True)
+                elif name != keep and os.path.exists(os.path.join(path, self.META_FILE)):
+                    recordings.append((os.path.getmtime(os.path.join(path, self.META_FILE)),
+                                       sum(os.path.getsize(file_path) for file_path in files), path))
+            except OSError:
+                continue  # E.g. a temporary recording that another process just finished
+        if self.max_bytes is None:
+            return
+        total = sum(size for _, size, _ in recordings) + sum(
+            os.path.getsize(os.path.join(self.cache_dir, keep, file_name))
+            for file_name in os.listdir(os.path.join(self.cache_dir, keep)))
+        for _, size, path in sorted(recordings):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def _map(path, dtype):
+        # np.memmap can not map empty files.
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    @staticmethod
+    def _to_json(value):
+        # The OCR results may contain NumPy scalars and arrays (confidences, boxes).
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
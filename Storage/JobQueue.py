@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import time
+
+
+class JobQueue:
+    """
+    A local, persistent job queue in SQLite, shared by the Streamlit app and the worker processes.
+
+    The app submits processing and training jobs and polls their status; workers claim the oldest queued job,
+    report its progress and store its result (the paths of the output files). Workers also keep a heartbeat,
+    so the app can tell whether any worker is alive, and jobs of a worker that died are queued again.
+
+    Every process opens its own connection. The database runs in WAL mode, so the app can read while
+    the workers write, and claiming a job is a single IMMEDIATE transaction, so no job is taken twice.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            settings TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            worker_id TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+        CREATE TABLE IF NOT EXISTS workers (
+            id TEXT PRIMARY KEY,
+            pid INTEGER NOT NULL,
+            started_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            job_id INTEGER
+        );
+    """
+
+    # Job states
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file. It is created if it does not exist.
+        """
+        self.db_path = db_path
+        self._conn = None
+
+    def open(self):
+        """
+        Connects to the database and creates the tables if needed.
+        """
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # The app and several workers write to the same file; waiting on a lock is better than failing.
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+        return self
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Submitting and polling (app side) ---
+
+    def submit(self, kind, settings):
+        """
+        Adds a job to the end of the queue.
+
+        Args:
+            kind (str): 'process' or 'train'.
+            settings (dict): The config values of the job (JSON serializable).
+
+        Returns:
+            int: The job ID.
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, settings, status, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(settings), self.QUEUED, time.time()))
+        return cursor.lastrowid
+
+    def get(self, job_id):
+        """Returns one job as a dict (see list_jobs), or None."""
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def list_jobs(self, limit=50):
+        """
+        Returns the newest jobs, newest first. Each job is a dict with the columns of the jobs table;
+        'settings' and 'result' are decoded.
+        """
+        rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """
+        Cancels a job that has not started yet. Returns True if it was cancelled.
+        """
+        with self._conn:
+            cursor = self._conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                                        (self.CANCELLED, time.time(), job_id, self.QUEUED))
+        return cursor.rowcount > 0
+
+    def counts(self):
+        """Returns the number of jobs per state."""
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (self.QUEUED, self.RUNNING, self.DONE, self.FAILED, self.CANCELLED)}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    def live_workers(self, timeout):
+        """
+        Returns the number of workers whose last heartbeat is younger than timeout seconds.
+        """
+        row = self._conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?",
+                                 (time.time() - timeout,)).fetchone()
+        return row[0]
+
+    # --- Working (worker side) ---
+
+    def register_worker(self, worker_id):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers (id, pid, started_at, heartbeat_at, job_id) VALUES (?, ?, ?, ?, NULL)",
+                (worker_id, os.getpid(), time.time(), time.time()))
+
+    def unregister_worker(self, worker_id):
+        with self._conn:
+            self._conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def heartbeat(self, worker_id):
+        with self._conn:
+            self._conn.execute("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (time.time(), worker_id))
+
+    def claim(self, worker_id):
+        """
+        Takes the oldest queued job and marks it as running by this worker.
+
+        Returns:
+            dict or None: The job, or None if the queue is empty.
+        """
+        now = time.time()
+        with self._conn:
+            # IMMEDIATE takes the write lock before reading, so two workers never claim the same job.
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                                     (self.QUEUED,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, started_at = ?, progress = 0, message = NULL "
+                "WHERE id = ?", (self.RUNNING, worker_id, now, row['id']))
+            self._conn.execute("UPDATE workers SET job_id = ?, heartbeat_at = ? WHERE id = ?",
+                               (row['id'], now, worker_id))
+        return self.get(row['id'])
+
+    def update_progress(self, job_id, progress, message=None):
+        """
+        Stores the progress (0..1) of a running job.
+        """
+        with self._conn:
+            self._conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?", (progress, message, job_id))
+
+    def complete(self, job_id, result):
+        """
+        Marks a job as done.
+
+        Args:
+            result (dict): Output name -> file path (JSON serializable).
+        """
+        self._finish(job_id, self.DONE, result=json.dumps(result), progress=1.0)
+
+    def fail(self, job_id, error):
+        """Marks a job as failed with an error message."""
+        self._finish(job_id, self.FAILED, error=str(error))
+
+    def requeue_orphans(self, timeout):
+        """
+        Queues the running jobs of workers without a heartbeat for `timeout` seconds again (e.g. the worker
+        process was killed). Processing jobs then resume from their last checkpoint in the run store.
+
+        Returns:
+            int: The number of jobs that were queued again.
+        """
+        limit = time.time() - timeout
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, message = 'Restarted after a worker failure' "
+                "WHERE status = ? AND (worker_id IS NULL OR worker_id NOT IN "
+                "(SELECT id FROM workers WHERE heartbeat_at >= ?))", (self.QUEUED, self.RUNNING, limit))
+            self._conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (limit,))
+        return cursor.rowcount
+
+    def _finish(self, job_id, status, result=None, error=None, progress=None):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = COALESCE(?, progress), finished_at = ? "
+                "WHERE id = ?", (status, result, error, progress, time.time(), job_id))
+            self._conn.execute("UPDATE workers SET job_id = NULL WHERE job_id = ?", (job_id,))
+
+    @staticmethod
+    def _job(row):
+        job = dict(row)
+        job['settings'] = json.loads(job['settings'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
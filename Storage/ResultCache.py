@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from Storage.FileDigests import FileDigests
+from Storage.FileLock import FileLock
+
+
+class ResultCache:
+    """
+    A content-addressed, size-bounded cache of finished run outputs (video, PDF report, track file, ...).
+
+    The key of a run is the SHA-256 of the source video content, the model weights content and the pipeline
+    parameters, so the same inputs always map to the same entry regardless of file names, and any change in
+    them is a miss. Each entry is a directory named after its key. An index file keeps the size and the last
+    access time of every entry; when the cache grows above `max_bytes`, the least recently used entries are
+    evicted. File digests are memoized by (size, modification time), so a large video is only hashed once.
+
+    Several processes (job and batch workers) may share a cache: the index is re-read and rewritten under a file
+    lock, and the files of a new entry are copied to a temporary directory first and moved into place under it.
+    """
+
+    # Changing the layout of the cached outputs invalidates all older entries.
+    CACHE_VERSION = 1
+    INDEX_FILE = 'index.json'
+    LOCK_FILE = 'index.lock'
+    DIGESTS_FILE = 'digests.json'
+
+    def __init__(self, cache_dir, max_bytes):
+        """
+        Args:
+            cache_dir (str): Directory of the cache. It is created if it does not exist.
+            max_bytes (int): The maximum total size of the cached files.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = FileLock(os.path.join(cache_dir, self.LOCK_FILE))
+        with self._lock:
+            self._index = self._load_index()
+        self._digests = FileDigests(os.path.join(cache_dir, self.DIGESTS_FILE))
+
+    def file_digest(self, path):
+        """
+        Returns the SHA-256 of a file's content. The result is remembered until the file changes.
+        """
+        return self._digests.digest(path)
+
+    def make_key(self, video_path, model_path, params):
+        """
+        Returns the cache key of a run.
+
+        Args:
+            video_path (str): The source video.
+            model_path (str): The model weights.
+            params (dict): The pipeline parameters that the outputs depend on (JSON serializable).
+        """
+        key_data = {
+            'version': self.CACHE_VERSION,
+            'video': self.file_digest(video_path),
+            'model': self.file_digest(model_path),
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Looks up a run.
+
+        Returns:
+            dict or None: Output name -> path of the cached file, or None on a miss.
+        """
+        with self._lock:
+            self._index = self._load_index()
+            entry = self._index['entries'].get(key)
+            if entry is None:
+                return None
+            files = {name: os.path.join(self.cache_dir, key, file_name) for name, file_name in entry['files'].items()}
+            if not all(os.path.exists(path) for path in files.values()):
+                # The entry was damaged (e.g. files deleted by hand), so it is dropped.
+                self._remove_entry(key)
+                self._save_index()
+                return None
+            entry['last_access'] = time.time()
+            self._save_index()
+            return files
+
+    def put(self, key, outputs):
+        """
+        Stores the outputs of a run and evicts the least recently used entries if the cache is too large.
+
+        Args:
+            key (str): The key from make_key.
+            outputs (dict): Output name -> file path to copy, or bytes to write.
+        """
+        # 1. Copy the files to a directory of this process, without holding the lock
+        entry_dir = os.path.join(self.cache_dir, key)
+        temp_dir = FileLock.temp_path(entry_dir)
+        os.makedirs(temp_dir)
+        files = {}
+        size = 0
+        for name, source in outputs.items():
+            if source is None:
+                continue
+            target = os.path.join(temp_dir, name if isinstance(source, bytes) else name + os.path.splitext(source)[1])
+            if isinstance(source, bytes):
+                with open(target, 'wb') as f:
+                    f.write(source)
+            elif os.path.exists(source):
+                shutil.copyfile(source, target)
+            else:
+                continue
+            files[name] = os.path.basename(target)
+            size += os.path.getsize(target)
+
+        # 2. Move them into place and update the index as it is now on disk
+        try:
+            with self._lock:
+                self._index = self._load_index()
+                self._remove_entry(key)
+                os.replace(temp_dir, entry_dir)
+                self._index['entries'][key] = {'files': files, 'size': size, 'last_access': time.time()}
+                self._evict()
+                self._save_index()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the total size fits into max_bytes.
+        The newest entry is kept even if it is larger than the limit on its own. Entry directories without an
+        index entry (e.g. left behind by a crash) are removed too.
+        """
+        entries = self._index['entries']
+        for name in os.listdir(self.cache_dir):
+            if len(name) == 64 and name not in entries and os.path.isdir(os.path.join(self.cache_dir, name)):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        total = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_access']):
+            if total <= self.max_bytes or len(entries) == 1:
+                break
+            total -= entries[key]['size']
+            self._remove_entry(key)
+
+    def _remove_entry(self, key):
+        self._index['entries'].pop(key, None)
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def _load_index(self):
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == self.CACHE_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'version': self.CACHE_VERSION, 'entries': {}}
+
+    def _save_index(self):
+        # Written to a temporary file first, so a crash never leaves a half-written index behind.
+        # Only called while the lock is held.
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        temp_path = FileLock.temp_path(path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, path)
@@ -0,0 +1,237 @@
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+
+class RunStore:
+    """
+    A local SQLite database that keeps the results of the runs on disk while they are processed.
+
+    * Every logged frame appends one row per tracked aircraft (tracking state and report columns) to the
+      `aircraft_states` table. Rows are buffered and written in one transaction every `batch_frames` frames.
+    * Periodic checkpoints store the pickled pipeline state (tracker, registry, report history, output files)
+      together with the frame they belong to, in the same transaction as the rows before them.
+
+    The database runs in WAL mode, so a crash never corrupts it: everything up to the last commit survives.
+    A run that was interrupted can be resumed from its last checkpoint; the rows written after that
+    checkpoint are dropped, because the frames they belong to are processed again.
+
+    Several processes (e.g. the batch workers) may write runs to the same database; a writer waits up to
+    BUSY_TIMEOUT seconds for the transaction of another one.
+    """
+
+    BUSY_TIMEOUT = 60.0
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_path TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            last_frame INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS aircraft_states (
+            run_id INTEGER NOT NULL,
+            frame INTEGER NOT NULL,
+            aircraft_id INTEGER NOT NULL,
+            cls_id INTEGER,
+            x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+            conf REAL,
+            location TEXT,
+            direction REAL,
+            velocity REAL,
+            condition INTEGER,
+            ocr_age INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_aircraft_states_run_frame ON aircraft_states (run_id, frame);
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            run_id INTEGER NOT NULL,
+            frame INTEGER NOT NULL,
+            timeline_frame INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            state BLOB NOT NULL,
+            PRIMARY KEY (run_id, frame)
+        );
+    """
+
+    def __init__(self, db_path, batch_frames=50):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file. It is created if it does not exist.
+            batch_frames (int): The number of logged frames whose rows are written in one transaction.
+        """
+        self.db_path = db_path
+        self.batch_frames = max(1, batch_frames)
+        self.run_id = None
+        self._conn = None
+        self._pending_rows = []
+        self._pending_frames = 0
+
+    def open(self):
+        """
+        Connects to the database and creates the tables if needed.
+        """
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs at checkpoints of the log; a crash of the process can not lose commits.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+        return self
+
+    def start_run(self, video_path, params, resume=True):
+        """
+        Starts a new run, or resumes the last unfinished run of the same video with the same parameters.
+
+        Args:
+            video_path (str): Path of the source video.
+            params (dict): The pipeline parameters that the results depend on (JSON serializable).
+            resume (bool): If False, a new run is always started.
+
+        Returns:
+            dict or None: The checkpoint to resume from ('frame', 'timeline_frame' and the pickled 'state'),
+                          or None if a new run was started.
+        """
+        video_path = os.path.abspath(video_path)
+        params_json = json.dumps(params, sort_keys=True)
+        now = time.time()
+
+        if resume:
+            row = self._conn.execute(
+                "SELECT r.id, c.frame, c.timeline_frame, c.state FROM runs r "
+                "JOIN checkpoints c ON c.run_id = r.id "
+                "WHERE r.video_path = ? AND r.params = ? AND r.status = 'running' "
+                "ORDER BY r.id DESC, c.frame DESC LIMIT 1",
+                (video_path, params_json)).fetchone()
+            if row is not None:
+                self.run_id, frame, timeline_frame, state = row
+                with self._conn:
+                    # The frames after the checkpoint are processed again, so their rows are dropped.
+                    self._conn.execute("DELETE FROM aircraft_states WHERE run_id = ? AND frame > ?",
+                                       (self.run_id, timeline_frame))
+                    self._conn.execute("UPDATE runs SET updated_at = ?, last_frame = ? WHERE id = ?",
+                                       (now, frame, self.run_id))
+                return {'frame': frame, 'timeline_frame': timeline_frame, 'state': pickle.loads(state)}
+
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (video_path, params, status, created_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                (video_path, params_json, now, now))
+        self.run_id = cursor.lastrowid
+        return None
+
+    def append_rows(self, frame, aircrafts, ocr_age=0):
+        """
+        Buffers the rows of one logged frame, one per aircraft. The buffer is written every `batch_frames` frames.
+
+        Args:
+            frame (int): The timeline frame number of the rows.
+            aircrafts (list): The tracked Aircraft objects.
+            ocr_age (int): Age of the OCR data for this frame, in video frames.
+        """
+        for aircraft in aircrafts:
+            x1, y1, x2, y2 = aircraft.bbox if aircraft.bbox is not None else (None, None, None, None)
+            self._pending_rows.append((
+                self.run_id, frame, aircraft.id,
+                int(aircraft.cls_id) if aircraft.cls_id is not None else None,
+                x1, y1, x2, y2, aircraft.conf,
+                str(aircraft.location), aircraft.direction, aircraft.velocity, aircraft.condition, ocr_age,
+            ))
+        self._pending_frames += 1
+        if self._pending_frames >= self.batch_frames:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows in one transaction.
+        """
+        with self._conn:
+            self._write_pending_rows()
+
+    def checkpoint(self, frame, timeline_frame, state):
+        """
+        Writes the buffered rows and a checkpoint of the pipeline state in one transaction.
+        Only the latest checkpoint of a run is kept.
+
+        Args:
+            frame (int): The last processed frame of the source video.
+            timeline_frame (int): The frame number of the last logged timeline rows.
+            state (dict): The picklable pipeline state.
+        """
+        blob = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._conn:
+            self._write_pending_rows()
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (self.run_id,))
+            self._conn.execute(
+                "INSERT INTO checkpoints (run_id, frame, timeline_frame, created_at, state) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, frame, timeline_frame, time.time(), blob))
+            self._conn.execute("UPDATE runs SET updated_at = ?, last_frame = ? WHERE id = ?",
+                               (time.time(), frame, self.run_id))
+
+    def iter_timeline(self, max_frame=None):
+        """
+        Yields the stored rows of the current run grouped by frame, in the layout of TimelineStore.append_rows:
+        (frame, aircraft_ids, locations, directions, velocities, conditions, ocr_age).
+        """
+        query = ("SELECT frame, aircraft_id, location, direction, velocity, condition, ocr_age "
+                 "FROM aircraft_states WHERE run_id = ?")
+        args = [self.run_id]
+        if max_frame is not None:
+            query += " AND frame <= ?"
+            args.append(max_frame)
+        query += " ORDER BY frame, rowid"
+
+        current = None
+        for frame, aircraft_id, location, direction, velocity, condition, ocr_age in self._conn.execute(query, args):
+            if current is None or current[0] != frame:
+                if current is not None:
+                    yield current
+                current = (frame, [], [], [], [], [], ocr_age)
+            current[1].append(aircraft_id)
+            current[2].append(location)
+            current[3].append(direction)
+            current[4].append(velocity)
+            current[5].append(condition)
+        if current is not None:
+            yield current
+
+    def finish_run(self):
+        """
+        Writes the remaining rows and marks the run as completed. Its checkpoint is not needed anymore.
+        """
+        with self._conn:
+            self._write_pending_rows()
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (self.run_id,))
+            self._conn.execute("UPDATE runs SET status = 'completed', updated_at = ? WHERE id = ?",
+                               (time.time(), self.run_id))
+
+    def abandon_run(self):
+        """
+        Marks the current run as abandoned (e.g. its partial outputs are gone), so it is never resumed.
+        """
+        with self._conn:
+            self._pending_rows = []
+            self._pending_frames = 0
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (self.run_id,))
+            self._conn.execute("UPDATE runs SET status = 'abandoned', updated_at = ? WHERE id = ?",
+                               (time.time(), self.run_id))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write_pending_rows(self):
+        if self._pending_rows:
+            self._conn.executemany(
+                "INSERT INTO aircraft_states (run_id, frame, aircraft_id, cls_id, x1, y1, x2, y2, conf, "
+                "location, direction, velocity, condition, ocr_age) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending_rows)
+        self._pending_rows = []
+        self._pending_frames = 0
@@ -0,0 +1,7 @@
+from .RunStore import RunStore
+from .ResultCache import ResultCache
+from .FileLock import FileLock
+from .FileDigests import FileDigests
+from .InferenceCache import InferenceCache
+from .JobQueue import JobQueue
+__all__ = ['RunStore', 'ResultCache', 'FileLock', 'FileDigests', 'InferenceCache', 'JobQueue']
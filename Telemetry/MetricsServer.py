@@ -0,0 +1,152 @@
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MetricsServer:
+    """
+    Serves the live telemetry of this process in the Prometheus text format on http://host:port/metrics.
+
+    The values are not pushed anywhere: the registered sources (see add_source) are only asked for their
+    metrics when the endpoint is scraped, so the pipeline itself does no extra work for them. The server runs
+    on a background thread. There is at most one server per process (see ensure); without a configured port
+    no server is started at all.
+
+    A source is a callable that returns a list of metric families, each a tuple
+    (name, type, help text, samples) with samples as (labels dict, value) tuples, e.g.
+    ('pipeline_tracked_aircraft', 'gauge', 'Tracked aircraft', [({}, 12)]). A sample can also be a
+    (suffix, labels dict, value) tuple, for the '_sum' and '_count' samples of a summary.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    # The server of this process, started by ensure.
+    _process_server = None
+    _process_lock = threading.Lock()
+
+    def __init__(self, port, host='127.0.0.1'):
+        """
+        Args:
+            port (int): The TCP port of the endpoint.
+            host (str): The address to listen on. The default only accepts local scrapers.
+        """
+        self.port = port
+        self.host = host
+        self._sources = {}
+        self._sources_lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @classmethod
+    def ensure(cls, port, host='127.0.0.1'):
+        """
+        Returns the metrics server of this process, starting it on the given port first if none is running.
+
+        Returns:
+            MetricsServer or None: None if port is None or the server could not be started.
+        """
+        if port is None:
+            return None
+        with cls._process_lock:
+            if cls._process_server is None:
+                server = cls(port, host)
+                try:
+                    server.start()
+                except OSError as e:
+                    print(f"Warning: The metrics endpoint could not be started on {host}:{port} ({e}).")
+                    return None
+                cls._process_server = server
+            return cls._process_server
+
+    def add_source(self, name, collect):
+        """
+        Registers a source of metrics under a name. A source with the same name is replaced.
+        """
+        with self._sources_lock:
+            self._sources[name] = collect
+
+    def remove_source(self, name):
+        with self._sources_lock:
+            self._sources.pop(name, None)
+
+    def start(self):
+        """
+        Starts serving on a background thread.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = server.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', MetricsServer.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not logged.
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        # With port 0 the system picks a free port.
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        print(f"Metrics endpoint: http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def render(self):
+        """
+        Collects the metrics of all sources and returns them in the Prometheus text format.
+        """
+        with self._sources_lock:
+            sources = list(self._sources.items())
+        lines = []
+        for source_name, collect in sources:
+            try:
+                families = collect()
+            except Exception as e:
+                # One broken source must not take the whole endpoint down.
+                lines.append(f"# Source '{source_name}' failed: {type(e).__name__}: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for sample in samples:
+                    suffix, labels, value = sample if len(sample) == 3 else ('', *sample)
+                    lines.append(f"{self._sample_name(name + suffix, labels)} {self._format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _sample_name(name, labels):
+        if not labels:
+            return name
+        label_text = ','.join(f'{key}="{MetricsServer._escape(value)}"' for key, value in labels.items())
+        return f"{name}{{{label_text}}}"
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    @staticmethod
+    def _format_value(value):
+        if value is None:
+            return 'NaN'
+        if isinstance(value, float):
+            if math.isnan(value):
+                return 'NaN'
+            if math.isinf(value):
+                return '+Inf' if value > 0 else '-Inf'
+            return repr(float(value))
+        return str(int(value))
@@ -0,0 +1,111 @@
+import time
+
+
+class PipelineMetrics:
+    """
+    The metrics of the video that is being processed, as a source of the MetricsServer: progress and frame rate,
+    the latency quantiles of every stage (from the StageProfiler), the OCR queue depth and cache hit rate,
+    the number of tracked aircraft and the resident memory of the process. Live runs also export the end-to-end
+    latency, the dropped frames, the deadline misses and the degradation level (see FrameProcessor.LiveScheduler).
+
+    Everything is read from the pipeline objects when the endpoint is scraped; nothing is recorded per frame
+    for the metrics.
+    """
+
+    PREFIX = 'aircraft_pipeline_'
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, frame_processor, video_path=None, total_frames=None, live_stats=None):
+        """
+        Args:
+            frame_processor (FrameProcessor): The frame processor of the run (its context holds the profiler).
+            video_path (str or None): The source video, exported as a label of the run info.
+            total_frames (int or None): The number of frames that will be processed, if known.
+            live_stats (callable or None): Returns the statistics of a live run (see Main.live_stats).
+        """
+        self.frame_processor = frame_processor
+        self.video_path = video_path
+        self.total_frames = total_frames
+        self.live_stats = live_stats
+        # (time, processed frames) of the previous scrape, for the frame rate between two scrapes
+        self._last_scrape = (time.monotonic(), frame_processor.frame_index)
+        self._memory_info = None
+        try:
+            import psutil
+            self._memory_info = psutil.Process().memory_info
+        except ImportError:
+            pass
+
+    def collect(self):
+        """
+        Returns the metric families (see MetricsServer).
+        """
+        p = self.PREFIX
+        frame_processor = self.frame_processor
+        context = frame_processor.context
+
+        # 1. Progress and the frame rate since the previous scrape
+        now, frames = time.monotonic(), frame_processor.frame_index
+        last_time, last_frames = self._last_scrape
+        self._last_scrape = (now, frames)
+        fps = (frames - last_frames) / (now - last_time) if now > last_time else 0.0
+        families = [
+            (p + 'run_info', 'gauge', 'The video of the current run.', [({'video': self.video_path or ''}, 1)]),
+            (p + 'frames_processed_total', 'counter', 'Processed frames of the current run.', [({}, frames)]),
+            (p + 'frames_per_second', 'gauge', 'Processed frames per second since the previous scrape.',
+             [({}, float(fps))]),
+        ]
+        if self.total_frames:
+            families.append((p + 'frames_to_process', 'gauge', 'Frames the current run will process.',
+                             [({}, self.total_frames)]))
+
+        # 2. Stage latencies
+        profiler = context.profiler
+        if profiler.enabled:
+            samples = []
+            for stage, stats in profiler.summary()['stages'].items():
+                for q in self.QUANTILES:
+                    samples.append(({'stage': stage, 'quantile': str(q)},
+                                    stats[f'p{int(q * 100)}_ms'] / 1000))
+                samples.append(('_sum', {'stage': stage}, float(stats['total_s'])))
+                samples.append(('_count', {'stage': stage}, stats['count']))
+            families.append((p + 'stage_latency_seconds', 'summary', 'Latency of one run of a pipeline stage.',
+                             samples))
+
+        # 3. OCR queue and cache
+        ocr_service = frame_processor.ocr_service
+        hits, misses = frame_processor.ocr_cache_hits, frame_processor.ocr_cache_misses
+        families += [
+            (p + 'ocr_queue_depth', 'gauge', 'OCR requests waiting for or running on the OCR thread.',
+             [({}, ocr_service.pending() if ocr_service is not None else 0)]),
+            (p + 'ocr_cache_hits_total', 'counter', 'Frames served with the cached OCR results.', [({}, hits)]),
+            (p + 'ocr_cache_misses_total', 'counter', 'Frames that needed an OCR pass.', [({}, misses)]),
+            (p + 'ocr_cache_hit_ratio', 'gauge', 'Share of the frames served with the cached OCR results.',
+             [({}, hits / (hits + misses) if hits + misses else None)]),
+        ]
+
+        # 4. Live source
+        live = self.live_stats() if self.live_stats is not None else None
+        if live is not None:
+            samples = [({'quantile': str(q)}, live[f'latency_p{int(q * 100)}_ms'] / 1000 if live['frames'] else None)
+                       for q in self.QUANTILES]
+            samples += [('_sum', {}, (live['latency_mean_ms'] or 0) * live['frames'] / 1000),
+                        ('_count', {}, live['frames'])]
+            families += [
+                (p + 'live_latency_seconds', 'summary', 'Time from the capture of a frame to its written results.',
+                 samples),
+                (p + 'live_frames_dropped_total', 'counter', 'Frames of the live source that were never processed.',
+                 [({}, live['frames_dropped'])]),
+                (p + 'live_deadline_misses_total', 'counter', 'Processed frames that missed their deadline.',
+                 [({}, live['deadline_misses'])]),
+                (p + 'live_degradation_level', 'gauge', '0: full pipeline, 1: OCR skipped, 2: OCR and rendering '
+                                                        'skipped.', [({}, live['level'])]),
+            ]
+
+        # 5. Tracking and memory
+        families.append((p + 'tracked_aircraft', 'gauge', 'Aircraft tracked by the AircraftManager.',
+                         [({}, len(context.aircraft_manager.get_all_aircrafts()))]))
+        if self._memory_info is not None:
+            families.append(('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.',
+                             [({}, self._memory_info().rss)]))
+        return families
@@ -0,0 +1,253 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+
+class _StageTimer:
+    """
+    Times one stage for `with profiler.stage(name):`. A stage runs on one thread at a time, so every stage
+    has a single timer that is reused for every frame.
+    """
+
+    __slots__ = ('_profiler', '_stats', '_start', '_rss')
+
+    def __init__(self, profiler, stats):
+        self._profiler = profiler
+        self._stats = stats
+        self._start = 0.0
+        self._rss = None
+
+    def __enter__(self):
+        self._rss = self._profiler.rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self._start
+        self._stats.add(seconds, self._rss, self._profiler.rss())
+        return False
+
+
+class _NullTimer:
+    """The timer of a disabled profiler: it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+class _StageStats:
+    """
+    The latencies of one stage in a histogram with logarithmic buckets, and its memory peaks.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max', 'peak_rss', 'max_rss_growth')
+
+    def __init__(self, n_buckets):
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.peak_rss = 0
+        self.max_rss_growth = 0
+
+    def add(self, seconds, rss_before=None, rss_after=None):
+        self.counts[StageProfiler.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        if rss_after is not None:
+            self.peak_rss = max(self.peak_rss, rss_after)
+            self.max_rss_growth = max(self.max_rss_growth, rss_after - rss_before)
+
+    def quantile(self, q):
+        """Returns the q-quantile (0..1) in seconds, with the resolution of a bucket."""
+        if self.count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        # The geometric middle of the bucket, limited to the measured range
+        seconds = StageProfiler.bucket_middle(index)
+        return min(max(seconds, self.min), self.max)
+
+
+class StageProfiler:
+    """
+    Records the latency of every pipeline stage (decoding, YOLO, the OCR passes, tracking, rendering, ...)
+    per frame, so it can be seen where the time of a run goes.
+
+    Each sample goes into a histogram with logarithmic buckets (BUCKETS_PER_DECADE buckets per factor of ten,
+    from 1 µs to 100 s), so recording costs a few arithmetic operations and no memory per frame; quantiles are
+    read from the histograms with a resolution of about 12%. Optionally the resident memory (RSS) of the process
+    is sampled before and after every stage, which gives the peak memory and the largest growth per stage.
+
+    A disabled profiler hands out a timer that does nothing, so the instrumented code does not need any checks.
+    The OCR stages are timed on the OCR thread; every stage is only run by one thread at a time.
+    """
+
+    # The stages in pipeline order. Stages that are not listed here are reported after them.
+    STAGES = ['decode', 'panel_split', 'map_motion', 'yolo', 'panel_ocr', 'map_ocr', 'ocr_wait', 'tracking',
+              'current_aircraft', 'recording', 'rendering', 'encoding', 'reporting', 'checkpoint',
+              'video_assembly', 'report_pdf']
+
+    # Histogram buckets: index 0 holds everything below MIN_SECONDS, the last one everything above the range.
+    MIN_SECONDS = 1e-6
+    DECADES = 8
+    BUCKETS_PER_DECADE = 20
+    N_BUCKETS = DECADES * BUCKETS_PER_DECADE + 2
+
+    _NULL_TIMER = _NullTimer()
+
+    def __init__(self, enabled=True, track_memory=False):
+        """
+        Args:
+            enabled (bool): If False, nothing is recorded.
+            track_memory (bool): Samples the RSS of the process around every stage (needs psutil).
+        """
+        self.enabled = enabled
+        self.frames = 0
+        self.start_time = time.perf_counter()
+        self._stats = {}
+        self._timers = {}
+        self._memory_info = None
+        if enabled and track_memory:
+            try:
+                import psutil
+                self._memory_info = psutil.Process().memory_info
+            except ImportError:
+                print("Warning: psutil is not installed. The stage profile does not include memory.")
+
+    @classmethod
+    def bucket(cls, seconds):
+        """Returns the histogram bucket of a latency."""
+        if seconds < cls.MIN_SECONDS:
+            return 0
+        index = int((math.log10(seconds) - math.log10(cls.MIN_SECONDS)) * cls.BUCKETS_PER_DECADE) + 1
+        return min(index, cls.N_BUCKETS - 1)
+
+    @classmethod
+    def bucket_middle(cls, index):
+        """Returns the latency in the (geometric) middle of a histogram bucket."""
+        if index == 0:
+            return cls.MIN_SECONDS
+        return cls.MIN_SECONDS * 10 ** ((index - 0.5) / cls.BUCKETS_PER_DECADE)
+
+    @classmethod
+    def histogram(cls):
+        """
+        Returns an empty latency histogram with the buckets of the stages, for latencies that are measured outside
+        of a stage (e.g. the end-to-end latency of live frames). It has add(seconds), quantile(q), count, total,
+        min and max.
+        """
+        return _StageStats(cls.N_BUCKETS)
+
+    def rss(self):
+        """Returns the resident memory of the process in bytes, or None if memory is not tracked."""
+        return self._memory_info().rss if self._memory_info is not None else None
+
+    def stage(self, name):
+        """
+        Returns a context manager that times one run of a stage: `with profiler.stage('yolo'): ...`.
+        """
+        if not self.enabled:
+            return self._NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _StageTimer(self, self._stage_stats(name))
+        return timer
+
+    def add(self, name, seconds):
+        """Records a latency that was measured elsewhere."""
+        if self.enabled:
+            self._stage_stats(name).add(seconds)
+
+    def timed_iter(self, name, iterable):
+        """
+        Yields the items of iterable and times every step of it as the given stage (e.g. reading and decoding
+        the next frame).
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        stats = self._stage_stats(name)
+        while True:
+            rss_before = self.rss()
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return  # The end of the iterable is not counted as a run.
+            stats.add(time.perf_counter() - start, rss_before, self.rss())
+            yield item
+
+    def frame_done(self):
+        """Counts a processed frame (for the frame rate)."""
+        self.frames += 1
+
+    def summary(self):
+        """
+        Returns the profile as a JSON serializable dict: the frame count, the wall time, the frame rate and
+        per stage (in pipeline order) the number of runs, the total time, the mean and the 50/90/99th percentile
+        and maximum latency in milliseconds, the share of the total stage time and the memory peaks in MB.
+        It may be called from another thread while frames are processed (e.g. by the metrics endpoint).
+        """
+        wall = time.perf_counter() - self.start_time
+        all_stats = dict(self._stats)  # Stages may be added while the summary is made.
+        total = sum(stats.total for stats in all_stats.values()) or 1.0
+        order = {name: i for i, name in enumerate(self.STAGES)}
+        stages = {}
+        for name in sorted(all_stats, key=lambda name: (order.get(name, len(order)), name)):
+            stats = all_stats[name]
+            if stats.count == 0:
+                continue
+            stages[name] = {
+                'count': stats.count,
+                'total_s': round(stats.total, 4),
+                'mean_ms': round(stats.total / stats.count * 1000, 3),
+                'p50_ms': round(stats.quantile(0.5) * 1000, 3),
+                'p90_ms': round(stats.quantile(0.9) * 1000, 3),
+                'p99_ms': round(stats.quantile(0.99) * 1000, 3),
+                'max_ms': round(stats.max * 1000, 3),
+                'share': round(stats.total / total, 4),
+                'peak_rss_mb': round(stats.peak_rss / 2 ** 20, 1) if self._memory_info is not None else None,
+                'max_rss_growth_mb': (round(stats.max_rss_growth / 2 ** 20, 1)
+                                      if self._memory_info is not None else None),
+            }
+        return {
+            'frames': self.frames,
+            'wall_s': round(wall, 3),
+            'fps': round(self.frames / wall, 3) if wall > 0 else None,
+            'stages': stages,
+        }
+
+    def save(self, path, extra=None):
+        """
+        Writes the summary to a JSON file.
+
+        Args:
+            path (str): The JSON file.
+            extra (dict or None): Additional entries of the file (e.g. the video and the settings of the run).
+        """
+        profile = dict(extra or {})
+        profile.update(self.summary())
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+
+    def _stage_stats(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _StageStats(self.N_BUCKETS)
+        return stats
@@ -0,0 +1,4 @@
+from .StageProfiler import StageProfiler
+from .MetricsServer import MetricsServer
+from .PipelineMetrics import PipelineMetrics
+__all__ = ['StageProfiler', 'MetricsServer', 'PipelineMetrics']
\ No newline at end of file
@@ -9,16 +9,20 @@ from PIL import Image
 # Local project imports
 import config
 from Trainer.ExtractIcons import ExtractIcons
-from Trainer.CreateMapImages import CreateMapImages
 
 
 class PrepareData:
     """
     Prepares a synthetic dataset for YOLO training by augmenting icons onto map images.
     It handles data generation, structuring, splitting, and saving.
+    The icon augmentation and compositing (augment_icon, paste_icon) are also used by the synthetic
+    benchmark videos (see Benchmark.SyntheticVideo).
     """
 
     def __init__(self):
+        # staticmap downloads the map tiles, so it is only imported when training maps are created.
+        from Trainer.CreateMapImages import CreateMapImages
+
         self.image_generator = CreateMapImages(config.NUM_IMAGES_TO_CREATE)
         self.icon_extractor = ExtractIcons(config.webp_file_path)
         self.num_classes = 0
@@ -122,7 +126,7 @@ class PrepareData:
                 base_icon = separated_icons[class_id]
 
                 # --- Apply Augmentations ---
-                processed_icon = self._augment_icon(base_icon, blur_levels, min_icon_scale, max_icon_scale)
+                processed_icon = self.augment_icon(base_icon, blur_levels, min_icon_scale, max_icon_scale)
                 if processed_icon is None:
                     continue
 
@@ -133,7 +137,7 @@ class PrepareData:
 
                 paste_x = random.randint(0, map_width - icon_width)
                 paste_y = random.randint(0, map_height - icon_height)
-                current_map_pil.paste(processed_icon, (paste_x, paste_y), processed_icon)
+                self.paste_icon(current_map_pil, processed_icon, paste_x, paste_y)
 
                 # Calculate YOLO coordinates
                 x_center = (paste_x + icon_width / 2) / map_width
@@ -149,14 +153,28 @@ class PrepareData:
 
         return synthetic_images, yolo_labels
 
-    def _augment_icon(self, icon_image, blur_levels, min_scale, max_scale):
-        """Applies a series of random augmentations to a single icon."""
+    @staticmethod
+    def augment_icon(icon_image, blur_levels, min_scale, max_scale, rng=random, hue=None):
+        """
+        Applies a series of random augmentations (hue, blur, scale and rotation) to a single icon.
+
+        Args:
+            icon_image (PIL.Image): The icon in RGBA.
+            blur_levels (list): The Gaussian blur kernel sizes to choose from. 0 means no blur.
+            min_scale, max_scale (float): The range of the scale factor.
+            rng (random.Random): The source of randomness; a seeded one gives reproducible icons.
+            hue (int or None): The hue (0-179) of the icon. None picks a random one.
+
+        Returns:
+            PIL.Image or None: The augmented icon in RGBA, or None if it became too small.
+        """
         # Hue shift
-        random_hue = random.randint(0, 179)
-        processed_icon = self._change_hue(icon_image, random_hue)
+        if hue is None:
+            hue = rng.randint(0, 179)
+        processed_icon = PrepareData.change_hue(icon_image, hue)
 
         # Blur
-        kernel_size = random.choice(blur_levels)
+        kernel_size = rng.choice(blur_levels)
         if kernel_size > 0:
             rgba_np = np.array(processed_icon)
             rgb = rgba_np[:, :, :3]
@@ -167,8 +185,8 @@ class PrepareData:
             processed_icon = Image.fromarray(np.dstack((blurred, alpha)), 'RGBA')
 
         # Scale and Rotation
-        scale = random.uniform(min_scale, max_scale)
-        angle = random.randint(0, 360)
+        scale = rng.uniform(min_scale, max_scale)
+        angle = rng.randint(0, 360)
         new_width = int(processed_icon.width * scale)
         if new_width < 2: return None
 
@@ -176,7 +194,19 @@ class PrepareData:
         rotated = resized.rotate(angle, expand=True, resample=Image.Resampling.BICUBIC)
         return rotated
 
-    def _change_hue(self, pil_image, target_hue):
+    @staticmethod
+    def paste_icon(map_image, icon_image, paste_x, paste_y):
+        """
+        Pastes an RGBA icon onto a map image (in place), using its alpha channel as the mask.
+
+        Returns:
+            tuple: The pixel box (x1, y1, x2, y2) of the icon on the map.
+        """
+        map_image.paste(icon_image, (paste_x, paste_y), icon_image)
+        return paste_x, paste_y, paste_x + icon_image.width, paste_y + icon_image.height
+
+    @staticmethod
+    def change_hue(pil_image, target_hue):
         """Changes the hue of a PIL image to a specific target hue value."""
         rgba_image = np.array(pil_image)
         rgb = rgba_image[:, :, :3]
@@ -1,9 +1,7 @@
-import torch
 import config
 import os
 import shutil
 from Trainer.PrepareData import PrepareData
-from ultralytics import YOLO
 
 
 class Trainer:
@@ -17,6 +15,10 @@ class Trainer:
         Trains the YOLO model and saves the best weights to a specified path,
         handling cases where a file with the same name already exists.
         """
+        # torch and ultralytics are only imported when training starts, so that importing the Trainer is fast.
+        import torch
+        from ultralytics import YOLO
+
         # --- 1. Automatic Device Selection ---
         if torch.cuda.is_available():
             device_name = '0'
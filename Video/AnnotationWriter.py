@@ -0,0 +1,156 @@
+import json
+import os
+
+
+class AnnotationWriter:
+    """
+    Writes the per-frame annotations of a run into sidecar files next to the untouched source video:
+
+    * a JSON Lines track file: one header line, then one compact record per processed frame
+      (aircraft boxes, IDs, classes, selected flag, locations, panel boundary, and the map labels whenever they
+      change),
+    * a WebVTT file with one metadata cue per processed frame, carrying the same record as JSON.
+
+    Players (e.g. the Streamlit result page) draw the overlay from these files, so the video
+    does not have to be re-encoded just to show the boxes.
+    """
+
+    def __init__(self, tracks_path, vtt_path, fps, skip_frame, width=0, height=0, class_names=None):
+        """
+        Args:
+            tracks_path (str): Path of the JSON Lines track file.
+            vtt_path (str or None): Path of the WebVTT cue file. No cues are written if None.
+            fps (float): Frame rate of the source video.
+            skip_frame (int): Number of source frames represented by each processed frame.
+            width (int), height (int): Size of the source video, stored in the header.
+            class_names (dict): Class ID -> name mapping, stored in the header.
+        """
+        self.tracks_path = tracks_path
+        self.vtt_path = vtt_path
+        self.fps = fps if fps and fps > 0 else 24.0
+        self.skip_frame = skip_frame
+        self.width = width
+        self.height = height
+        self.class_names = class_names or {}
+
+        self._tracks_file = None
+        self._vtt_file = None
+        self._last_labels = None
+
+    @staticmethod
+    def sidecar_paths(video_path):
+        """Returns the (track file, WebVTT) paths that belong to an output video path."""
+        base, _ = os.path.splitext(video_path)
+        return base + '.tracks.jsonl', base + '.vtt'
+
+    def open(self, resume_state=None):
+        """
+        Creates the files and writes their headers.
+
+        Args:
+            resume_state (dict): A state returned by get_state. The existing files are cut back to that point
+                                 and continued, instead of being started again.
+        """
+        for path in (self.tracks_path, self.vtt_path):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if resume_state is not None:
+            self._tracks_file = self._reopen(self.tracks_path, resume_state['tracks_offset'])
+            if self.vtt_path:
+                self._vtt_file = self._reopen(self.vtt_path, resume_state['vtt_offset'])
+            self._last_labels = resume_state['last_labels']
+            return self
+
+        self._tracks_file = open(self.tracks_path, 'w', encoding='utf-8')
+        header = {
+            "type": "header",
+            "fps": self.fps,
+            "skip_frame": self.skip_frame,
+            "width": self.width,
+            "height": self.height,
+            "classes": {str(k): v for k, v in self.class_names.items()},
+            # Layout of each entry in "objs".
+            "obj_fields": ["id", "cls", "x1", "y1", "x2", "y2", "conf", "selected", "loc"],
+        }
+        self._tracks_file.write(json.dumps(header, separators=(',', ':')) + "\n")
+
+        if self.vtt_path:
+            self._vtt_file = open(self.vtt_path, 'w', encoding='utf-8')
+            self._vtt_file.write("WEBVTT\n\n")
+        return self
+
+    def write_frame(self, frame_number, annotation):
+        """
+        Appends the annotation of one processed frame.
+
+        Args:
+            frame_number (int): Index of the frame in the source video.
+            annotation (dict): As returned by FrameProcessor.get_annotation().
+        """
+        selected_id = annotation.get('selected_id')
+        objs = []
+        for aircraft in annotation.get('aircrafts', []):
+            if aircraft.bbox is None:
+                continue
+            x1, y1, x2, y2 = (int(v) for v in aircraft.bbox)
+            objs.append([aircraft.id, int(aircraft.cls_id), x1, y1, x2, y2, round(float(aircraft.conf), 3),
+                         1 if aircraft.id == selected_id else 0, aircraft.location])
+
+        record = {
+            "f": frame_number,
+            "t": round(frame_number / self.fps, 3),
+            "panel": int(annotation['panel_boundary_x']) if annotation.get('panel_boundary_x') is not None else None,
+            "sel": selected_id,
+            "objs": objs,
+        }
+        # Map labels are static most of the time, so they are only written when they change.
+        labels = [[t['text']] + [int(v) for v in t['box']] for t in annotation.get('map_texts', [])]
+        if labels != self._last_labels:
+            record["labels"] = labels
+            self._last_labels = labels
+
+        line = json.dumps(record, separators=(',', ':'))
+        self._tracks_file.write(line + "\n")
+
+        if self._vtt_file is not None:
+            start = frame_number / self.fps
+            end = (frame_number + self.skip_frame) / self.fps
+            self._vtt_file.write(f"{self._vtt_time(start)} --> {self._vtt_time(end)}\n{line}\n\n")
+
+    def get_state(self):
+        """
+        Flushes the files and returns the position after the last written frame and the files that were written,
+        for run checkpoints.
+        """
+        for f in (self._tracks_file, self._vtt_file):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+        return {
+            'tracks_offset': self._tracks_file.tell(),
+            'vtt_offset': self._vtt_file.tell() if self._vtt_file is not None else 0,
+            'last_labels': self._last_labels,
+            'paths': [self.tracks_path] + ([self.vtt_path] if self.vtt_path else []),
+        }
+
+    def close(self):
+        for f in (self._tracks_file, self._vtt_file):
+            if f is not None:
+                f.close()
+        self._tracks_file = None
+        self._vtt_file = None
+
+    @staticmethod
+    def _reopen(path, offset):
+        """Opens a file for appending after dropping everything behind offset."""
+        f = open(path, 'r+', encoding='utf-8')
+        f.seek(offset)
+        f.truncate()
+        return f
+
+    @staticmethod
+    def _vtt_time(seconds):
+        hours, rest = divmod(seconds, 3600)
+        minutes, secs = divmod(rest, 60)
+        return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
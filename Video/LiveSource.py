@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+
+import cv2
+
+
+class LiveSource:
+    """
+    Reads a live video source on a background thread and always hands out the newest frame.
+
+    The source is anything cv2.VideoCapture opens: an OpenCV/FFMPEG URL (rtsp://, http://, udp://, ...), a capture
+    device number (e.g. '0'), or a video file. A file is replayed at its own frame rate (wall-clock time), so it can
+    stand in for a live source in tests.
+
+    The reader thread keeps reading at the rate of the source, so the frames never queue up behind a slow pipeline:
+    only every `skip_frame`-th frame is decoded and offered, and an offered frame that is replaced by a newer one
+    before the pipeline takes it is dropped. Every frame comes with the time it was captured, for the end-to-end
+    latency.
+    """
+
+    # Seconds to wait for the first frame of a source before giving up
+    OPEN_TIMEOUT = 10.0
+
+    def __init__(self, source, skip_frame=1, max_seconds=None):
+        """
+        Args:
+            source (str): The URL, device number or video file.
+            skip_frame (int): Only every n-th frame of the source is offered to the pipeline.
+            max_seconds (float or None): Stops reading after this many seconds. None reads until the source ends.
+        """
+        self.source = int(source) if str(source).isdigit() else source
+        self.skip_frame = max(1, skip_frame)
+        self.max_seconds = max_seconds
+        # A file is replayed at its frame rate; a real live source sets its own pace.
+        self.replay = isinstance(self.source, str) and os.path.isfile(self.source)
+        self.fps = 0
+        self.width = 0
+        self.height = 0
+        self.frames_read = 0  # Frames read from the source
+        self.frames_offered = 0  # Decoded frames offered to the pipeline
+        self.frames_dropped = 0  # Offered frames replaced by a newer one before the pipeline took them
+        self._cap = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._condition = threading.Condition()
+        self._latest = None  # (frame number, frame, capture time) not yet taken by the pipeline
+        self._ended = False
+
+    def open(self):
+        """
+        Opens the source, reads its properties and starts the reader thread.
+
+        Returns:
+            bool: True if the source could be opened.
+        """
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"Error: Could not open the live source '{self.source}'.")
+            return False
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._cap = cap
+        self._stop.clear()
+        self._ended = False
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def frames(self):
+        """
+        Yields (frame_number, frame, capture_time) with the newest frame whenever the caller is ready for the next
+        one, until the source ends or the source is closed. capture_time is a time.perf_counter() value.
+        """
+        try:
+            while True:
+                with self._condition:
+                    if not self._condition.wait_for(lambda: self._latest is not None or self._ended,
+                                                    timeout=None if self.frames_offered else self.OPEN_TIMEOUT):
+                        print(f"Error: The live source '{self.source}' sent no frames.")
+                        return
+                    if self._latest is None:
+                        return
+                    item, self._latest = self._latest, None
+                yield item
+        finally:
+            self.close()
+
+    def stats(self):
+        """
+        Returns the frame counts of the source: 'frames_read', 'frames_offered' and 'frames_dropped'.
+        """
+        return {'frames_read': self.frames_read, 'frames_offered': self.frames_offered,
+                'frames_dropped': self.frames_dropped}
+
+    def close(self):
+        """
+        Stops the reader thread and releases the source.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _read_loop(self):
+        cap = self._cap
+        fps = self.fps if self.fps and self.fps >= 1 else 24.0
+        start_time = time.perf_counter()
+        frame_number = 0
+        try:
+            while not self._stop.is_set():
+                now = time.perf_counter()
+                if self.max_seconds is not None and now - start_time >= self.max_seconds:
+                    break
+                if self.replay:
+                    # A file is read as fast as the disk allows; wait until the frame is "captured".
+                    delay = start_time + frame_number / fps - now
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                if frame_number % self.skip_frame == 0:
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    capture_time = time.perf_counter()
+                    with self._condition:
+                        if self._latest is not None:
+                            self.frames_dropped += 1
+                        self._latest = (frame_number, frame, capture_time)
+                        self.frames_offered += 1
+                        self._condition.notify()
+                elif not cap.grab():
+                    break
+                self.frames_read += 1
+                frame_number += 1
+        finally:
+            cap.release()
+            self._cap = None
+            with self._condition:
+                self._ended = True
+                self._condition.notify()
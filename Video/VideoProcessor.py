@@ -1,8 +1,11 @@
 import config
 import cv2
 import os
+import shutil
 import subprocess  # FFMPEG'i çağırmak için gerekli
 
+from Video.LiveSource import LiveSource
+
 
 class VideoProcessor:
     # __init__, extract_frames, get_frames fonksiyonlarınız aynı kalacak...
@@ -14,31 +17,103 @@ class VideoProcessor:
         self.fps = 0
         self.width = 0
         self.height = 0
+        self.total_frames = 0
+        self._cap = None
+        self._writer = None
+        self._output_path = None
+        self._segments = []  # Temporary video files written so far; the last one is open while _writer is set.
+        # The LiveSource with config.live_source, and the capture time of the last frame it yielded
+        self.live_source = None
+        self.capture_time = None
 
-    def extract_frames(self):
+    def open_video(self):
+        """
+        Opens the source video and reads its properties (fps, size, frame count).
+        With config.live_source, video_path is opened as a live source instead (see LiveSource).
+
+        Returns:
+            bool: True if the video could be opened.
+        """
+        if config.live_source:
+            return self._open_live_source()
         if not os.path.exists(self.video_path):
             print(f"Error: Video file not found at '{self.video_path}'")
-            return
+            return False
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
             print("Error: Could not open video file.")
-            return
+            return False
         self.fps = cap.get(cv2.CAP_PROP_FPS)
         self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         if not self.fps or self.fps < 1:
             print(f"UYARI: Geçersiz FPS değeri ({self.fps}) algılandı. Varsayılan olarak 24 FPS kullanılacak.")
             self.fps = 24.0
         print(f"Video properties: {self.width}x{self.height} @ {self.fps:.2f} FPS")
+        self._cap = cap
+        return True
+
+    def _open_live_source(self):
+        live_source = LiveSource(self.video_path, self.skip_frame, config.live_max_seconds)
+        if not live_source.open():
+            return False
+        self.fps = live_source.fps if live_source.fps and live_source.fps >= 1 else 24.0
+        self.width, self.height = live_source.width, live_source.height
+        self.total_frames = 0  # Unknown: frames are dropped when the pipeline falls behind.
+        kind = "replayed at its frame rate" if live_source.replay else "live"
+        print(f"Live source ({kind}): {self.width}x{self.height} @ {self.fps:.2f} FPS")
+        self.live_source = live_source
+        return True
+
+    def get_processed_frame_count(self, start_frame=0):
+        """Returns the number of frames iter_frames will yield (0 if the frame count is unknown)."""
+        if self.total_frames <= start_frame:
+            return 0
+        return (self.total_frames - start_frame + self.skip_frame - 1) // self.skip_frame
+
+    def iter_frames(self, start_frame=0):
+        """
+        Yields (frame_number, frame) for every `skip_frame`-th frame of the opened video without keeping
+        the frames in memory. Skipped frames are only grabbed, not decoded into BGR images.
+
+        Args:
+            start_frame (int): The first frame to yield (used to resume a run). It should be a multiple of
+                               `skip_frame`. The video is seeked there instead of being read from the start.
+                               Not used for live sources, which yield their newest frame instead and set
+                               capture_time.
+        """
+        if self._cap is None and self.live_source is None and not self.open_video():
+            return
+        if self.live_source is not None:
+            # A live source yields its newest frame; the frames in between are dropped.
+            for frame_number, frame, capture_time in self.live_source.frames():
+                self.capture_time = capture_time
+                yield frame_number, frame
+            return
+        cap = self._cap
         frame_count = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if frame_count % self.skip_frame == 0:
-                self.extracted_frames.append(frame)
-            frame_count += 1
-        cap.release()
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            frame_count = start_frame
+        try:
+            while True:
+                if frame_count % self.skip_frame == 0:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield frame_count, frame
+                elif not cap.grab():
+                    break
+                frame_count += 1
+        finally:
+            cap.release()
+            self._cap = None
+
+    def extract_frames(self):
+        if not self.open_video():
+            return
+        self.extracted_frames = [frame for _, frame in self.iter_frames()]
         print(f"Frame extraction complete. Total frames extracted: {len(self.extracted_frames)}")
 
     def create_new_video(self, output_path, frames_to_use=None):
@@ -54,36 +129,100 @@ class VideoProcessor:
             print("HATA: Video oluşturmak için kullanılacak kare bulunamadı.")
             return
 
-        try:
-            video_height, video_width, _ = frames[0].shape
-        except (IndexError, AttributeError):
-            print("HATA: Karelerin boyutları belirlenemedi.")
-            return
-        video_fps = self.fps if self.fps > 0 else 24.0
+        self.open_video_writer(output_path)
+        for frame in frames:
+            if not self.write_frame(frame):
+                return
+        self.finish_video()
 
-        temp_output_path = output_path + ".temp.mp4"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(temp_output_path, fourcc, video_fps, (video_width, video_height))
+    def open_video_writer(self, output_path, segments=None):
+        """
+        Prepares a streaming output video. Frames are then added one by one with write_frame
+        and the video is finalized with finish_video, so the annotated frames never have to be kept in a list.
 
-        if not writer.isOpened():
-            print("HATA: Geçici video için VideoWriter başlatılamadı.")
-            return
+        The frames go to temporary segment files. close_segment finishes the current segment (e.g. at a run
+        checkpoint), so that it stays playable even if the process is killed later; finish_video joins them.
+
+        Args:
+            output_path (str): Path of the final video.
+            segments (list): Finished segment files of an interrupted run, to continue after.
+        """
+        self._output_path = output_path
+        self._segments = list(segments or [])
+        self._writer = None
+
+    def close_segment(self):
+        """
+        Finishes the current temporary segment. The next written frame starts a new one.
+
+        Returns:
+            list: The paths of all finished segments.
+        """
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        return list(self._segments)
+
+    def write_frame(self, frame, count=None):
+        """
+        Writes one processed frame `count` times (by default `self.skip_frame` times) to the temporary video.
+        Live runs pass the number of source frames since the previous processed frame, so the video keeps the
+        duration of the source when frames were dropped.
+
+        Returns:
+            bool: False if the writer could not be started.
+        """
+        if self._writer is None:
+            try:
+                video_height, video_width, _ = frame.shape
+            except (IndexError, AttributeError, ValueError):
+                print("HATA: Karelerin boyutları belirlenemedi.")
+                return False
+            video_fps = self.fps if self.fps > 0 else 24.0
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            segment_path = f"{self._output_path}.part{len(self._segments):04d}.mp4"
+            self._segments.append(segment_path)
+            self._writer = cv2.VideoWriter(segment_path, fourcc, video_fps, (video_width, video_height))
+            if not self._writer.isOpened():
+                print("HATA: Geçici video için VideoWriter başlatılamadı.")
+                self._writer = None
+                self._segments.pop()
+                return False
+            print(f"Writing frames to temporary video... Each frame will be duplicated {self.skip_frame} times.")
 
-        # --- DEĞİŞİKLİK BURADA ---
         # Her bir işlenmiş kareyi 'self.skip_frame' sayısı kadar yazarak
         # videonun orijinal süresini koruyoruz.
-        print(f"Writing frames to temporary video... Each frame will be duplicated {self.skip_frame} times.")
-        for frame in frames:
-            for _ in range(self.skip_frame):
-                writer.write(frame)
-        # --- DEĞİŞİKLİK SONA ERDİ ---
+        for _ in range(count if count is not None else self.skip_frame):
+            self._writer.write(frame)
+        return True
 
-        writer.release()
+    def finish_video(self):
+        """
+        Closes the temporary segments and converts them with FFMPEG into one web compatible MP4 at the output path.
+        """
+        segments = self.close_segment()
+        if not segments:
+            print("HATA: Video oluşturmak için kullanılacak kare bulunamadı.")
+            return
+        output_path = self._output_path
+        temp_files = list(segments)
+
+        if len(segments) == 1:
+            input_args = ['-i', segments[0]]
+        else:
+            # Several segments (from checkpoints) are joined with the concat demuxer while encoding.
+            list_path = output_path + ".parts.txt"
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for segment in segments:
+                    escaped = os.path.abspath(segment).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            temp_files.append(list_path)
+            input_args = ['-f', 'concat', '-safe', '0', '-i', list_path]
 
         print("FFMPEG ile video web uyumlu formata dönüştürülüyor...")
         ffmpeg_command = [
             'ffmpeg',
-            '-i', temp_output_path,
+            *input_args,
             '-c:v', 'libx264',
             '-pix_fmt', 'yuv420p',
             '-preset', 'fast',
@@ -100,7 +239,37 @@ class VideoProcessor:
             print("HATA: FFMPEG video dönüştürme sırasında bir hata oluştu.")
             print("FFMPEG Hata Mesajı:", e.stderr.decode())
         finally:
-            if os.path.exists(temp_output_path):
-                os.remove(temp_output_path)
+            for path in temp_files:
+                if os.path.exists(path):
+                    os.remove(path)
+            self._segments = []
+
+    def copy_original_video(self, output_path):
+        """
+        Copies the source video to output_path without re-encoding (FFMPEG stream copy).
+        Used when the annotations are written to sidecar files instead of being burned into the frames.
+        Falls back to a plain file copy if FFMPEG is not available.
+        """
+        if not os.path.exists(self.video_path):
+            print(f"Error: Video file not found at '{self.video_path}'")
+            return
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        ffmpeg_command = [
+            'ffmpeg',
+            '-i', self.video_path,
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
+        ]
+        try:
+            subprocess.run(ffmpeg_command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            print(f"Source video stream-copied to '{output_path}'.")
+        except (FileNotFoundError, subprocess.CalledProcessError) as e:
+            print(f"Warning: FFMPEG stream copy failed ({e}). Copying the file as it is.")
+            shutil.copyfile(self.video_path, output_path)
+
     def get_frames(self):
         return self.extracted_frames
\ No newline at end of file
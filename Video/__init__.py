@@ -1,2 +1,4 @@
 from .VideoProcessor import VideoProcessor
-__all__ = ['VideoProcessor']
\ No newline at end of file
+from .AnnotationWriter import AnnotationWriter
+from .LiveSource import LiveSource
+__all__ = ['VideoProcessor', 'AnnotationWriter', 'LiveSource']
@@ -0,0 +1,28 @@
+# batch.py
+# Processes directories or glob patterns of videos from the command line with a pool of worker processes:
+#     python batch.py INPUT [INPUT ...] --output-dir DIR [--workers N] [--threads-per-worker T]
+
+import argparse
+
+import config
+from Jobs import BatchRunner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processes many videos with a pool of worker processes.")
+    parser.add_argument('inputs', nargs='+', help="Video files, directories of videos or glob patterns.")
+    parser.add_argument('--output-dir', required=True, help="The directory of the per-video outputs and the summary.")
+    parser.add_argument('--workers', type=int, default=config.job_workers, help="The number of worker processes.")
+    parser.add_argument('--threads-per-worker', type=int, default=config.batch_threads_per_worker,
+                        help="The intra-op threads of a worker (default: the CPU cores shared evenly).")
+    parser.add_argument('--output-mode', choices=['video', 'sidecar', 'headless'], default=config.output_mode,
+                        help="How the results are delivered (see config.output_mode).")
+    parser.add_argument('--model', default=config.yolov12_path, help="The YOLO model weights.")
+    parser.add_argument('--skip-frame', type=int, default=config.skip_frame, help="Process every n-th frame.")
+    args = parser.parse_args()
+
+    videos = BatchRunner.find_videos(args.inputs)
+    if not videos:
+        raise SystemExit("No videos found.")
+    settings = {'output_mode': args.output_mode, 'yolov12_path': args.model, 'skip_frame': args.skip_frame}
+    BatchRunner(args.output_dir, args.workers, args.threads_per_worker, settings).run(videos)
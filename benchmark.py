@@ -0,0 +1,78 @@
+# benchmark.py
+# Measures the throughput of the pipeline on synthetic radar videos and writes a comparable JSON/Markdown report:
+#     python benchmark.py --output-dir DIR [--icons 10 40] [--skip-frames 1 5] [--imgsz default 960x544]
+#                         [--devices cpu] [--baseline OLD_DIR/benchmark.json]
+# Sizes are written as WIDTHxHEIGHT. The track file of every run is evaluated against the ground truth of its video
+# (MOTA, IDF1, ...). The exit status is 1 if a run is slower than the baseline by more than --threshold, so the
+# benchmark can catch performance regressions.
+
+import argparse
+
+import config
+from Benchmark import BenchmarkSuite
+
+
+def parse_size(text):
+    """Returns 'WIDTHxHEIGHT' as (width, height)."""
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a size like 1920x1080")
+    return width, height
+
+
+def parse_imgsz(text):
+    """Returns 'WIDTHxHEIGHT' as the (height, width) the model takes, or None for 'default'."""
+    if text == 'default':
+        return None
+    width, height = parse_size(text)
+    return height, width
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the pipeline on synthetic radar videos.")
+    parser.add_argument('--output-dir', required=True, help="The directory of the videos, the runs and the report.")
+    parser.add_argument('--model', default=config.yolov12_path, help="The YOLO model weights.")
+    parser.add_argument('--icon-sheet', default=config.webp_file_path, help="The icon sheet (.webp) of the videos.")
+    parser.add_argument('--backgrounds', default=None,
+                        help="A directory of map images for the video backgrounds (default: drawn maps).")
+    # Scenarios (the synthetic videos)
+    parser.add_argument('--icons', type=int, nargs='+', default=[20], help="Moving icons per video.")
+    parser.add_argument('--speeds', type=float, nargs='+', default=[4.0], help="Icon speeds in pixels per frame.")
+    parser.add_argument('--resolutions', type=parse_size, nargs='+', default=[(1920, 1080)], help="Video sizes.")
+    parser.add_argument('--panels', choices=['on', 'off'], nargs='+', default=['on'],
+                        help="With and/or without the flight information panel.")
+    parser.add_argument('--frames', type=int, default=300, help="Frames per video.")
+    # Configurations (the pipeline settings)
+    parser.add_argument('--skip-frames', type=int, nargs='+', default=[config.skip_frame],
+                        help="Process every n-th frame.")
+    parser.add_argument('--imgsz', type=parse_imgsz, nargs='+', default=[None],
+                        help="YOLO input sizes ('default' is the full 1920x1088 frame).")
+    parser.add_argument('--devices', nargs='+', default=['cpu'], help="Model devices ('cpu', 'cuda', ...).")
+    parser.add_argument('--output-modes', choices=['video', 'sidecar', 'headless'], nargs='+', default=['headless'],
+                        help="How the results are delivered (see config.output_mode).")
+    # Measurement
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per scenario and configuration (median).")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the synthetic videos.")
+    parser.add_argument('--baseline', default=None, help="The benchmark.json of an earlier benchmark to compare with.")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="The relative frame rate drop against the baseline that is a regression.")
+    parser.add_argument('--iou', type=float, default=0.5,
+                        help="The minimum IoU of a track box and a ground truth box to match.")
+    args = parser.parse_args()
+
+    scenarios = [{'icons': icons, 'speed': speed, 'width': width, 'height': height, 'panel': panel == 'on',
+                  'video_frames': args.frames}
+                 for icons in args.icons for speed in args.speeds for width, height in args.resolutions
+                 for panel in args.panels]
+    configurations = BenchmarkSuite.matrix(
+        skip_frame=args.skip_frames,
+        imgsz=args.imgsz,
+        device=args.devices,
+        output_mode=args.output_modes,
+    )
+    suite = BenchmarkSuite(args.output_dir, args.model, args.icon_sheet, args.repeat, args.seed, args.backgrounds,
+                           args.threshold, args.iou)
+    report = suite.run(scenarios, configurations, args.baseline)
+    if report['regressions']:
+        raise SystemExit(1)
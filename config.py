@@ -1,6 +1,3 @@
-from Objects.AircraftManager import AircraftManager
-from ImageProcessor import yolov12,  FindCurrentAircraft , OCRProcessor , FrameCreator
-
 # A list of human-readable strings for the different states an object can be in.
 conditions = ['Tracking','Lost now','Lost for a while','Object occurs','Not in sight','Current not in sight','Reach the target']
 # A dictionary that maps the integer class IDs from the YOLO model to their string names.
@@ -15,6 +12,81 @@ memory_time = 30
 l,u,r,d = 0,0,1920,1080
 # The number of frames to skip between processing cycles. Used for performance optimization.
 skip_frame = 30
+# How the results are delivered: 'video' burns the annotations into a re-encoded video, 'sidecar' writes them to a
+# track file (.tracks.jsonl) and WebVTT cues next to a stream copy of the source video, and 'headless' only runs
+# detection, OCR and tracking and writes the report and the track file (no rendering, no video).
+output_mode = 'video'
+# The number of processed frames between two OCR passes. OCR also runs immediately when the selected aircraft
+# or the panel boundary changes; in between, the latest OCR results are reused.
+ocr_interval = 5
+# Runs OCR on a background thread so that it overlaps with YOLO detection.
+ocr_async = True
+# The maximum number of OCR requests that can be queued or running at the same time.
+ocr_queue_size = 2
+# The number of processed frames after which a map label that was not read again is forgotten.
+map_label_expiry = 60
+# The number of processed frames between two checkpoints of the pipeline state in the run store.
+checkpoint_interval = 200
+# Continues the last interrupted run of the same video with the same settings from its last checkpoint.
+resume_run = True
+# The maximum total size of the result cache in bytes. The least recently used results are removed first.
+result_cache_max_bytes = 5 * 1024 ** 3
+# Re-runs tracking and the report from the recorded detections and OCR results of the same video and model
+# (see inference_cache_dir) instead of running the models. Only the report and the track file are produced.
+replay_inference = False
+# Reads video_path as a live source instead of a finished video (see Video/LiveSource.py): an OpenCV/FFMPEG URL
+# (rtsp://, http://, udp://, ...), a capture device number ('0') or a video file, which is then replayed at its frame
+# rate to test the live mode. The newest frame is always processed; frames that arrive while the pipeline is busy
+# are dropped. Live runs are not resumed, cached or recorded.
+live_source = False
+# The time in milliseconds the results of a live frame may take from its capture. A pipeline that falls behind
+# skips OCR and then also the rendering until it catches up (see FrameProcessor/LiveScheduler.py). None uses the
+# time between two processed frames (skip_frame / fps).
+live_deadline_ms = None
+# Stops reading a live source after this many seconds. None reads until the source ends.
+live_max_seconds = None
+# The number of worker processes that take jobs from the job queue. Each worker keeps its own copy of the models loaded.
+job_workers = 2
+# Seconds between two polls of the job queue by the workers, and between two refreshes of the job list in the app.
+job_poll_interval = 2.0
+# Starts the workers (worker.py) from the app when none are running.
+job_autostart_workers = True
+# The device of the YOLO model and the EasyOCR reader ('cuda', 'cuda:1', 'cpu'). None uses the GPU when available.
+model_device = None
+# The input size (height, width) of the YOLO model, e.g. (544, 960). Smaller sizes are faster but can miss small
+# icons. None uses the full 1088x1920 frame.
+model_imgsz = None
+# Auto-tuning (see Benchmark/AutoTuner.py): before a run, a sample of the video is processed with several settings
+# on this machine, and the most accurate setting that reaches the target is used for skip_frame, model_imgsz,
+# ocr_interval and add_object_th. The target frame rate in frames of the video per second (e.g. the frame rate of
+# the video to keep up with it). None disables it.
+autotune_target_fps = None
+# The target mean time of one processed frame in milliseconds. None disables it.
+autotune_target_latency_ms = None
+# The length of the sample in seconds, taken from the middle of the video.
+autotune_sample_seconds = 5
+# The values the auto-tuner chooses from. None in autotune_imgsz is the full frame; autotune_confidences = None keeps
+# add_object_th.
+autotune_skip_frames = [1, 2, 3, 5, 10, 15, 30]
+autotune_imgsz = [None, (736, 1280), (544, 960)]
+autotune_ocr_intervals = [1, 5, 15]
+autotune_confidences = None
+# Runs one inference on every model right after loading it, so the first frame of a run is not slowed down.
+model_warm_up = True
+# Loads the models in the background when the app or a worker starts, instead of when the first run starts.
+model_preload = True
+# Records the latency of every pipeline stage per frame (see Telemetry/StageProfiler.py). The breakdown is shown
+# while a video is processed and appended to the PDF report.
+profile_stages = True
+# Also records the peak memory (RSS) of every stage. Needs psutil.
+profile_memory = True
+# Port of the local metrics endpoint in the Prometheus text format: http://metrics_host:metrics_port/metrics (see
+# Telemetry/MetricsServer.py). Job and batch workers use the next ports (+1, +2, ...). None disables it.
+metrics_port = None
+# The address of the metrics endpoint. '127.0.0.1' only accepts scrapers on this machine.
+metrics_host = '127.0.0.1'
+# The torch/OpenCV threads of every batch worker (batch.py). None shares the CPU cores evenly among the workers.
+batch_threads_per_worker = None
 
 
 # --- File and Model Paths ---
@@ -27,10 +99,31 @@ yolov12_path = r'Models\best.pt'
 output_video_path = r'SampleInputOutputs\ekran1.mp4'
 # Path where the generated PDF summary report will be saved.
 pdf_report_path = r'SampleInputOutputs\report.pdf'
+# Paths where the per-frame timeline of all aircraft is exported (set to None to skip an export).
+timeline_csv_path = r'SampleInputOutputs\timeline.csv'
+timeline_parquet_path = r'SampleInputOutputs\timeline.parquet'
 # Path to the WebP file containing map icons, likely used for training data generation.
 webp_file_path = r'SampleInputOutputs\MapIconsNew.webp'
 # Path to save the best model weights during a training session.
 BEST_MODEL_SAVE_PATH = r'Models\trained_model.pt'
+# Path of the SQLite database that keeps the tracking rows and the checkpoints of every run, so that an interrupted
+# run can be resumed (see Storage/RunStore.py). None disables it.
+run_store_path = r'SampleInputOutputs\runs.sqlite'
+# Directory of the result cache: a run of the same video with the same model and parameters returns the stored
+# outputs instead of being processed again (see Storage/ResultCache.py). None disables it.
+result_cache_dir = r'SampleInputOutputs\cache'
+# Directory where the raw detections, box colors and OCR results of every processed run are recorded, so that the
+# tracking and report parameters can be re-tuned without inference (see Storage/InferenceCache.py). None disables it.
+inference_cache_dir = r'SampleInputOutputs\inference'
+# The maximum total size of the inference recordings in bytes. The least recently used recordings are removed first.
+inference_cache_max_bytes = 5 * 1024 ** 3
+# Path of the SQLite job queue shared by the app and the workers (see Storage/JobQueue.py). Videos and trainings are
+# queued as jobs and processed in the background by worker.py. None runs them inside the app, one at a time.
+job_queue_path = r'SampleInputOutputs\jobs.sqlite'
+# Where the stage profile of a run is written as JSON (needs profile_stages). None disables it.
+profile_path = r'SampleInputOutputs\profile.json'
+# Optional JSON panel layout template for the OCR parser (see ImageProcessor/PanelLayout.py). None uses the built-in layout.
+panel_layout_path = None
 
 
 # --- Algorithm Thresholds ---
@@ -43,21 +136,6 @@ current_aircraft_threshold = 140.0
 relation_airport_th = 100.0
 
 
-# --- Static Objects Initialization ---
-# These are the core components of the processing pipeline, instantiated once.
-
-# Manages all tracked aircraft, their states, and history.
-aircraft_manager = AircraftManager(add_object_th , memory_time , relation_airport_th)
-# The YOLOv12 object detector.
-yolov12 = yolov12()
-# The class responsible for finding the "selected" aircraft based on color.
-find_current_aircraft = FindCurrentAircraft(current_aircraft_threshold)
-# The class that handles Optical Character Recognition (OCR) for the side panel and map.
-ocr_processor = OCRProcessor()
-# The class that draws all the annotations (boxes, text, etc.) onto the final frame.
-frame_creator = FrameCreator()
-
-
 #--- Trainer Constants ---
 # Parameters specifically for the training data generation script.
 
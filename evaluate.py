@@ -0,0 +1,26 @@
+# evaluate.py
+# Evaluates the tracking of a run against the ground truth of a synthetic video (see benchmark.py):
+#     python evaluate.py VIDEO.gt.jsonl RUN.tracks.jsonl [--iou 0.5] [--json metrics.json]
+# The track file is written by the 'sidecar' and 'headless' output modes.
+
+import argparse
+import json
+
+from Benchmark import TrackingEvaluator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes MOTA, IDF1, ID switches and the location and selected "
+                                                 "aircraft accuracy of a run.")
+    parser.add_argument('ground_truth', help="The ground truth file of the video (.gt.jsonl).")
+    parser.add_argument('tracks', help="The track file of the run (.tracks.jsonl).")
+    parser.add_argument('--iou', type=float, default=0.5, help="The minimum IoU of a match.")
+    parser.add_argument('--json', default=None, help="Also writes the metrics to this JSON file.")
+    args = parser.parse_args()
+
+    metrics = TrackingEvaluator(args.iou).evaluate(args.ground_truth, args.tracks)
+    for name, value in metrics.items():
+        print(f"{name:>18}: {value if value is not None else 'N/A'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, indent=2)
@@ -5,70 +5,547 @@ from tqdm import tqdm
 
 from Interface.Interface import Interface
 # Local project imports
-from Video import VideoProcessor
-from FrameProcessor import FrameProcessor
+from Video import VideoProcessor, AnnotationWriter
+from FrameProcessor import FrameProcessor, PipelineContext, ModelRegistry, LiveScheduler
 from Report import Report
+from Storage import RunStore, ResultCache, InferenceCache
+from Telemetry import MetricsServer, PipelineMetrics
 import config
 from Trainer.Trainer import Trainer
 import os
+import pickle
+import shutil
+import time
 
 class Main:
     """
     Main application class that orchestrates the entire video processing workflow.
     """
 
-    def __init__(self):
+    def __init__(self, context=None):
+        """
+        Args:
+            context (PipelineContext or None): The components of this run. A new one is created from config if None.
+        """
+        self.context = context if context is not None else PipelineContext.from_config()
         self.video_processor = VideoProcessor()
-        self.frame_processor = FrameProcessor()
+        self.frame_processor = FrameProcessor(self.context)
         self.report_generator = Report()
+        # The LiveScheduler of a run of a live source, else None
+        self.live_scheduler = None
+        # With a report executor: the Future of the PDF report of the last run (see run_video_processing)
+        self.report_future = None
 
-    def run_video_processing(self):
+    def run_video_processing(self, progress_callback=None, report_executor=None):
         """
         Executes the main video processing pipeline and returns the raw data of the outputs.
+
+        config.output_mode selects what is produced besides the PDF report:
+            'video'    - the annotations are burned into a re-encoded output video,
+            'sidecar'  - the annotations go to a track file and WebVTT cues next to a stream copy of the source video,
+            'headless' - analytics only: no rendering and no video at all, just the report and the track file.
+
+        If config.run_store_path is set, the rows and periodic checkpoints of the run are kept in a run store,
+        and an interrupted run of the same video and settings continues after its last checkpoint.
+        If config.result_cache_dir is set, the outputs of a video that was already processed with the same model
+        and parameters are taken from the result cache instead.
+        If config.inference_cache_dir is set, the raw detections and OCR results of every new run are recorded; with
+        config.replay_inference, a recorded run is replayed without inference (see _replay_run).
+        With config.live_source, the source is read live (see Video.LiveSource) and every frame has a deadline: when
+        the pipeline falls behind, frames are dropped and OCR and rendering are skipped (see LiveScheduler). Live runs
+        are not stored, cached or recorded, and the latency and drop statistics are added to the stage profile.
+
+        Args:
+            progress_callback (callable or None): Called after every processed frame with
+                                                  (processed frames, total frames or None).
+            report_executor (concurrent.futures.Executor or None): If given, the PDF report of a processed video is
+                rendered and saved on it, so the caller can go on with the next video. pdf_bytes is None then, and
+                self.report_future completes with True when the report is saved (and the results are cached).
+
+        Returns:
+            tuple: (video_bytes, pdf_bytes, tracks_bytes). Entries that were not produced are None.
         """
-        print("--- Step 1: Extracting video frames ---")
-        self.video_processor.extract_frames()
-        extracted_frames = self.video_processor.get_frames()
-        if not extracted_frames:
+        self.report_future = None
+        output_mode = config.output_mode
+        render = output_mode == 'video'
+        tracks_path, vtt_path = AnnotationWriter.sidecar_paths(config.output_video_path)
+
+        result_cache, cache_key = self._open_result_cache()
+        if result_cache is not None:
+            try:
+                cached = result_cache.get(cache_key)
+            except OSError as e:
+                print(f"Warning: The result cache could not be read ({e}).")
+                cached = None
+            if cached is not None:
+                print("--- The same video was already processed with this model and these parameters ---")
+                return self._load_cached_results(cached, tracks_path, vtt_path)
+
+        inference_cache, inference_key = self._open_inference_cache()
+        if inference_cache is not None and config.replay_inference:
+            if inference_cache.has_recording(inference_key):
+                return self._replay_run(inference_cache, inference_key, tracks_path, progress_callback)
+            print("Warning: There is no recording of this video and model to replay. The video is processed instead.")
+
+        print("--- Step 1: Opening the source video ---")
+        if not self.video_processor.open_video():
             print("Error: No frames were extracted.")
-            return None, None
+            return None, None, None
+
+        run_store = None
+        resume_state = None
+        start_frame = 0
+        live_source = self.video_processor.live_source
+        if live_source is not None and not live_source.replay and output_mode == 'sidecar':
+            # A stream or capture device leaves no file to copy next to the sidecar files.
+            print("Warning: The sidecar mode needs a source video file. The live source is processed in headless mode.")
+            output_mode = 'headless'
+        if config.run_store_path and live_source is None:
+            run_store = RunStore(config.run_store_path).open()
+            checkpoint = run_store.start_run(config.video_path, self._run_parameters(), resume=config.resume_run)
+            if checkpoint is not None and not self._outputs_exist(checkpoint['state']):
+                print("Warning: The outputs of the interrupted run are missing. Starting a new run.")
+                run_store.abandon_run()
+                checkpoint = run_store.start_run(config.video_path, self._run_parameters(), resume=False)
+            if checkpoint is not None:
+                resume_state = self._restore_checkpoint(checkpoint, run_store)
+                start_frame = checkpoint['frame'] + config.skip_frame
+            self.report_generator.run_store = run_store
+
+        annotation_writer = None
+        if output_mode in ('sidecar', 'headless'):
+            annotation_writer = AnnotationWriter(tracks_path, vtt_path if output_mode == 'sidecar' else None,
+                                                 self.video_processor.fps, config.skip_frame,
+                                                 self.video_processor.width, self.video_processor.height,
+                                                 config.cls_names)
+            annotation_writer.open(resume_state['annotation_writer'] if resume_state else None)
+        if inference_cache is not None:
+            if resume_state is None:
+                self.frame_processor.recorder = inference_cache.start_recording(inference_key)
+            else:
+                print("Note: A resumed run is not recorded for replays.")
+        if render:
+            self.video_processor.open_video_writer(config.output_video_path,
+                                                   resume_state['video_segments'] if resume_state else None)
 
-        print(f"Successfully extracted {len(extracted_frames)} frames.")
         print("\n--- Step 2: Processing each frame ---")
-        processed_frames_list = []
-        for frame in tqdm(extracted_frames, desc="Processing Frames"):
-            processed_frame = self.frame_processor.process_frame(frame)
-            processed_frames_list.append(processed_frame)
-            self.report_generator.log_frame_data()
-
-        print("\n--- Step 3: Assembling the output video ---")
-        self.video_processor.create_new_video(
-            config.output_video_path,
-            frames_to_use=processed_frames_list
-        )
-        print(f"Output video saved to: {config.output_video_path}")
+        profiler = self.context.profiler
+        processed_count = 0
+        start_time = time.perf_counter()
+        # Reading and decoding the next frame is timed as the 'decode' stage.
+        frames = profiler.timed_iter('decode', self.video_processor.iter_frames(start_frame))
+        total = self.video_processor.get_processed_frame_count(start_frame) or None
+        scheduler = None
+        if live_source is not None:
+            deadline_ms = config.live_deadline_ms or 1000 * config.skip_frame / self.video_processor.fps
+            scheduler = self.live_scheduler = LiveScheduler(deadline_ms / 1000)
+        self._publish_metrics(total)
+        previous_frame_number = -config.skip_frame
+        try:
+            for frame_number, frame in tqdm(frames, total=total, desc="Processing Frames"):
+                skip_ocr = skip_render = False
+                if scheduler is not None:
+                    skip_ocr, skip_render = scheduler.plan(self.video_processor.capture_time)
+                processed_frame = self.frame_processor.process_frame(frame, render=render and not skip_render,
+                                                                     frame_number=frame_number, skip_ocr=skip_ocr)
+                with profiler.stage('encoding'):
+                    if render:
+                        # A frame whose rendering was skipped is written as it is. Live frames stand for the frames
+                        # dropped before them.
+                        self.video_processor.write_frame(processed_frame if processed_frame is not None else frame,
+                                                         frame_number - previous_frame_number if scheduler else None)
+                    else:
+                        annotation_writer.write_frame(frame_number, self.frame_processor.get_annotation())
+                with profiler.stage('reporting'):
+                    self.report_generator.log_frame_data(self.context.aircraft_manager.get_all_aircrafts(),
+                                                        self.frame_processor.ocr_staleness)
+                if scheduler is not None:
+                    scheduler.frame_done(self.video_processor.capture_time)
+                previous_frame_number = frame_number
+                profiler.frame_done()
+                processed_count += 1
+                if progress_callback is not None:
+                    progress_callback(processed_count, total)
+                if run_store is not None and processed_count % config.checkpoint_interval == 0:
+                    with profiler.stage('checkpoint'):
+                        self._save_checkpoint(run_store, frame_number, annotation_writer, render)
+            if run_store is not None:
+                run_store.finish_run()
+        except BaseException:
+            # An interrupted recording is incomplete; it must not be kept (or replayed).
+            if self.frame_processor.recorder is not None:
+                self.frame_processor.recorder.abandon_recording()
+                self.frame_processor.recorder = None
+            raise
+        finally:
+            # The OCR worker and the run store are released on failures too. An interrupted run keeps its last
+            # checkpoint, so it can be resumed.
+            self.frame_processor.close()
+            if run_store is not None:
+                run_store.close()
+                self.report_generator.run_store = None
+        elapsed = time.perf_counter() - start_time
+
+        if self.frame_processor.recorder is not None:
+            self.frame_processor.recorder.finish_recording({
+                'fps': self.video_processor.fps, 'width': self.video_processor.width,
+                'height': self.video_processor.height})
+            self.frame_processor.recorder = None
+
+        if processed_count == 0 and resume_state is None:
+            print("Error: No frames were extracted.")
+            if annotation_writer is not None:
+                annotation_writer.close()
+            return None, None, None
+        print(f"Processed {processed_count} frames in {elapsed:.1f} s "
+              f"({processed_count / max(elapsed, 1e-9):.2f} frames/s, output mode '{output_mode}').")
+        if scheduler is not None:
+            live_stats = self.live_stats()
+            print(f"Live source: {live_stats['frames_dropped']} of {live_stats['frames_offered']} frames dropped, "
+                  f"end-to-end latency {live_stats['latency_mean_ms'] or 0:.0f} ms mean / "
+                  f"{live_stats['latency_p99_ms'] or 0:.0f} ms p99, {live_stats['deadline_misses']} frames over the "
+                  f"{live_stats['deadline_ms']:.0f} ms deadline, degraded frames {live_stats['levels']}.")
+
+        if annotation_writer is not None:
+            annotation_writer.close()
+            print(f"Track file saved to: {tracks_path}")
+
+        if output_mode == 'video':
+            print("\n--- Step 3: Assembling the output video ---")
+            with profiler.stage('video_assembly'):
+                self.video_processor.finish_video()
+            print(f"Output video saved to: {config.output_video_path}")
+        elif output_mode == 'sidecar':
+            print("\n--- Step 3: Copying the source video (annotations are in the sidecar files) ---")
+            with profiler.stage('video_assembly'):
+                self.video_processor.copy_original_video(config.output_video_path)
+            print(f"Output video saved to: {config.output_video_path}")
+        else:
+            print("\n--- Step 3: Headless mode, no output video ---")
+
         print("\n--- Step 4: Generating final reports ---")
-        self.report_generator.generate_pdf_report()
-        print("\n>>> All video processing operations completed successfully. <<<")
+        # It includes the stage profile up to this point; the time of the report itself is only in the JSON profile.
+        report_start = time.perf_counter()
+        if profiler.enabled:
+            self.report_generator.profile = profiler.summary()
+            if scheduler is not None:
+                self.report_generator.profile['live'] = live_stats
+        write_report = self.report_generator.prepare_pdf_report()
+        if write_report is not None and report_executor is None:
+            write_report()
+        self.report_generator.export_timeline(config.timeline_csv_path, config.timeline_parquet_path)
+        profiler.add('report_pdf', time.perf_counter() - report_start)
+        self._save_profile()
 
         video_bytes = None
         pdf_bytes = None
+        tracks_bytes = None
 
-        if os.path.exists(config.output_video_path):
+        if output_mode != 'headless' and os.path.exists(config.output_video_path):
             with open(config.output_video_path, 'rb') as f:
                 video_bytes = f.read()
 
+        if annotation_writer is not None and os.path.exists(tracks_path):
+            with open(tracks_path, 'rb') as f:
+                tracks_bytes = f.read()
+
+        # Only complete results are cached (e.g. not when FFMPEG was missing and no video was made)
+        cache_entry = None
+        if result_cache is not None and (video_bytes is not None or output_mode == 'headless'):
+            report_state = {'report': self.report_generator.get_state(), 'timeline': self.report_generator.timeline}
+            cache_entry = {
+                'video': config.output_video_path if output_mode != 'headless' else None,
+                'pdf': config.pdf_report_path,
+                'tracks': tracks_path if annotation_writer is not None else None,
+                'vtt': vtt_path if output_mode == 'sidecar' else None,
+                'timeline_csv': config.timeline_csv_path,
+                'timeline_parquet': config.timeline_parquet_path,
+                'report_state': pickle.dumps(report_state, protocol=pickle.HIGHEST_PROTOCOL),
+            }
+
+        if write_report is not None and report_executor is not None:
+            # The report is rendered in the background; the results are cached once it is saved.
+            print("\n>>> The video is processed; the PDF report is generated in the background. <<<")
+            self.report_future = report_executor.submit(self._finish_report, write_report, result_cache, cache_key,
+                                                        cache_entry)
+            return video_bytes, None, tracks_bytes
+
+        print("\n>>> All video processing operations completed successfully. <<<")
+        if os.path.exists(config.pdf_report_path):
+            with open(config.pdf_report_path, 'rb') as f:
+                pdf_bytes = f.read()
+        if pdf_bytes is not None:
+            self._cache_results(result_cache, cache_key, cache_entry)
+        return video_bytes, pdf_bytes, tracks_bytes
+
+    def _finish_report(self, write_report, result_cache, cache_key, cache_entry):
+        """
+        Renders and saves a prepared report on the report executor, then caches the results of the run.
+        Only uses its arguments, not config, which may hold the settings of the next video by then.
+
+        Returns:
+            bool: True if the report was saved.
+        """
+        if not write_report():
+            return False
+        self._cache_results(result_cache, cache_key, cache_entry)
+        return True
+
+    @staticmethod
+    def _cache_results(result_cache, cache_key, cache_entry):
+        if cache_entry is None:
+            return
+        try:
+            result_cache.put(cache_key, cache_entry)
+        except OSError as e:
+            # The outputs of the run are complete; only the next run of the same video misses the cache.
+            print(f"Warning: The results could not be stored in the result cache ({e}).")
+
+    def _replay_run(self, inference_cache, key, tracks_path, progress_callback=None):
+        """
+        Re-runs tracking, the current aircraft search and the report on a recorded run, with the current
+        tracking and report parameters. Neither the models nor the video decoder are used, so the output
+        is the report and the track file (like the 'headless' mode).
+
+        Returns:
+            tuple: (None, pdf_bytes, tracks_bytes).
+        """
+        print("--- Replaying the recorded detections and OCR results ---")
+        info = inference_cache.load_info(key)
+        annotation_writer = AnnotationWriter(tracks_path, None, info['fps'], config.skip_frame,
+                                             info['width'], info['height'], config.cls_names)
+        annotation_writer.open()
+
+        profiler = self.context.profiler
+        processed_count = 0
+        start_time = time.perf_counter()
+        self._publish_metrics(None)
+        for record in profiler.timed_iter('decode', inference_cache.iter_frames(key)):
+            self.frame_processor.replay_frame(record)
+            with profiler.stage('encoding'):
+                annotation_writer.write_frame(record['frame'], self.frame_processor.get_annotation())
+            with profiler.stage('reporting'):
+                self.report_generator.log_frame_data(self.context.aircraft_manager.get_all_aircrafts(),
+                                                    self.frame_processor.ocr_staleness)
+            profiler.frame_done()
+            processed_count += 1
+            if progress_callback is not None:
+                progress_callback(processed_count, None)
+        self.frame_processor.close()
+        annotation_writer.close()
+        elapsed = time.perf_counter() - start_time
+        print(f"Replayed {processed_count} frames in {elapsed:.1f} s.")
+        print(f"Track file saved to: {tracks_path}")
+
+        print("\n--- Generating final reports ---")
+        report_start = time.perf_counter()
+        if profiler.enabled:
+            self.report_generator.profile = profiler.summary()
+        self.report_generator.generate_pdf_report()
+        self.report_generator.export_timeline(config.timeline_csv_path, config.timeline_parquet_path)
+        profiler.add('report_pdf', time.perf_counter() - report_start)
+        self._save_profile()
+
+        pdf_bytes = None
+        tracks_bytes = None
         if os.path.exists(config.pdf_report_path):
             with open(config.pdf_report_path, 'rb') as f:
                 pdf_bytes = f.read()
+        if os.path.exists(tracks_path):
+            with open(tracks_path, 'rb') as f:
+                tracks_bytes = f.read()
+        print("\n>>> Replay completed successfully. <<<")
+        return None, pdf_bytes, tracks_bytes
 
-        return video_bytes, pdf_bytes
+    def _run_parameters(self):
+        """
+        Returns the settings the results of a run depend on. A run is only resumed with the same settings.
+        """
+        return {
+            'yolov12_path': config.yolov12_path,
+            'output_video_path': config.output_video_path,
+            'output_mode': config.output_mode,
+            'skip_frame': config.skip_frame,
+            'model_imgsz': config.model_imgsz,
+            'memory_time': config.memory_time,
+            'ocr_interval': config.ocr_interval,
+            'add_object_th': config.add_object_th,
+            'current_aircraft_threshold': config.current_aircraft_threshold,
+            'relation_airport_th': config.relation_airport_th,
+            'map_label_expiry': config.map_label_expiry,
+            'panel_layout_path': config.panel_layout_path,
+        }
+
+    def _open_result_cache(self):
+        """
+        Opens the result cache and computes the key of this run.
+
+        Returns:
+            tuple: (ResultCache, key), or (None, None) if the cache is disabled or the inputs can not be read.
+        """
+        if not config.result_cache_dir or config.live_source:
+            return None, None
+        try:
+            result_cache = ResultCache(config.result_cache_dir, config.result_cache_max_bytes)
+            params = self._run_parameters()
+            # The input files are identified by their content, not by their paths
+            del params['yolov12_path'], params['output_video_path']
+            if config.panel_layout_path:
+                params['panel_layout_path'] = result_cache.file_digest(config.panel_layout_path)
+            return result_cache, result_cache.make_key(config.video_path, config.yolov12_path, params)
+        except OSError as e:
+            print(f"Warning: The result cache is not used ({e}).")
+            return None, None
+
+    def _open_inference_cache(self):
+        """
+        Opens the inference cache and computes the key of the recording of this video, model and
+        the parameters that change the inference outputs.
+
+        Returns:
+            tuple: (InferenceCache, key), or (None, None) if the cache is disabled or the inputs can not be read.
+        """
+        if not config.inference_cache_dir or config.live_source:
+            return None, None
+        try:
+            inference_cache = InferenceCache(config.inference_cache_dir, config.inference_cache_max_bytes)
+            params = {
+                'skip_frame': config.skip_frame,
+                'model_imgsz': config.model_imgsz,
+                'ocr_interval': config.ocr_interval,
+                'panel_layout': (inference_cache.file_digest(config.panel_layout_path)
+                                 if config.panel_layout_path else None),
+            }
+            return inference_cache, inference_cache.make_key(config.video_path, config.yolov12_path, params)
+        except OSError as e:
+            print(f"Warning: The inference cache is not used ({e}).")
+            return None, None
+
+    def _publish_metrics(self, total_frames):
+        """
+        Makes the live metrics of this run available on the metrics endpoint of the process, if it is enabled.
+        They stay available after the run, until the next run of the process replaces them.
+        """
+        metrics_server = MetricsServer.ensure(config.metrics_port, config.metrics_host)
+        if metrics_server is not None:
+            metrics = PipelineMetrics(self.frame_processor, config.video_path, total_frames,
+                                      self.live_stats if self.live_scheduler is not None else None)
+            metrics_server.add_source('pipeline', metrics.collect)
+
+    def live_stats(self):
+        """
+        Returns the end-to-end latency and drop statistics of a live run (see LiveScheduler.summary), or None if
+        the run did not read a live source.
+        """
+        if self.live_scheduler is None:
+            return None
+        return self.live_scheduler.summary(self.video_processor.live_source.stats())
+
+    def _save_profile(self):
+        """
+        Writes the stage profile of the run to config.profile_path, if profiling and the profile file are enabled.
+        """
+        profiler = self.context.profiler
+        if not profiler.enabled or not config.profile_path:
+            return
+        try:
+            extra = {'video': config.video_path, 'settings': self._run_parameters()}
+            if self.live_scheduler is not None:
+                extra['live'] = self.live_stats()
+            profiler.save(config.profile_path, extra)
+            print(f"Stage profile saved to: {config.profile_path}")
+        except OSError as e:
+            print(f"Warning: The stage profile could not be saved ({e}).")
+
+    def _load_cached_results(self, cached, tracks_path, vtt_path):
+        """
+        Copies the cached outputs to the configured output paths, restores the report history
+        (for the history queries) and returns the raw data like run_video_processing.
+        """
+        targets = {
+            'video': config.output_video_path,
+            'pdf': config.pdf_report_path,
+            'tracks': tracks_path,
+            'vtt': vtt_path,
+            'timeline_csv': config.timeline_csv_path,
+            'timeline_parquet': config.timeline_parquet_path,
+        }
+        for name, target in targets.items():
+            if name in cached and target:
+                if os.path.dirname(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(cached[name], target)
+
+        with open(cached['report_state'], 'rb') as f:
+            report_state = pickle.load(f)
+        self.report_generator.restore_state(report_state['report'], ())
+        self.report_generator.timeline = report_state['timeline']
+
+        outputs = []
+        for name in ('video', 'pdf', 'tracks'):
+            data = None
+            if name in cached:
+                with open(cached[name], 'rb') as f:
+                    data = f.read()
+            outputs.append(data)
+        print(">>> Results loaded from the result cache. <<<")
+        return tuple(outputs)
+
+    def _save_checkpoint(self, run_store, frame_number, annotation_writer, render):
+        """
+        Finishes the current output segment and stores the pipeline state after frame_number in the run store.
+        """
+        state = {
+            'frame_processor': self.frame_processor.get_state(),
+            'report': self.report_generator.get_state(),
+            'video_segments': self.video_processor.close_segment() if render else [],
+            'annotation_writer': annotation_writer.get_state() if annotation_writer is not None else None,
+        }
+        run_store.checkpoint(frame_number, self.report_generator.current_frame_number, state)
+
+    def _outputs_exist(self, state):
+        """
+        Checks that the partial outputs a checkpoint continues from are still on disk.
+        """
+        paths = list(state['video_segments'])
+        writer_state = state['annotation_writer']
+        if writer_state is not None:
+            # Headless runs write no WebVTT file. Older checkpoints do not list their files.
+            tracks_path, vtt_path = AnnotationWriter.sidecar_paths(config.output_video_path)
+            paths.extend(writer_state.get('paths', [tracks_path, vtt_path] if config.output_mode == 'sidecar'
+                                          else [tracks_path]))
+        return all(os.path.exists(path) for path in paths)
+
+    def _restore_checkpoint(self, checkpoint, run_store):
+        """
+        Restores the pipeline state of a checkpoint. Returns the restored state.
+        """
+        state = checkpoint['state']
+        print(f"Resuming the interrupted run {run_store.run_id} after frame {checkpoint['frame']}.")
+        self.frame_processor.restore_state(state['frame_processor'])
+        self.report_generator.restore_state(state['report'],
+                                            run_store.iter_timeline(max_frame=checkpoint['timeline_frame']))
+        return state
+
+
+@st.cache_resource(show_spinner=False)
+def load_model_registry():
+    """
+    Returns the model registry of the Streamlit server. st.cache_resource keeps it, and the models it loaded,
+    across reruns and across the module reloads that follow a rewrite of config.py.
+    """
+    return ModelRegistry.default()
 
 
 # --- Main execution block ---
 if __name__ == "__main__":
 
+    model_registry = load_model_registry()
     app = Interface()
+    if config.model_preload and not config.job_queue_path:
+        # Without the job queue the videos are processed in this process: the models are loaded in the background
+        # while the interface is used, instead of when the first run starts.
+        model_registry.preload(config.yolov12_path, config.panel_layout_path, config.model_device)
     start_training = app.run()
 
     if start_training:
@@ -86,18 +563,28 @@ if __name__ == "__main__":
 
     elif st.session_state.get('is_busy') and st.session_state.get('run_settings'):
         settings = st.session_state.get('run_settings', {})
+        if settings.get('autotune_target_fps') is not None or settings.get('autotune_target_latency_ms') is not None:
+            print("Auto-tuning the processing parameters on a sample of the video...")
+            # Imported here: the Benchmark package takes a moment to import and is only needed for auto-tuning.
+            from Benchmark import AutoTuner
+            tuner = AutoTuner.from_config(settings.get('autotune_target_fps'),
+                                          settings.get('autotune_target_latency_ms'))
+            settings.update(tuner.tune(settings))
         app.update_config_file(settings)
 
         print("Starting the video processing pipeline...")
-        main_app = Main()
+        main_app = Main(PipelineContext.from_config(model_registry))
         # --- DEĞİŞİKLİK: Artık dosya yolları değil, byte'lar alınıyor ---
-        video_bytes, pdf_bytes = main_app.run_video_processing()
+        video_bytes, pdf_bytes, tracks_bytes = main_app.run_video_processing(
+            progress_callback=app.progress_reporter(main_app.context.profiler))
 
         st.session_state.status_message = "Video processing completed successfully!"
 
         # --- DEĞİŞİKLİK: Byte'ları session_state'e kaydet ---
         st.session_state.last_video_bytes = video_bytes
         st.session_state.last_pdf_bytes = pdf_bytes
+        st.session_state.last_tracks_bytes = tracks_bytes
+        st.session_state.last_history_query = main_app.report_generator.build_history_query()
         st.session_state.run_completed = True
 
 
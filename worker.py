@@ -0,0 +1,19 @@
+# worker.py
+# Runs the background workers that process the jobs queued in the app:
+#     python worker.py [--workers N]
+
+import argparse
+
+import config
+from Jobs import WorkerPool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processes the queued video and training jobs.")
+    parser.add_argument('--workers', type=int, default=config.job_workers, help="The number of worker processes.")
+    args = parser.parse_args()
+
+    if not config.job_queue_path:
+        raise SystemExit("The job queue is disabled (config.job_queue_path is None).")
+    print(f"Starting {args.workers} worker(s) on the job queue '{config.job_queue_path}'.")
+    WorkerPool(config.job_queue_path, args.workers, config.job_poll_interval).run()